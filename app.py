@@ -1,56 +1,321 @@
+import argparse
+import logging
+import os
 from flask import Flask
 from flask_cors import CORS
 from src.virtualization.digital_replica.schema_registry import SchemaRegistry
 from src.services.database_service import DatabaseService
+from src.services.measurement_buffer import MeasurementWriteBuffer
+from src.services.async_database_service import AsyncDatabaseService
+from src.services.service_registry import ServiceRegistry
 from src.digital_twin.dt_factory import DTFactory
+from src.digital_twin.async_dt_factory import AsyncDTFactory
+from src.digital_twin.service_executor import ServiceExecutor
+from src.digital_twin.job_manager import JobManager
 from src.application.api import register_api_blueprints
-from config.config_loader import ConfigLoader
+from src.application.async_api import register_async_api_blueprints
+from src.application.async_runtime import EventLoopThread
+from src.application.serialization import BSONJSONProvider
+from src.observability.logging_setup import init_request_id, setup_logging, stop_logging
+from src.observability.metrics import CommandMetricsListener, init_metrics
+from src.observability.profiling import DEFAULT_SECRET_ENV, ProfilingMiddleware
+from config.config_loader import SERVER_MODES, ConfigLoader
+
+logger = logging.getLogger(__name__)
 
 
 class FlaskServer:
-    def __init__(self):
+    def __init__(self, init_components: bool = True, server_config: dict = None):
+        """
+        Args:
+            init_components: Connect to MongoDB and start background threads
+                now. Pass False when the process will fork (production mode)
+                and call init_components() in each worker instead.
+            server_config: server section of config/server.yaml (json, logging,
+                metrics, profiling); loaded from the default path when omitted
+        """
         self.app = Flask(__name__)
         CORS(self.app)
-        self._init_components()
+        init_request_id(self.app)
+        self.db_config = ConfigLoader.load_database_config()
+        if server_config is None:
+            server_config = ConfigLoader.load_server_config()
+        json_config = server_config.get("json") or {}
+        self.app.json = BSONJSONProvider(
+            self.app, legacy_format=json_config.get("legacy_format", False)
+        )
+        self.logging_config = server_config.get("logging") or {}
+        self.metrics_config = server_config.get("metrics") or {}
+        if self.metrics_config.get("enabled", True):
+            init_metrics(self.app)
+        # Per-request profiles, by config or with a signed X-Profile header
+        profiling_config = server_config.get("profiling") or {}
+        secret_env = profiling_config.get("secret_env", DEFAULT_SECRET_ENV)
+        if profiling_config.get("enabled", False) or os.environ.get(secret_env):
+            self.app.config["PROFILER"] = ProfilingMiddleware(
+                self.app, profiling_config
+            )
+        self.initialized = False
+        if init_components:
+            self.init_components()
         self._register_blueprints()
 
-    def _init_components(self):
-        """Initialize all required components and store them in app config"""
+    def init_components(
+        self, async_loop_thread: bool = True, sync_indexes: bool = True
+    ):
+        """Initialize all required components and store them in app config
+
+        MongoClient instances and background threads do not survive fork(),
+        so in a pre-forking server this runs once per worker, after fork.
+
+        Args:
+            async_loop_thread: Run the /api/async client on its own event loop
+                thread. The ASGI server passes False and connects it on the
+                server's loop instead.
+            sync_indexes: Reconcile the template indexes (index_sync). A
+                pre-forking server passes False and calls reconcile_indexes()
+                once in the master instead of once per worker.
+        """
+        if self.initialized:
+            return
+        # The log writer thread is per process as well
+        setup_logging(self.logging_config)
+
         schema_registry = SchemaRegistry()
-        # Load database configuration
-        db_config = ConfigLoader.load_database_config()
+        schema_registry.load_templates("src/virtualization/templates")
+        db_config = self.db_config
         connection_string = ConfigLoader.build_connection_string(db_config)
 
+        # Per-command MongoDB timings for /metrics
+        event_listeners = []
+        if self.metrics_config.get("enabled", True):
+            event_listeners.append(CommandMetricsListener())
+
         # Initialize DatabaseService with populated schema_registry
         db_service = DatabaseService(
             connection_string=connection_string,
             db_name=db_config["settings"]["name"],
             schema_registry=schema_registry,
+            measurement_storage=db_config["settings"].get(
+                "measurement_storage", "embedded"
+            ),
+            rollups=db_config["settings"].get("rollups", False),
+            client_options=ConfigLoader.build_client_options(db_config),
+            slow_query_ms=db_config["settings"].get("slow_query_ms", 100),
+            event_listeners=event_listeners,
         )
         db_service.connect()
 
+        # Enforce each template's $jsonSchema at the collection level. A type
+        # whose validator cannot be applied (no collMod privilege, existing
+        # invalid documents with level strict...) is logged and left without
+        # one: trusted bulk inserts stay refused for it.
+        validation_config = db_config["settings"].get("schema_validation") or {}
+        if validation_config.get("enabled", False):
+            for dr_type in schema_registry.schemas:
+                try:
+                    db_service.sync_schema(
+                        dr_type,
+                        validation_level=validation_config.get("level", "moderate"),
+                        validation_action=validation_config.get("action", "error"),
+                    )
+                except Exception as e:
+                    logger.warning("Schema validation not applied: %s", e)
+
+        # Create the indexes declared by the templates
+        if sync_indexes:
+            self.reconcile_indexes(db_service)
+
+        # Worker pools for DT services
+        executor_config = db_config["settings"].get("service_executor") or {}
+        service_executor = ServiceExecutor(
+            thread_workers=executor_config.get("thread_workers", 8),
+            process_workers=executor_config.get("process_workers", 2),
+            max_queue=executor_config.get("max_queue", 64),
+            default_timeout=executor_config.get("default_timeout", 30),
+        )
+
+        # Service classes, imported once (src.services and entry points)
+        service_registry = ServiceRegistry()
+        service_registry.discover()
+
         # Initialize DTFactory
-        dt_factory = DTFactory(db_service, schema_registry)
+        dt_factory = DTFactory(
+            db_service,
+            schema_registry,
+            service_executor=service_executor,
+            service_registry=service_registry,
+            measurements_last_n=db_config["settings"].get(
+                "twin_measurements_last_n", 100
+            ),
+        )
+
+        # Background runs of long services (POST /api/dt/<id>/services/<name>/jobs)
+        jobs_config = db_config["settings"].get("jobs") or {}
+        job_manager = None
+        if jobs_config.get("enabled", True):
+            job_manager = JobManager(
+                db_service,
+                dt_factory,
+                workers=jobs_config.get("workers", 4),
+                max_pending=jobs_config.get("max_pending", 100),
+                result_ttl=jobs_config.get("result_ttl", 86400),
+                job_deadline=jobs_config.get("job_deadline", 3600),
+                default_timeout=jobs_config.get("default_timeout", 600),
+            )
+
+        # Coalesce measurement appends into bulk writes
+        buffer_config = db_config["settings"].get("measurement_buffer") or {}
+        measurement_buffer = None
+        if buffer_config.get("enabled", True):
+            measurement_buffer = MeasurementWriteBuffer(
+                db_service,
+                flush_interval_ms=buffer_config.get("flush_interval_ms", 200),
+                max_batch=buffer_config.get("max_batch", 1000),
+                max_pending=buffer_config.get("max_pending", 100000),
+            )
+            measurement_buffer.start()
+
+        # Async read path (/api/async), on its own event loop thread
+        async_config = db_config["settings"].get("async_api") or {}
+        if async_config.get("enabled", False) and async_loop_thread:
+            async_loop = EventLoopThread()
+            async_loop.start()
+            async_db_service = self.create_async_db_service(schema_registry)
+            async_loop.run(async_db_service.connect())
+            self.app.config["ASYNC_LOOP"] = async_loop
+            self.app.config["ASYNC_DB_SERVICE"] = async_db_service
+            self.app.config["ASYNC_DT_FACTORY"] = AsyncDTFactory(async_db_service)
 
         # Store references
         self.app.config["SCHEMA_REGISTRY"] = schema_registry
         self.app.config["DB_SERVICE"] = db_service
         self.app.config["DT_FACTORY"] = dt_factory
+        self.app.config["MEASUREMENT_BUFFER"] = measurement_buffer
+        self.app.config["SERVICE_EXECUTOR"] = service_executor
+        self.app.config["SERVICE_REGISTRY"] = service_registry
+        self.app.config["JOB_MANAGER"] = job_manager
+        self.initialized = True
+
+    def reconcile_indexes(self, db_service: DatabaseService = None) -> None:
+        """
+        Create the indexes declared by the templates, if index_sync is enabled
+
+        Without db_service a short-lived connection is used, so a pre-forking
+        master can run it once before any worker starts.
+        """
+        index_config = self.db_config["settings"].get("index_sync") or {}
+        if not index_config.get("enabled", True):
+            return
+        drop_undeclared = index_config.get("drop_undeclared", False)
+        if db_service is not None:
+            db_service.sync_all_indexes(drop_undeclared=drop_undeclared)
+            return
+
+        schema_registry = SchemaRegistry()
+        schema_registry.load_templates("src/virtualization/templates")
+        db_service = DatabaseService(
+            connection_string=ConfigLoader.build_connection_string(self.db_config),
+            db_name=self.db_config["settings"]["name"],
+            schema_registry=schema_registry,
+            client_options=ConfigLoader.build_client_options(self.db_config),
+        )
+        db_service.connect()
+        try:
+            db_service.sync_all_indexes(drop_undeclared=drop_undeclared)
+        finally:
+            db_service.disconnect()
+
+    def create_async_db_service(self, schema_registry) -> AsyncDatabaseService:
+        """Build the (not yet connected) service behind /api/async"""
+        db_config = self.db_config
+        return AsyncDatabaseService(
+            connection_string=ConfigLoader.build_connection_string(db_config),
+            db_name=db_config["settings"]["name"],
+            schema_registry=schema_registry,
+            measurement_storage=db_config["settings"].get(
+                "measurement_storage", "embedded"
+            ),
+            client_options=ConfigLoader.build_client_options(db_config),
+        )
 
     def _register_blueprints(self):
         """Register all API blueprints"""
         register_api_blueprints(self.app)
+        async_config = self.db_config["settings"].get("async_api") or {}
+        if async_config.get("enabled", False):
+            register_async_api_blueprints(self.app)
+
+    def shutdown(self):
+        """Flush buffered writes and close database connections"""
+        if self.app.config.get("JOB_MANAGER"):
+            self.app.config["JOB_MANAGER"].shutdown(wait=False)
+        if self.app.config.get("SERVICE_EXECUTOR"):
+            self.app.config["SERVICE_EXECUTOR"].shutdown(wait=False)
+        if self.app.config.get("MEASUREMENT_BUFFER"):
+            self.app.config["MEASUREMENT_BUFFER"].close()
+        if "DB_SERVICE" in self.app.config:
+            self.app.config["DB_SERVICE"].disconnect()
+        if "ASYNC_LOOP" in self.app.config:
+            self.app.config["ASYNC_LOOP"].run(
+                self.app.config["ASYNC_DB_SERVICE"].disconnect()
+            )
+            self.app.config["ASYNC_LOOP"].stop()
+        stop_logging()
+        self.initialized = False
 
     def run(self, host="0.0.0.0", port=5000, debug=True):
-        """Run the Flask server"""
+        """Run the Flask development server"""
         try:
             self.app.run(host=host, port=port, debug=debug)
         finally:
             # Cleanup on server shutdown
-            if "DB_SERVICE" in self.app.config:
-                self.app.config["DB_SERVICE"].disconnect()
+            self.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Digital Twin API server")
+    parser.add_argument(
+        "--mode",
+        choices=SERVER_MODES,
+        help="dev: Flask development server, prod: multi-worker gunicorn, "
+        "asgi: uvicorn with native /api/async (default: server.mode in the "
+        "config file)",
+    )
+    parser.add_argument("--config", default="config/server.yaml")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    args = parser.parse_args()
+
+    server_config = ConfigLoader.load_server_config(args.config)
+    mode = args.mode or server_config.get("mode", "dev")
+    host = args.host or server_config.get("host", "0.0.0.0")
+    port = args.port or server_config.get("port", 5000)
+
+    if mode == "asgi":
+        from src.application.asgi import run_asgi
+
+        run_asgi(
+            FlaskServer(init_components=False, server_config=server_config),
+            host=host,
+            port=port,
+            options=server_config.get("asgi"),
+        )
+    elif mode == "prod":
+        from src.application.production import ProductionServer
+
+        ProductionServer(
+            lambda: FlaskServer(init_components=False, server_config=server_config),
+            host=host,
+            port=port,
+            options=server_config.get("prod"),
+        ).run()
+    else:
+        dev_config = server_config.get("dev") or {}
+        FlaskServer(server_config=server_config).run(
+            host=host, port=port, debug=dev_config.get("debug", True)
+        )
 
 
 if __name__ == "__main__":
-    server = FlaskServer()
-    server.run()
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark for the in-process AggregationService engines
+
+Compares the previous implementation (float() per item + statistics.mean/stdev)
+with the python and numpy engines on 10^4 .. 10^7 measurements.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_aggregation [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime
+
+from src.services.analytics import AggregationService, NUMPY_ENGINE, PYTHON_ENGINE
+
+MEASURE_TYPES = ["temperature", "humidity", "pressure"]
+MEASUREMENTS_PER_DR = 1000
+
+
+def _build_data(size: int) -> dict:
+    rng = random.Random(size)
+    now = datetime.utcnow()
+    drs = []
+    for start in range(0, size, MEASUREMENTS_PER_DR):
+        count = min(MEASUREMENTS_PER_DR, size - start)
+        drs.append(
+            {
+                "_id": f"dr-{start}",
+                "type": "bottle",
+                "data": {
+                    "measurements": [
+                        {
+                            "measure_type": rng.choice(MEASURE_TYPES),
+                            "value": rng.gauss(15, 3),
+                            "timestamp": now,
+                        }
+                        for _ in range(count)
+                    ]
+                },
+            }
+        )
+    return {"digital_replicas": drs}
+
+
+def _legacy_execute(data: dict) -> dict:
+    """AggregationService.execute as it was before the engines were introduced"""
+    all_measurements = []
+    for dr in data["digital_replicas"]:
+        all_measurements.extend(dr["data"]["measurements"])
+
+    grouped = {}
+    for measure in all_measurements:
+        grouped.setdefault(measure["measure_type"], []).append(float(measure["value"]))
+
+    return {
+        measure_type: {
+            "count": len(values),
+            "mean": statistics.mean(values),
+            "min": min(values),
+            "max": max(values),
+            "stddev": statistics.stdev(values) if len(values) > 1 else 0,
+        }
+        for measure_type, values in grouped.items()
+    }
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10**4, 10**5, 10**6, 10**7]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    python_service = AggregationService()
+    python_service.configure({"mode": "python", "engine": PYTHON_ENGINE})
+    numpy_service = AggregationService()
+    numpy_service.configure({"mode": "python", "engine": NUMPY_ENGINE})
+
+    print(f"{'measurements':>12} {'legacy s':>10} {'python s':>10} {'numpy s':>10} {'speedup':>8}")
+    for size in args.sizes:
+        data = _build_data(size)
+        legacy = _best_of(lambda: _legacy_execute(data), args.repeat)
+        python = _best_of(lambda: python_service.execute(data), args.repeat)
+        vectorized = _best_of(lambda: numpy_service.execute(data), args.repeat)
+        print(
+            f"{size:>12} {legacy:>10.3f} {python:>10.3f} {vectorized:>10.3f} "
+            f"{legacy / vectorized:>7.1f}x"
+        )
+        del data
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Micro-benchmark for DRFactory model compilation
+
+Compares the per-call cost of create_dr/update_dr when the Pydantic
+Profile/Data models are rebuilt on every call (previous behaviour) against
+the per-template model cache.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_dr_models [--iterations 2000]
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime
+
+from src.virtualization.digital_replica.dr_factory import DRFactory
+
+TEMPLATE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "virtualization",
+    "templates",
+    "bottle.yaml",
+)
+
+
+def _sample_payload(i: int) -> dict:
+    return {
+        "profile": {"name": f"bottle-{i}", "vintage": 2019, "grape": "nebbiolo"},
+        "data": {
+            "measurements": [
+                {
+                    "measure_type": "temperature",
+                    "value": 12.5,
+                    "timestamp": datetime.utcnow(),
+                }
+            ]
+        },
+    }
+
+
+def _time_per_call(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    factory = DRFactory(TEMPLATE)
+
+    def uncached_create(i):
+        # Previous behaviour: rebuild both models on every call
+        ProfileModel = factory._create_profile_model()
+        DataModel = factory._create_data_model()
+        payload = _sample_payload(i)
+        ProfileModel(**payload["profile"]).model_dump(exclude_unset=True)
+        DataModel(**payload["data"]).model_dump(exclude_unset=True)
+
+    def cached_create(i):
+        factory.create_dr("bottle", _sample_payload(i))
+
+    dr = factory.create_dr("bottle", _sample_payload(0))
+
+    def cached_update(i):
+        factory.update_dr(dr, {"data": {"status": "active"}})
+
+    results = {
+        "create_dr (models rebuilt per call)": _time_per_call(
+            uncached_create, args.iterations
+        ),
+        "create_dr (cached models)": _time_per_call(cached_create, args.iterations),
+        "update_dr (cached models)": _time_per_call(cached_update, args.iterations),
+    }
+
+    print(f"{'case':<40} {'us/call':>10}")
+    for name, per_call in results.items():
+        print(f"{name:<40} {per_call:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
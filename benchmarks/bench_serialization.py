@@ -0,0 +1,107 @@
+"""
+Benchmark for the API JSON serialization layer
+
+Compares Flask's default JSON provider (json module, sort_keys) with the
+BSON-aware provider (orjson when installed) on DR documents holding
+10^3 .. 10^5 measurements, and reports the peak memory of building one
+JSON array versus streaming it.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_serialization [--sizes 1000 10000 100000]
+"""
+
+import argparse
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from src.application.serialization import BSONJSONProvider, iter_json_array, orjson
+
+MEASUREMENTS_PER_DR = 100
+
+
+def _build_drs(size: int) -> list:
+    now = datetime.utcnow()
+    drs = []
+    for start in range(0, size, MEASUREMENTS_PER_DR):
+        count = min(MEASUREMENTS_PER_DR, size - start)
+        drs.append(
+            {
+                "_id": str(uuid.uuid4()),
+                "type": "bottle",
+                "profile": {"name": "bottle", "vintage": 2020, "grape": "merlot"},
+                "data": {
+                    "status": "active",
+                    "sensors": [str(ObjectId())],
+                    "measurements": [
+                        {
+                            "measure_type": "temperature",
+                            "value": 15.0 + i * 0.01,
+                            "timestamp": now + timedelta(seconds=i),
+                        }
+                        for i in range(count)
+                    ],
+                },
+                "metadata": {"created_at": now, "updated_at": now},
+            }
+        )
+    return drs
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_memory(fn) -> int:
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def _drain(chunks) -> None:
+    for _ in chunks:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10**3, 10**4, 10**5])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    bson_provider = BSONJSONProvider(app)
+
+    print(f"orjson available: {orjson is not None}")
+    print(
+        f"{'measurements':>12} {'default s':>10} {'bson s':>10} {'speedup':>8} "
+        f"{'list MiB':>9} {'stream MiB':>10}"
+    )
+    for size in args.sizes:
+        drs = _build_drs(size)
+        default = _best_of(lambda: default_provider.dumps(drs), args.repeat)
+        fast = _best_of(lambda: bson_provider.dumps(drs), args.repeat)
+        full = _peak_memory(lambda: bson_provider.dumps(drs))
+        streamed = _peak_memory(lambda: _drain(iter_json_array(iter(drs))))
+        print(
+            f"{size:>12} {default:>10.4f} {fast:>10.4f} {default / fast:>7.1f}x "
+            f"{full / 2**20:>9.2f} {streamed / 2**20:>10.2f}"
+        )
+        del drs
+
+
+if __name__ == "__main__":
+    main()
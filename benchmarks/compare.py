@@ -0,0 +1,94 @@
+"""
+Compare two benchmark result files (benchmarks.suite --output)
+
+A case regresses when its median time grew by more than --threshold
+(relative, e.g. 0.15 = 15%) and by more than --min-delta-us, so that
+sub-microsecond cases do not fail on timer noise. Exits with status 1 if
+any case regressed.
+
+Usage (from the repository root):
+    python -m benchmarks.compare baseline.json current.json [--threshold 0.15]
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List
+
+# Result field compared between runs
+METRIC = "p50_us"
+DEFAULT_MIN_DELTA_US = 5.0
+
+
+def load_results(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_results(
+    baseline: Dict,
+    current: Dict,
+    threshold: float,
+    min_delta_us: float = DEFAULT_MIN_DELTA_US,
+) -> List[Dict]:
+    """
+    Compare the cases present in both runs
+
+    Returns:
+        List[Dict]: One row per case: {"case", "baseline", "current",
+            "change" (relative), "regressed"}
+    """
+    rows = []
+    for case, result in current["results"].items():
+        previous = baseline["results"].get(case)
+        if not previous or not previous.get(METRIC):
+            continue
+        change = result[METRIC] / previous[METRIC] - 1
+        rows.append(
+            {
+                "case": case,
+                "baseline": previous[METRIC],
+                "current": result[METRIC],
+                "change": change,
+                "regressed": change > threshold
+                and result[METRIC] - previous[METRIC] > min_delta_us,
+            }
+        )
+    return rows
+
+
+def print_comparison(rows: List[Dict], baseline: Dict, current: Dict) -> None:
+    for name, run in (("baseline", baseline), ("current", current)):
+        meta = run.get("meta", {})
+        print(
+            f"{name}: {meta.get('commit', '?')} ({meta.get('backend', '?')}, {meta.get('created_at', '?')})"
+        )
+    if baseline.get("meta", {}).get("params") != current.get("meta", {}).get("params"):
+        print("warning: the runs used different fleet parameters")
+    print(f"{'case':<34} {'baseline us':>12} {'current us':>12} {'change':>8}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regressed"] else ""
+        print(
+            f"{row['case']:<34} {row['baseline']:>12.1f} {row['current']:>12.1f} "
+            f"{row['change']:>+7.1%}{flag}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--min-delta-us", type=float, default=DEFAULT_MIN_DELTA_US)
+    args = parser.parse_args()
+
+    baseline = load_results(args.baseline)
+    current = load_results(args.current)
+    rows = compare_results(baseline, current, args.threshold, args.min_delta_us)
+    print_comparison(rows, baseline, current)
+    if any(row["regressed"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Synthetic IoT fleet generator driven by the DR templates
+
+Builds DR payloads from a template's profile fields, type constraints
+(min/max/enum) and measurement item types, validates them through
+DRFactory.create_dr and loads them as N twins x M replicas x K measurements.
+The same seed always produces the same fleet.
+"""
+
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+from src.virtualization.digital_replica.dr_factory import DRFactory
+
+# Fixed base time, so generated documents do not depend on the clock
+BASE_TIME = datetime(2024, 1, 1)
+MEASURE_TYPES = ["temperature", "humidity", "pressure"]
+
+
+class FleetGenerator:
+    """
+    Generates Digital Replica payloads for a set of DR templates
+
+    Args:
+        templates: DR type -> template path
+        seed: Random seed
+    """
+
+    def __init__(self, templates: Dict[str, str], seed: int = 42):
+        self.templates = templates
+        self.seed = seed
+        self.factories = {
+            dr_type: DRFactory(path) for dr_type, path in templates.items()
+        }
+        for factory in self.factories.values():
+            factory._get_models()  # loads factory.schema
+
+    def _random_value(
+        self, rng: random.Random, name: str, field_type: str, constraints: Dict
+    ):
+        rules = constraints.get(name, {})
+        if "enum" in rules:
+            return rng.choice(rules["enum"])
+        if field_type == "int":
+            return rng.randint(rules.get("min", 0), rules.get("max", 1000))
+        if field_type == "float":
+            return round(rng.uniform(rules.get("min", 0.0), rules.get("max", 100.0)), 3)
+        if field_type == "datetime":
+            return BASE_TIME + timedelta(seconds=rng.randint(0, 86400 * 365))
+        if field_type == "bool":
+            return rng.random() < 0.5
+        return f"{name}-{rng.randint(0, 10**6)}"
+
+    def _measurements(
+        self, rng: random.Random, item_types: Dict[str, str], count: int
+    ) -> List[Dict]:
+        measurements = []
+        for i in range(count):
+            measurement = {}
+            for field, field_type in item_types.items():
+                if field == "measure_type":
+                    measurement[field] = MEASURE_TYPES[i % len(MEASURE_TYPES)]
+                elif field == "timestamp":
+                    measurement[field] = BASE_TIME + timedelta(minutes=i)
+                elif field == "value":
+                    measurement[field] = round(rng.gauss(15.0, 3.0), 3)
+                else:
+                    measurement[field] = self._random_value(rng, field, field_type, {})
+            measurements.append(measurement)
+        return measurements
+
+    def payload(self, dr_type: str, index: int, measurements: int) -> Dict:
+        """Initial data for one DR (profile and data sections)"""
+        schema = self.factories[dr_type].schema["schemas"]
+        validations = schema.get("validations", {})
+        constraints = validations.get("type_constraints", {})
+        rng = random.Random(f"{self.seed}-{dr_type}-{index}")
+
+        profile = {
+            field: self._random_value(rng, field, field_type, constraints)
+            for field, field_type in schema["common_fields"].get("profile", {}).items()
+        }
+        data = {}
+        for field, field_type in schema.get("entity", {}).get("data", {}).items():
+            if field == "measurements":
+                item_types = (
+                    constraints.get("measurements", {})
+                    .get("item_constraints", {})
+                    .get(
+                        "type_mappings",
+                        {
+                            "measure_type": "str",
+                            "value": "float",
+                            "timestamp": "datetime",
+                        },
+                    )
+                )
+                data[field] = self._measurements(rng, item_types, measurements)
+            elif field_type.startswith("List"):
+                continue
+            else:
+                data[field] = self._random_value(rng, field, field_type, constraints)
+        return {"profile": profile, "data": data}
+
+    def create_drs(
+        self, dr_type: str, count: int, measurements: int, start: int = 0
+    ) -> Iterator[Dict]:
+        """Validated DR documents (through DRFactory.create_dr)"""
+        factory = self.factories[dr_type]
+        for index in range(start, start + count):
+            dr = factory.create_dr(dr_type, self.payload(dr_type, index, measurements))
+            # Deterministic ids and timestamps, for comparable runs
+            dr["_id"] = f"{dr_type}-{self.seed}-{index}"
+            dr["metadata"]["created_at"] = dr["metadata"]["updated_at"] = BASE_TIME
+            yield dr
+
+    def load(
+        self,
+        db_service,
+        dt_factory,
+        twins: int,
+        replicas: int,
+        measurements: int,
+        services: Tuple[str, ...] = ("AggregationService",),
+    ) -> List[str]:
+        """
+        Load twins x replicas DRs (replicas spread over the DR types) with
+        measurements each, and attach them and the services to their twin
+
+        Returns:
+            List[str]: Digital Twin IDs
+        """
+        dr_types = sorted(self.templates)
+        dt_ids = []
+        for twin in range(twins):
+            dt_id = dt_factory.create_dt(f"fleet-{self.seed}-{twin}", "synthetic fleet")
+            for service_name in services:
+                dt_factory.add_service(dt_id, service_name)
+            refs: List[Tuple[str, str]] = []
+            for position, dr_type in enumerate(dr_types):
+                count = replicas // len(dr_types) + (
+                    position < replicas % len(dr_types)
+                )
+                drs = list(
+                    self.create_drs(dr_type, count, measurements, start=twin * replicas)
+                )
+                if drs:
+                    db_service.save_drs(dr_type, drs)
+                refs.extend((dr_type, dr["_id"]) for dr in drs)
+            db_service.db["digital_twins"].update_one(
+                {"_id": dt_id},
+                {"$set": {"digital_replicas": [{"type": t, "id": i} for t, i in refs]}},
+            )
+            dt_ids.append(dt_id)
+        return dt_ids
+
+
+def template_types(paths: List[str]) -> Dict[str, str]:
+    """DR type (file name without extension) -> template path"""
+    return {os.path.splitext(os.path.basename(path))[0]: path for path in paths}
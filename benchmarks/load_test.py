@@ -0,0 +1,180 @@
+"""
+Load test of the sync and async Digital Twin read paths
+
+Seeds one Digital Twin with --drs bottle Digital Replicas (spread over
+--types DR types: the server's "bottle" type, then copies of it) in the
+configured MongoDB, then drives GET /api/dt/<id>?resolve=1 (sync) and
+GET /api/async/dt/<id>?resolve=1 (async) with a closed loop of N
+concurrent clients for each concurrency level. Reports requests/sec and latency percentiles, and per mode the best
+throughput whose p95 latency stays under --target-p95-ms.
+
+Requires a local mongod (config/database.yaml) and a running server with
+settings.async_api.enabled set to true:
+    python app.py
+
+Usage (from the repository root):
+    python -m benchmarks.load_test [--url http://localhost:5000]
+        [--concurrency 1 4 16 64] [--duration 10] [--drs 50]
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from config.config_loader import ConfigLoader
+from src.digital_twin.dt_factory import DTFactory
+from src.services.database_service import DatabaseService
+from src.virtualization.digital_replica.dr_factory import DRFactory
+from src.virtualization.digital_replica.schema_registry import SchemaRegistry
+
+# The template shipped with (and loaded by) the server, DR type "bottle"
+TEMPLATE = "src/virtualization/templates/bottle.yaml"
+
+MODES = {
+    "sync": "/api/dt/{dt_id}?resolve=1",
+    "async": "/api/async/dt/{dt_id}?resolve=1",
+}
+
+
+def _seed(dr_count: int, type_count: int) -> str:
+    """Create a Digital Twin referencing dr_count DRs and return its id"""
+    db_config = ConfigLoader.load_database_config()
+    registry = SchemaRegistry()
+    # The extra types reuse the template under names the server does not
+    # register; resolving DRs by _id works for any type
+    dr_types = ["bottle"] + [f"loadtest_bottle_{i}" for i in range(1, type_count)]
+    for dr_type in dr_types:
+        registry.load_schema(dr_type, TEMPLATE)
+
+    db_service = DatabaseService(
+        connection_string=ConfigLoader.build_connection_string(db_config),
+        db_name=db_config["settings"]["name"],
+        schema_registry=registry,
+        client_options=ConfigLoader.build_client_options(db_config),
+    )
+    db_service.connect()
+    try:
+        # Same indexes as the server creates for its types at startup
+        db_service.sync_all_indexes()
+        dt_factory = DTFactory(db_service, registry)
+        dt_id = dt_factory.create_dt(f"load-test-{int(time.time())}", "load test")
+        dr_factory = DRFactory(TEMPLATE)
+        for i in range(dr_count):
+            dr_type = dr_types[i % type_count]
+            dr = dr_factory.create_dr(
+                dr_type,
+                {
+                    "profile": {"name": f"bottle-{i}", "vintage": 2020, "grape": "merlot"},
+                    "data": {
+                        "measurements": [
+                            {"measure_type": "temperature", "value": 15.0 + j * 0.1}
+                            for j in range(20)
+                        ]
+                    },
+                },
+            )
+            db_service.save_dr(dr_type, dr)
+            dt_factory.add_digital_replica(dt_id, dr_type, dr["_id"])
+        return dt_id
+    finally:
+        db_service.disconnect()
+
+
+def _run_level(url: str, concurrency: int, duration: float) -> dict:
+    """Closed loop: each client sends the next request when the previous one returns"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        nonlocal errors
+        local, failed = [], 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    response.read()
+                local.append(time.perf_counter() - start)
+            except Exception:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(client)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[len(latencies) * p // 100] * 1000 if latencies else None
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--drs", type=int, default=50)
+    parser.add_argument("--types", type=int, default=5)
+    parser.add_argument("--target-p95-ms", type=float, default=50.0)
+    parser.add_argument("--dt-id", help="Use an existing Digital Twin instead of seeding")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    dt_id = args.dt_id or _seed(args.drs, args.types)
+    print(f"Digital Twin: {dt_id}")
+
+    results = {}
+    print(f"{'mode':>6} {'clients':>8} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for mode, path in MODES.items():
+        url = args.url.rstrip("/") + path.format(dt_id=dt_id)
+        results[mode] = []
+        for concurrency in args.concurrency:
+            level = _run_level(url, concurrency, args.duration)
+            results[mode].append(level)
+            print(
+                f"{mode:>6} {concurrency:>8} {level['rps']:>9.1f} "
+                f"{level['p50_ms'] or 0:>8.1f} {level['p95_ms'] or 0:>8.1f} "
+                f"{level['p99_ms'] or 0:>8.1f} {level['errors']:>7}"
+            )
+
+    print(f"\nBest throughput with p95 <= {args.target_p95_ms:g} ms:")
+    for mode, levels in results.items():
+        within = [
+            level
+            for level in levels
+            if level["p95_ms"] is not None
+            and level["p95_ms"] <= args.target_p95_ms
+            and not level["errors"]
+        ]
+        if within:
+            best = max(within, key=lambda level: level["rps"])
+            print(f"  {mode}: {best['rps']:.1f} req/s at {best['concurrency']} clients")
+        else:
+            print(f"  {mode}: no concurrency level met the target")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"dt_id": dt_id, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
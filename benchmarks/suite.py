@@ -0,0 +1,303 @@
+"""
+Reproducible benchmark suite
+
+Generates a synthetic fleet (--twins x --replicas x --measurements) from the
+DR templates, loads it into a local mongod, or into mongomock when no mongod
+is reachable (--backend), then times:
+
+    DRFactory.create_dr, DatabaseService.save_dr, DTFactory.get_dt_instance
+    (cold and cached), AggregationService.execute and the main HTTP
+    endpoints through the Flask test client
+
+Results are written as JSON (--output) for comparison across commits; with
+--baseline the run fails (exit status 1) when a case is slower than the
+baseline by more than --threshold. mongomock numbers are only comparable
+with other mongomock runs.
+
+Usage (from the repository root):
+    python -m benchmarks.suite [--twins 10] [--replicas 20] [--measurements 100]
+        [--backend auto|mongo|mongomock] [--output results.json]
+        [--baseline previous.json] [--threshold 0.15]
+"""
+
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from pymongo import MongoClient
+
+import src.services.database_service as database_service
+from benchmarks.compare import (
+    DEFAULT_MIN_DELTA_US,
+    compare_results,
+    print_comparison,
+)
+from benchmarks.fleet import FleetGenerator, template_types
+from config.config_loader import ConfigLoader
+from src.digital_twin.dt_factory import DTFactory
+from src.services.analytics import AggregationService
+from src.virtualization.digital_replica.schema_registry import SchemaRegistry
+
+# The template shipped with (and loaded by) the server
+DEFAULT_TEMPLATES = ["src/virtualization/templates/bottle.yaml"]
+DEFAULT_DB_NAME = "dt_benchmark"
+
+
+def _select_backend(backend: str, connection_string: str) -> str:
+    """Return "mongo" or "mongomock", patching DatabaseService for the latter"""
+    if backend in ("auto", "mongo"):
+        try:
+            client = MongoClient(connection_string, serverSelectionTimeoutMS=2000)
+            client.admin.command("ping")
+            client.close()
+            return "mongo"
+        except Exception as e:
+            if backend == "mongo":
+                raise SystemExit(f"MongoDB not reachable: {e}")
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit(
+            "No mongod reachable and mongomock is not installed (pip install mongomock)"
+        )
+    database_service.MongoClient = mongomock.MongoClient
+    return "mongomock"
+
+
+def _measure(fn: Callable[[int], object], iterations: int, warmup: int) -> Dict:
+    """
+    Time fn(i) per call, i = 0 .. warmup + iterations - 1 (warmup calls are
+    not timed); returns latency statistics in microseconds
+    """
+    for i in range(warmup):
+        fn(i)
+    gc.collect()
+    samples = []
+    for i in range(warmup, warmup + iterations):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "mean_us": sum(samples) / len(samples),
+        "p50_us": samples[len(samples) // 2],
+        "p95_us": samples[min(len(samples) - 1, len(samples) * 95 // 100)],
+        "min_us": samples[0],
+        "ops_per_sec": len(samples) / (sum(samples) / 1e6),
+    }
+
+
+def _git_commit() -> Dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = bool(
+            subprocess.run(
+                ["git", "status", "--porcelain", "--untracked-files=no"],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        )
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def _build_app(registry, db_service, dt_factory):
+    """FlaskServer app (middleware and blueprints) around the benchmark components"""
+    from app import FlaskServer
+
+    server = FlaskServer(init_components=False, server_config={})
+    server.app.config.update(
+        SCHEMA_REGISTRY=registry, DB_SERVICE=db_service, DT_FACTORY=dt_factory
+    )
+    return server.app
+
+
+def run_suite(args, backend: str, connection_string: str) -> Dict:
+    templates = template_types(args.templates)
+    registry = SchemaRegistry()
+    for dr_type, path in templates.items():
+        registry.load_schema(dr_type, path)
+
+    db_service = database_service.DatabaseService(
+        connection_string=connection_string,
+        db_name=args.db_name,
+        schema_registry=registry,
+    )
+    db_service.connect()
+    db_service.client.drop_database(args.db_name)
+    results: Dict[str, Dict] = {}
+    try:
+        db_service.sync_all_indexes()
+        dt_factory = DTFactory(db_service, registry)
+        generator = FleetGenerator(templates, seed=args.seed)
+
+        start = time.perf_counter()
+        dt_ids = generator.load(
+            db_service, dt_factory, args.twins, args.replicas, args.measurements
+        )
+        load_seconds = time.perf_counter() - start
+        print(
+            f"Loaded {args.twins} twins x {args.replicas} replicas x "
+            f"{args.measurements} measurements in {load_seconds:.2f}s ({backend})"
+        )
+
+        dr_type = sorted(templates)[0]
+        factory = generator.factories[dr_type]
+        first_new = args.twins * args.replicas
+        total = args.iterations + args.warmup
+
+        payloads = [
+            generator.payload(dr_type, first_new + i, args.measurements)
+            for i in range(total)
+        ]
+        results["create_dr"] = _measure(
+            lambda i: factory.create_dr(dr_type, payloads[i]),
+            args.iterations,
+            args.warmup,
+        )
+
+        new_drs = list(
+            generator.create_drs(dr_type, total, args.measurements, start=first_new)
+        )
+        results["save_dr"] = _measure(
+            lambda i: db_service.save_dr(dr_type, new_drs[i]),
+            args.iterations,
+            args.warmup,
+        )
+
+        def get_cold(i):
+            dt_factory.instance_cache.clear()
+            dt_factory.get_dt_instance(dt_ids[i % len(dt_ids)])
+
+        results["get_dt_instance (cold)"] = _measure(
+            get_cold, args.iterations, args.warmup
+        )
+        results["get_dt_instance (cached)"] = _measure(
+            lambda i: dt_factory.get_dt_instance(dt_ids[i % len(dt_ids)]),
+            args.iterations,
+            args.warmup,
+        )
+
+        service = AggregationService()
+        twins = [dt_factory.get_dt_instance(dt_id) for dt_id in dt_ids]
+        results["AggregationService.execute"] = _measure(
+            lambda i: service.execute(
+                {
+                    "digital_replicas": twins[i % len(twins)].digital_replicas,
+                    "db_service": db_service,
+                },
+                dr_type=dr_type,
+            ),
+            args.iterations,
+            args.warmup,
+        )
+
+        client = _build_app(registry, db_service, dt_factory).test_client()
+        endpoints = {
+            "GET /api/dt/<id>": "/api/dt/{dt_id}",
+            "GET /api/dt/<id>?resolve=1": "/api/dt/{dt_id}?resolve=1",
+            "GET /api/dt-management/stats/<id>": "/api/dt-management/stats/{dt_id}",
+            "GET /api/dr/<type>": f"/api/dr/{dr_type}?limit=50",
+        }
+        for name, path in endpoints.items():
+
+            def request(i, path=path):
+                response = client.get(path.format(dt_id=dt_ids[i % len(dt_ids)]))
+                if response.status_code != 200:
+                    raise RuntimeError(
+                        f"{name}: HTTP {response.status_code} {response.get_data(as_text=True)[:200]}"
+                    )
+
+            results[name] = _measure(request, args.iterations, args.warmup)
+    finally:
+        if not args.keep_data:
+            db_service.client.drop_database(args.db_name)
+        db_service.disconnect()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--twins", type=int, default=10)
+    parser.add_argument("--replicas", type=int, default=20, help="Replicas per twin")
+    parser.add_argument(
+        "--measurements", type=int, default=100, help="Measurements per replica"
+    )
+    parser.add_argument("--templates", nargs="+", default=DEFAULT_TEMPLATES)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--backend", choices=["auto", "mongo", "mongomock"], default="auto"
+    )
+    parser.add_argument("--db-name", default=DEFAULT_DB_NAME)
+    parser.add_argument(
+        "--keep-data", action="store_true", help="Do not drop the benchmark database"
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with a previous results file")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--min-delta-us", type=float, default=DEFAULT_MIN_DELTA_US)
+    args = parser.parse_args()
+
+    db_config = ConfigLoader.load_database_config()
+    connection_string = ConfigLoader.build_connection_string(db_config)
+    backend = _select_backend(args.backend, connection_string)
+
+    results = run_suite(args, backend, connection_string)
+    run = {
+        "meta": {
+            **_git_commit(),
+            "created_at": datetime.utcnow().isoformat(),
+            "backend": backend,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {
+                "twins": args.twins,
+                "replicas": args.replicas,
+                "measurements": args.measurements,
+                "templates": args.templates,
+                "iterations": args.iterations,
+                "seed": args.seed,
+            },
+        },
+        "results": results,
+    }
+
+    print(f"\n{'case':<34} {'p50 us':>10} {'p95 us':>10} {'ops/s':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<34} {result['p50_us']:>10.1f} {result['p95_us']:>10.1f} "
+            f"{result['ops_per_sec']:>10.1f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(run, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print()
+        rows = compare_results(baseline, run, args.threshold, args.min_delta_us)
+        print_comparison(rows, baseline, run)
+        if any(row["regressed"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,32 @@
 import yaml
-from typing import Dict
+from typing import Any, Dict
+from urllib.parse import quote_plus
 import os
 
+# config/database.yaml "client" keys passed as MongoClient keyword arguments
+CLIENT_OPTIONS = (
+    "maxPoolSize",
+    "minPoolSize",
+    "maxIdleTimeMS",
+    "maxConnecting",
+    "waitQueueTimeoutMS",
+    "connectTimeoutMS",
+    "socketTimeoutMS",
+    "serverSelectionTimeoutMS",
+    "compressors",
+    "zlibCompressionLevel",
+    "readPreference",
+    "w",
+    "wTimeoutMS",
+    "journal",
+    "retryWrites",
+    "appname",
+)
+
+
+# config/server.yaml "mode" values (app.py --mode choices)
+SERVER_MODES = ("dev", "prod", "asgi")
+
 
 class ConfigLoader:
     @staticmethod
@@ -18,6 +43,24 @@ class ConfigLoader:
 
         return config["database"]
 
+    @staticmethod
+    def load_server_config(config_path: str = "config/server.yaml") -> Dict:
+        """Load server configuration from YAML file (dev mode when absent)"""
+        if not os.path.exists(config_path):
+            return {}
+
+        with open(config_path, "r") as f:
+            config = yaml.safe_load(f)
+
+        if not config or "server" not in config:
+            raise ValueError("Invalid configuration file: missing server section")
+
+        mode = config["server"].get("mode", "dev")
+        if mode not in SERVER_MODES:
+            raise ValueError(f"Invalid server mode: {mode}")
+
+        return config["server"]
+
     @staticmethod
     def build_connection_string(config: Dict) -> str:
         """Build MongoDB connection string from configuration"""
@@ -27,7 +70,25 @@ class ConfigLoader:
 
         # Build authentication part if credentials are provided
         auth = ""
+        query = ""
         if conn.get("username") and conn.get("password"):
-            auth = f"{conn['username']}:{conn['password']}@"
+            auth = f"{quote_plus(conn['username'])}:{quote_plus(conn['password'])}@"
+            auth_source = config.get("settings", {}).get("auth_source")
+            if auth_source:
+                query = f"/?authSource={quote_plus(auth_source)}"
+
+        return f"mongodb://{auth}{host}:{port}{query}"
+
+    @staticmethod
+    def build_client_options(config: Dict) -> Dict[str, Any]:
+        """Build MongoClient keyword arguments (pool, timeouts, compression,
+        read preference, write concern) from the "client" section"""
+        client = config.get("client") or {}
+        unknown = set(client) - set(CLIENT_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown client options: {', '.join(sorted(unknown))}")
 
-        return f"mongodb://{auth}{host}:{port}"
\ No newline at end of file
+        options = {key: value for key, value in client.items() if value is not None}
+        if isinstance(options.get("compressors"), list):
+            options["compressors"] = ",".join(options["compressors"])
+        return options
\ No newline at end of file
@@ -1,6 +1,56 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context, send_from_directory
 from datetime import datetime
 from bson import ObjectId
+import itertools
+import json
+import time
+from src.virtualization.digital_replica.dr_factory import DRFactory
+from src.services.measurement_buffer import BufferFullError
+from src.services.database_service import ConcurrentModificationError
+from src.digital_twin.service_executor import ServiceRejectedError, ServiceTimeoutError
+from src.digital_twin.job_manager import JobQueueFullError
+from src.services.analytics import to_utc_datetime
+from src.application.serialization import dumps_bytes, iter_json_array, iter_ndjson
+from src.services.query_diagnostics import explain_find, summarize_plan
+
+# Default number of NDJSON records validated and inserted per batch
+BULK_CHUNK_SIZE = 1000
+# Maximum number of per-record errors reported by bulk endpoints
+MAX_REPORTED_ERRORS = 100
+# Page sizes of paginated list endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _parse_list_params(default_limit=DEFAULT_PAGE_SIZE, args=None):
+    """Parse the limit/after/fields query parameters of list endpoints"""
+    if args is None:
+        args = request.args
+    limit = args.get('limit')
+    if limit is None:
+        limit = default_limit
+    else:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError('limit must be an integer')
+        if not 0 < limit <= MAX_PAGE_SIZE:
+            raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    fields = args.get('fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else None
+    return limit, args.get('after'), fields
+
+
+def _prefetched(items):
+    """
+    Read the first item of a lazy cursor now, before a streamed response
+    starts, so that query errors can still be answered with a JSON 500
+    """
+    items = iter(items)
+    for first in items:
+        return itertools.chain([first], items)
+    return iter(())
+
 
 # Create blueprints for different API groups
 dt_api = Blueprint('dt_api', __name__, url_prefix='/api/dt')
@@ -29,11 +79,21 @@ def create_digital_twin():
 
 @dt_api.route('/<dt_id>', methods=['GET'])
 def get_digital_twin(dt_id):
-    """Get Digital Twin details"""
+    """
+    Get Digital Twin details
+
+    With resolve=1 the Digital Replicas are included as "replicas"
+    (optionally projected with fields, comma separated).
+    """
     try:
         dt = current_app.config['DT_FACTORY'].get_dt(dt_id)
         if not dt:
             return jsonify({'error': 'Digital Twin not found'}), 404
+        if request.args.get('resolve') in ('1', 'true'):
+            _, _, fields = _parse_list_params()
+            dt['replicas'] = current_app.config['DB_SERVICE'].get_drs_by_refs(
+                dt.get('digital_replicas', []), fields=fields
+            )
         return jsonify(dt), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -41,15 +101,63 @@ def get_digital_twin(dt_id):
 
 @dt_api.route('/', methods=['GET'])
 def list_digital_twins():
-    """List all Digital Twins"""
+    """
+    List Digital Twins
+
+    Without query parameters every Digital Twin is returned as a list. With
+    any of limit, after, fields or order_by (_id or updated_at) a page
+    {"items": [...], "next_after": cursor} is returned instead; pass
+    next_after back as `after` to get the next page.
+    """
     try:
-        dts = current_app.config['DT_FACTORY'].list_dts()
-        return jsonify(dts), 200
+        if not any(p in request.args for p in ('limit', 'after', 'fields', 'order_by')):
+            dts = _prefetched(current_app.config['DT_FACTORY'].iter_dts())
+            # Same format as jsonify (see the json section of config/server.yaml)
+            encode = getattr(current_app.json, 'dumps_bytes', dumps_bytes)
+            return Response(stream_with_context(iter_json_array(dts, encode=encode)),
+                            mimetype='application/json')
+
+        try:
+            limit, after, fields = _parse_list_params()
+            page = current_app.config['DT_FACTORY'].list_dts_page(
+                limit=limit,
+                after=after,
+                fields=fields,
+                order_by=request.args.get('order_by', '_id')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(page), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 # Generic Digital Replica APIs
+@dr_api.route('/<dr_type>', methods=['GET'])
+def list_digital_replicas(dr_type):
+    """
+    Stream the Digital Replicas of a type as NDJSON, ordered by _id
+
+    Optional query parameters: limit, fields (comma separated) and after
+    (the _id of the last DR already received).
+    """
+    try:
+        limit, after, fields = _parse_list_params(default_limit=None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        drs = _prefetched(current_app.config['DB_SERVICE'].iter_drs(
+            dr_type, fields=fields, limit=limit, after=after
+        ))
+        # Same format as jsonify (see the json section of config/server.yaml)
+        encode = getattr(current_app.json, 'dumps_bytes', dumps_bytes)
+        return Response(stream_with_context(iter_ndjson(drs, encode=encode)),
+                        mimetype='application/x-ndjson')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @dr_api.route('/<dr_type>/<dr_id>', methods=['GET'])
 def get_digital_replica(dr_type, dr_id):
     """Get Digital Replica details"""
@@ -62,6 +170,189 @@ def get_digital_replica(dr_type, dr_id):
         return jsonify({'error': str(e)}), 500
 
 
+def _get_dr_factory(dr_type):
+    """Get a DRFactory for a registered DR type (compiled models are shared)"""
+    schema_path = current_app.config['SCHEMA_REGISTRY'].get_schema_path(dr_type)
+    return DRFactory(schema_path)
+
+
+@dr_api.route('/<dr_type>/<dr_id>', methods=['PATCH'])
+def patch_digital_replica(dr_type, dr_id):
+    """
+    Partially update a Digital Replica
+
+    Body: {"updates": {"data": {"status": "inactive"}, "profile": {"grape": null}},
+           "push": {"data.measurements": [...]},
+           "expected_updated_at": "<metadata.updated_at of the version read>"}
+
+    Only the changed fields are validated and written ($set/$unset/$push on
+    dotted paths). With expected_updated_at the update is rejected with 409
+    if the DR was modified in the meantime.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not (data.get('updates') or data.get('push')):
+        return jsonify({'error': 'updates or push required'}), 400
+
+    try:
+        dr_factory = _get_dr_factory(dr_type)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+
+    try:
+        patch = dr_factory.build_patch(data.get('updates'), data.get('push'))
+        expected = data.get('expected_updated_at')
+        if expected is not None:
+            expected = to_utc_datetime(expected)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        result = current_app.config['DB_SERVICE'].patch_dr(
+            dr_type, dr_id, patch, expected_updated_at=expected
+        )
+        return jsonify({
+            'dr_id': dr_id,
+            'updated_at': result['metadata']['updated_at']
+        }), 200
+    except ConcurrentModificationError as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@dr_api.route('/<dr_type>/bulk', methods=['POST'])
+def bulk_create_digital_replicas(dr_type):
+    """
+    Create Digital Replicas from an NDJSON body (one DR per line)
+
+    Each line holds the initial data of a DR ({"profile": ..., "data": ...}).
+    Records are validated through DRFactory and inserted in chunks of
+    `chunk_size` (query parameter); invalid records are reported, not fatal.
+    With trusted=1 the Pydantic validation is skipped and the collection's
+    $jsonSchema validator rejects invalid records instead (only allowed once
+    the schema has been synced to the collection).
+    """
+    try:
+        dr_factory = _get_dr_factory(dr_type)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+
+    try:
+        chunk_size = int(request.args.get('chunk_size', BULK_CHUNK_SIZE))
+        if chunk_size <= 0:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'chunk_size must be a positive integer'}), 400
+
+    db_service = current_app.config['DB_SERVICE']
+    trusted = request.args.get('trusted') in ('1', 'true')
+    if trusted and dr_type not in db_service.validated_types:
+        return jsonify({
+            'error': f'trusted mode requires a synced schema validator for {dr_type}'
+        }), 400
+
+    def build_dr(record):
+        if not trusted:
+            return dr_factory.create_dr(dr_type, record)
+        dr = dr_factory.create_dr(dr_type, record, validate=False)
+        if db_service.measurement_store is not None:
+            # Measurements bypass the DR collection (and its validator)
+            dr_factory.validate_list_items('measurements', dr['data'].get('measurements', []))
+        return dr
+
+    try:
+        started = time.perf_counter()
+        received = inserted = 0
+        errors = []
+
+        def record_error(line, error):
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'line': line, 'error': error})
+
+        def flush(chunk):
+            nonlocal inserted
+            result = db_service.save_drs(dr_type, [dr for _, dr in chunk])
+            inserted += result['inserted']
+            for error in result['errors']:
+                record_error(chunk[error['index']][0], error['error'])
+
+        chunk = []
+        for line_number, line in enumerate(request.stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            received += 1
+            try:
+                chunk.append((line_number, build_dr(json.loads(line))))
+            except Exception as e:
+                record_error(line_number, str(e))
+                continue
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+
+        elapsed = time.perf_counter() - started
+        return jsonify({
+            'received': received,
+            'inserted': inserted,
+            'failed': received - inserted,
+            'errors': errors,
+            'elapsed_seconds': round(elapsed, 3),
+            'records_per_second': round(received / elapsed, 1) if elapsed > 0 else None
+        }), 200 if inserted == received else 207
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@dr_api.route('/<dr_type>/<dr_id>/measurements', methods=['POST'])
+def append_measurements(dr_type, dr_id):
+    """
+    Append measurements to a Digital Replica
+
+    The body is a list of measurements or {"measurements": [...]}. Only the
+    new items are validated; they are then queued in the write buffer and
+    flushed in bulk (202), or written directly when no buffer is configured (201).
+    Unknown Digital Replicas are rejected with 404 before anything is accepted.
+    """
+    try:
+        dr_factory = _get_dr_factory(dr_type)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+
+    try:
+        body = request.get_json()
+        measurements = body.get('measurements') if isinstance(body, dict) else body
+        if not isinstance(measurements, list) or not measurements:
+            return jsonify({'error': 'Expected a non-empty list of measurements'}), 400
+        try:
+            dr_factory.validate_list_items('measurements', measurements)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        db_service = current_app.config['DB_SERVICE']
+        if not db_service.dr_exists(dr_type, dr_id):
+            return jsonify({'error': 'Digital Replica not found'}), 404
+
+        buffer = current_app.config.get('MEASUREMENT_BUFFER')
+        if buffer is None:
+            db_service.append_measurements(dr_type, dr_id, measurements)
+            return jsonify({'status': 'written', 'count': len(measurements)}), 201
+
+        try:
+            buffer.add(dr_type, dr_id, measurements)
+        except BufferFullError as e:
+            response = jsonify({'error': str(e)})
+            response.headers['Retry-After'] = '1'
+            return response, 503
+        return jsonify({'status': 'accepted', 'count': len(measurements)}), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 # Digital Twin Management APIs
 @dt_management_api.route('/assign/<dt_id>', methods=['POST'])
 def assign_dr_to_dt(dt_id):
@@ -85,9 +376,19 @@ def assign_dr_to_dt(dt_id):
 
 @dt_management_api.route('/stats/<dt_id>', methods=['GET'])
 def get_dt_stats(dt_id):
-    """Get statistics from a Digital Twin's services"""
+    """
+    Get statistics from a Digital Twin's services
+
+    Optional query parameters: dr_type, measure_type, window (e.g. 1m, 1h, 1d)
+    for a bucketed series, from/to (ISO-8601), agg (e.g. mean,max) and
+    percentiles=1 to add p50/p95/p99 to the summary (not with window)
+    """
     try:
-        dt = current_app.config['DT_FACTORY'].get_dt(dt_id)
+        # Without the measurement arrays, so that AggregationService can push
+        # the computation down to MongoDB (it loads them itself if needed)
+        dt = current_app.config['DT_FACTORY'].get_dt_instance(
+            dt_id, dr_exclude=['data.measurements']
+        )
         if not dt:
             return jsonify({'error': 'Digital Twin not found'}), 404
 
@@ -95,17 +396,131 @@ def get_dt_stats(dt_id):
         dr_type = params.get('dr_type')
         measure_type = params.get('measure_type')
 
-        stats = current_app.config['DT_FACTORY'].get_dt_instance(dt_id).execute_service(
+        stats = dt.execute_service(
             'AggregationService',
             dr_type=dr_type,
-            attribute=measure_type
+            attribute=measure_type,
+            window=params.get('window'),
+            start=params.get('from'),
+            end=params.get('to'),
+            agg=params.get('agg'),
+            percentiles=params.get('percentiles') in ('1', 'true')
         )
 
         return jsonify(stats), 200
+    except ServiceRejectedError as e:
+        return jsonify({'error': str(e)}), 503
+    except ServiceTimeoutError as e:
+        return jsonify({'error': str(e)}), 504
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@dt_management_api.route('/cache/stats', methods=['GET'])
+def get_dt_cache_stats():
+    """Get hit/miss/eviction counters of the Digital Twin instance cache"""
+    try:
+        return jsonify(current_app.config['DT_FACTORY'].instance_cache.get_stats()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@dt_management_api.route('/db/pool', methods=['GET'])
+def get_db_pool_stats():
+    """Get MongoDB connection pool settings and checkout wait statistics"""
+    try:
+        return jsonify(current_app.config['DB_SERVICE'].get_pool_stats()), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@dt_management_api.route('/diagnostics/slow-queries', methods=['GET'])
+def get_slow_queries():
+    """
+    List recorded slow DR queries (query_drs, iter_drs), slowest first
+
+    With explain=1 each query is re-run through explain (executionStats)
+    and a plan summary is attached (stages, indexes used, collection scan,
+    documents examined).
+    """
+    try:
+        db_service = current_app.config['DB_SERVICE']
+        entries = db_service.slow_queries.entries()
+        if request.args.get('explain') in ('1', 'true'):
+            for entry in entries:
+                try:
+                    entry['plan'] = summarize_plan(explain_find(db_service.db, entry))
+                except Exception as e:
+                    entry['plan'] = {'error': str(e)}
+        return jsonify({
+            'threshold_ms': db_service.slow_queries.threshold_ms,
+            'recorded': db_service.slow_queries.recorded,
+            'queries': entries
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@dt_management_api.route('/diagnostics/indexes', methods=['POST'])
+def sync_indexes():
+    """Reconcile the DR collection indexes with the templates"""
+    try:
+        db_service = current_app.config['DB_SERVICE']
+        drop_undeclared = request.args.get('drop_undeclared') in ('1', 'true')
+        return jsonify(db_service.sync_all_indexes(drop_undeclared=drop_undeclared)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@dt_management_api.route('/services', methods=['GET'])
+def list_available_services():
+    """List the services that can be added to a Digital Twin"""
+    try:
+        return jsonify(current_app.config['DT_FACTORY'].service_registry.get_stats()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@dt_management_api.route('/services/executor/stats', methods=['GET'])
+def get_service_executor_stats():
+    """Get per-pool counters of the service executor (rejections, timeouts, ...)"""
+    executor = current_app.config.get('SERVICE_EXECUTOR')
+    if executor is None:
+        return jsonify({'error': 'Service executor not enabled'}), 404
+    return jsonify(executor.get_stats()), 200
+
+
+@dt_management_api.route('/profiles', methods=['GET'])
+def list_profiles():
+    """List stored request profiles, newest first"""
+    profiler = current_app.config.get('PROFILER')
+    if profiler is None:
+        return jsonify({'error': 'Profiling not enabled'}), 404
+    return jsonify(profiler.store.list()), 200
+
+
+@dt_management_api.route('/profiles/<name>', methods=['GET'])
+def download_profile(name):
+    """Download a stored profile (.prof: pstats, .folded: collapsed stacks)"""
+    profiler = current_app.config.get('PROFILER')
+    if profiler is None:
+        return jsonify({'error': 'Profiling not enabled'}), 404
+    if not profiler.store.has(name):
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_from_directory(profiler.store.directory, name, as_attachment=True)
+
+
+@dt_management_api.route('/measurement-buffer/stats', methods=['GET'])
+def get_measurement_buffer_stats():
+    """Get counters of the measurement write buffer"""
+    buffer = current_app.config.get('MEASUREMENT_BUFFER')
+    if buffer is None:
+        return jsonify({'error': 'Measurement buffer not enabled'}), 404
+    return jsonify(buffer.get_stats()), 200
+
+
 @dt_api.route('/<dt_id>/services', methods=['POST'])
 def add_service_to_dt(dt_id):
     """Add a service to Digital Twin"""
@@ -124,6 +539,65 @@ def add_service_to_dt(dt_id):
         return jsonify({'error': str(e)}), 500
 
 
+@dt_api.route('/<dt_id>/services/<service_name>/jobs', methods=['POST'])
+def submit_service_job(dt_id, service_name):
+    """
+    Run a Digital Twin service as a background job
+
+    Body (optional): {"params": {...service kwargs...}, "timeout": seconds}.
+    Returns 202 with the job id; poll GET .../jobs/<job_id> for the result.
+    An identical request made while a job is queued or running returns that
+    job (deduplicated: true) instead of starting another run.
+    """
+    try:
+        job_manager = current_app.config.get('JOB_MANAGER')
+        if job_manager is None:
+            return jsonify({'error': 'Job manager not enabled'}), 404
+
+        data = request.get_json(silent=True) or {}
+        params = data.get('params', {})
+        if not isinstance(params, dict):
+            return jsonify({'error': 'params must be an object'}), 400
+
+        # The services list is enough here: the job builds the instance
+        dt = current_app.config['DT_FACTORY'].get_dt(dt_id, fields=['services.name'])
+        if not dt:
+            return jsonify({'error': 'Digital Twin not found'}), 404
+        if service_name not in [s['name'] for s in dt.get('services', [])]:
+            return jsonify({'error': f'Service {service_name} not found'}), 400
+
+        job, deduplicated = job_manager.submit(
+            dt_id, service_name, params=params, timeout=data.get('timeout')
+        )
+        response = jsonify({
+            'job_id': job['_id'],
+            'status': job['status'],
+            'deduplicated': deduplicated
+        })
+        response.headers['Location'] = f"/api/dt/{dt_id}/services/{service_name}/jobs/{job['_id']}"
+        return response, 202
+    except JobQueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@dt_api.route('/<dt_id>/services/<service_name>/jobs/<job_id>', methods=['GET'])
+def get_service_job(dt_id, service_name, job_id):
+    """Get the status of a service job, with its result or error once finished"""
+    try:
+        job_manager = current_app.config.get('JOB_MANAGER')
+        if job_manager is None:
+            return jsonify({'error': 'Job manager not enabled'}), 404
+
+        job = job_manager.get_job(job_id)
+        if not job or job['dt_id'] != dt_id or job['service'] != service_name:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 def register_api_blueprints(app):
     """Register all API blueprints with the Flask app"""
     app.register_blueprint(dt_api)
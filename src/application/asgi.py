@@ -0,0 +1,154 @@
+from typing import Dict, Optional
+from urllib.parse import parse_qsl
+import asyncio
+import uuid
+
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import Map, Rule
+
+from src.application.async_api import fetch_digital_replica, fetch_digital_twin
+from src.digital_twin.async_dt_factory import AsyncDTFactory
+from src.observability.logging_setup import REQUEST_ID_HEADER, request_id_var
+
+ASYNC_PREFIX = "/api/async/"
+
+# The /api/async routes of async_api, served natively
+_ASYNC_ROUTES = Map(
+    [
+        Rule("/api/async/dt/<dt_id>", endpoint="dt", methods=["GET"]),
+        Rule("/api/async/dr/<dr_type>/<dr_id>", endpoint="dr", methods=["GET"]),
+    ]
+)
+
+
+class ASGIServer:
+    """
+    Serves a FlaskServer over ASGI
+
+    /api/async requests are handled on the server's event loop, which also
+    owns the async Mongo client, so a request waiting on MongoDB holds no
+    thread. Every other request runs the Flask (WSGI) app in asgiref's
+    thread pool. Components are initialized on lifespan startup and shut
+    down on lifespan shutdown; the server must support the lifespan
+    protocol (uvicorn does).
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.wsgi = WsgiToAsgi(server.app)
+        self.routes = _ASYNC_ROUTES.bind("localhost")
+        self.async_db_service = None
+        self.async_dt_factory = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif (
+            scope["type"] == "http"
+            and self.async_dt_factory is not None
+            and scope["path"].startswith(ASYNC_PREFIX)
+        ):
+            await self._handle_async(scope, receive, send)
+        else:
+            await self.wsgi(scope, receive, send)
+
+    async def startup(self) -> None:
+        """Initialize the FlaskServer, and the async client on this loop"""
+        await asyncio.to_thread(self.server.init_components, async_loop_thread=False)
+        async_config = self.server.db_config["settings"].get("async_api") or {}
+        if async_config.get("enabled", False):
+            async_db_service = self.server.create_async_db_service(
+                self.server.app.config["SCHEMA_REGISTRY"]
+            )
+            await async_db_service.connect()
+            self.async_db_service = async_db_service
+            self.async_dt_factory = AsyncDTFactory(async_db_service)
+
+    async def shutdown(self) -> None:
+        """Close the async client, then flush and close the FlaskServer"""
+        if self.async_db_service is not None:
+            await self.async_db_service.disconnect()
+            self.async_db_service = None
+            self.async_dt_factory = None
+        await asyncio.to_thread(self.server.shutdown)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _handle_async(self, scope, receive, send) -> None:
+        try:
+            endpoint, values = self.routes.match(scope["path"], method=scope["method"])
+        except HTTPException:
+            # Unknown route or method: let Flask answer as usual
+            await self.wsgi(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        request_id = headers.get(REQUEST_ID_HEADER.lower()) or uuid.uuid4().hex
+        token = request_id_var.set(request_id[:64])
+        try:
+            if endpoint == "dt":
+                args = MultiDict(
+                    parse_qsl(scope["query_string"].decode(), keep_blank_values=True)
+                )
+                body, status = await fetch_digital_twin(
+                    self.async_dt_factory, values["dt_id"], args
+                )
+            else:
+                body, status = await fetch_digital_replica(
+                    self.async_db_service, values["dr_type"], values["dr_id"]
+                )
+            await self._send_json(send, body, status, request_id_var.get())
+        finally:
+            request_id_var.reset(token)
+
+    async def _send_json(self, send, body: Dict, status: int, request_id: str) -> None:
+        payload = self.server.app.json.dumps_bytes(body) + b"\n"
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(payload)).encode()),
+                    # Same default policy as flask_cors on the WSGI app
+                    (b"access-control-allow-origin", b"*"),
+                    (REQUEST_ID_HEADER.lower().encode(), request_id.encode("latin-1")),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": payload})
+
+
+def create_app() -> ASGIServer:
+    """ASGI factory: uvicorn --factory src.application.asgi:create_app"""
+    from app import FlaskServer
+
+    return ASGIServer(FlaskServer(init_components=False))
+
+
+def run_asgi(
+    server, host: str = "0.0.0.0", port: int = 5000, options: Optional[Dict] = None
+) -> None:
+    """Serve a FlaskServer (built without components) with uvicorn"""
+    try:
+        import uvicorn
+    except ImportError:  # Imported here: only the ASGI mode needs it
+        raise RuntimeError(
+            "The asgi mode requires uvicorn: pip install -r requirements.txt"
+        )
+    uvicorn.run(ASGIServer(server), host=host, port=port, lifespan="on", **(options or {}))
@@ -0,0 +1,68 @@
+from flask import Blueprint, request, jsonify, current_app
+from src.application.api import _parse_list_params
+
+# Async read endpoints, registered when settings.async_api.enabled is true.
+# DR resolution runs as concurrent queries on the async Mongo client.
+#
+# Under WSGI (dev and prod modes) each request still holds a server thread
+# while it awaits: only the queries of one request run concurrently. The
+# ASGI mode (src.application.asgi) serves the same handlers on the server's
+# event loop, without a thread per request.
+async_api = Blueprint('async_api', __name__, url_prefix='/api/async')
+
+
+def _run(coro):
+    """Await a coroutine on the event loop that owns the async Mongo client"""
+    return current_app.config['ASYNC_LOOP'].run_async(coro)
+
+
+async def fetch_digital_twin(dt_factory, dt_id, args):
+    """
+    Get Digital Twin details, as a (body, status) pair
+
+    Same contract as GET /api/dt/<dt_id>: with resolve=1 the Digital
+    Replicas are included as "replicas" (optionally projected with fields).
+    """
+    try:
+        if args.get('resolve') in ('1', 'true'):
+            _, _, fields = _parse_list_params(args=args)
+            dt = await dt_factory.get_dt_with_replicas(dt_id, dr_fields=fields)
+        else:
+            dt = await dt_factory.get_dt(dt_id)
+        if not dt:
+            return {'error': 'Digital Twin not found'}, 404
+        return dt, 200
+    except Exception as e:
+        return {'error': str(e)}, 500
+
+
+async def fetch_digital_replica(db_service, dr_type, dr_id):
+    """Get Digital Replica details, as a (body, status) pair"""
+    try:
+        dr = await db_service.get_dr(dr_type, dr_id)
+        if not dr:
+            return {'error': 'Digital Replica not found'}, 404
+        return dr, 200
+    except Exception as e:
+        return {'error': str(e)}, 500
+
+
+@async_api.route('/dt/<dt_id>', methods=['GET'])
+async def get_digital_twin(dt_id):
+    """Get Digital Twin details (see fetch_digital_twin)"""
+    body, status = await _run(fetch_digital_twin(
+        current_app.config['ASYNC_DT_FACTORY'], dt_id, request.args.copy()))
+    return jsonify(body), status
+
+
+@async_api.route('/dr/<dr_type>/<dr_id>', methods=['GET'])
+async def get_digital_replica(dr_type, dr_id):
+    """Get Digital Replica details"""
+    body, status = await _run(fetch_digital_replica(
+        current_app.config['ASYNC_DB_SERVICE'], dr_type, dr_id))
+    return jsonify(body), status
+
+
+def register_async_api_blueprints(app):
+    """Register the async API blueprints with the Flask app"""
+    app.register_blueprint(async_api)
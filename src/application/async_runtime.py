@@ -0,0 +1,54 @@
+from typing import Any, Awaitable, Optional
+from concurrent.futures import Future
+import asyncio
+import threading
+
+
+class EventLoopThread:
+    """
+    Runs one asyncio event loop in a background thread
+
+    Flask runs every async view in a fresh event loop, while pymongo's async
+    client is bound to the loop it was created on. Coroutines that use the
+    client are therefore submitted to this long-lived loop, which is shared
+    by all requests.
+    """
+
+    def __init__(self, name: str = "async-db-loop"):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the loop thread"""
+        if self._thread is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name=self.name, daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, coro: Awaitable) -> Future:
+        """Schedule a coroutine on the loop from any thread"""
+        if self.loop is None:
+            raise RuntimeError("Event loop thread not started")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and wait for its result"""
+        return self.submit(coro).result(timeout)
+
+    async def run_async(self, coro: Awaitable) -> Any:
+        """Await a coroutine on the loop from another event loop"""
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def stop(self) -> None:
+        """Stop the loop and wait for the thread to exit"""
+        if self._thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self._thread = None
+        self.loop = None
@@ -0,0 +1,95 @@
+from typing import Callable, Dict, Optional
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # gunicorn is not available on Windows
+    BaseApplication = None
+
+# config/server.yaml "prod" keys passed to gunicorn as is
+GUNICORN_OPTIONS = (
+    "workers",
+    "threads",
+    "preload",
+    "timeout",
+    "graceful_timeout",
+    "keepalive",
+    "max_requests",
+    "max_requests_jitter",
+    "accesslog",
+    "errorlog",
+    "loglevel",
+)
+
+
+if BaseApplication is not None:
+
+    class ProductionServer(BaseApplication):
+        """
+        Runs a FlaskServer under a pre-forking gunicorn master
+
+        server_factory must build the FlaskServer without initializing its
+        components. With preload the app is created once in the master;
+        either way every worker connects to MongoDB and starts its
+        background threads in post_fork, and flushes and disconnects in
+        worker_exit (after graceful_timeout at most). Template indexes are
+        reconciled once, by the master in on_starting, before any fork.
+        """
+
+        def __init__(
+            self,
+            server_factory: Callable,
+            host: str = "0.0.0.0",
+            port: int = 5000,
+            options: Optional[Dict] = None,
+        ):
+            options = dict(options or {})
+            unknown = set(options) - set(GUNICORN_OPTIONS)
+            if unknown:
+                raise ValueError(f"Unknown prod options: {', '.join(sorted(unknown))}")
+            if options.get("threads", 1) > 1:
+                options["worker_class"] = "gthread"
+            if "preload" in options:
+                options["preload_app"] = options.pop("preload")
+            options["bind"] = f"{host}:{port}"
+
+            self.server_factory = server_factory
+            self.server = None
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                if value is not None:
+                    self.cfg.set(key, value)
+            self.cfg.set("on_starting", self._on_starting)
+            self.cfg.set("post_fork", self._post_fork)
+            self.cfg.set("worker_exit", self._worker_exit)
+
+        def _get_server(self):
+            if self.server is None:
+                self.server = self.server_factory()
+            return self.server
+
+        def load(self):
+            return self._get_server().app
+
+        def _on_starting(self, arbiter):
+            # Once, in the master: concurrent reconciles in every worker
+            # would race on dropping and recreating changed indexes
+            self._get_server().reconcile_indexes()
+
+        def _post_fork(self, arbiter, worker):
+            self._get_server().init_components(sync_indexes=False)
+
+        def _worker_exit(self, arbiter, worker):
+            if self.server is not None:
+                self.server.shutdown()
+
+else:
+
+    class ProductionServer:
+        def __init__(self, *args, **kwargs):
+            raise RuntimeError(
+                "Production mode requires gunicorn (pip install gunicorn), "
+                "which does not run on Windows; use --mode dev there"
+            )
@@ -0,0 +1,136 @@
+from typing import Any, Iterable, Iterator
+from datetime import date, datetime
+from decimal import Decimal
+import json
+import time
+import uuid
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
+
+from src.observability.metrics import JSON_ENCODE_SECONDS
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the json module is the fallback
+    orjson = None
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def bson_default(value: Any) -> Any:
+    """Encode BSON/Python values that JSON encoders do not know natively"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (ObjectId, uuid.UUID)):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, "tolist"):  # NumPy scalars and arrays
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def legacy_default(value: Any) -> Any:
+    """Like bson_default, but with Flask's default RFC 1123 dates"""
+    if isinstance(value, (datetime, date)):
+        return http_date(value)
+    return bson_default(value)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Serialize to UTF-8 JSON, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=bson_default, option=_ORJSON_OPTIONS)
+    return json.dumps(obj, default=bson_default, separators=(",", ":")).encode()
+
+
+def dumps(obj: Any) -> str:
+    """Serialize to a JSON string, using orjson when it is installed"""
+    if orjson is not None:
+        return dumps_bytes(obj).decode()
+    return json.dumps(obj, default=bson_default, separators=(",", ":"))
+
+
+def iter_json_array(
+    items: Iterable[Any], batch_size: int = 100, encode=dumps_bytes
+) -> Iterator[bytes]:
+    """
+    Stream an iterable as one JSON array
+
+    Items are encoded one at a time (with `encode`) and emitted in chunks of
+    batch_size, so large result sets never have to be held in memory.
+    """
+    yield b"["
+    buffer = []
+    first = True
+    for item in items:
+        buffer.append(encode(item) if first else b"," + encode(item))
+        first = False
+        if len(buffer) >= batch_size:
+            yield b"".join(buffer)
+            buffer = []
+    if buffer:
+        yield b"".join(buffer)
+    yield b"]\n"
+
+
+def iter_ndjson(items: Iterable[Any], encode=dumps_bytes) -> Iterator[bytes]:
+    """Stream an iterable as newline-delimited JSON, encoded with `encode`"""
+    for item in items:
+        yield encode(item) + b"\n"
+
+
+class BSONJSONProvider(JSONProvider):
+    """
+    Flask JSON provider aware of BSON types
+
+    Handles datetime (ISO-8601) and ObjectId natively and encodes with
+    orjson when available, keeping the key order of the documents. Calls
+    with extra formatting options (e.g. indent) fall back to the json module.
+
+    With legacy_format, responses keep the format of Flask's default
+    provider instead: RFC 1123 dates and sorted keys (json module only).
+    """
+
+    mimetype = "application/json"
+
+    def __init__(self, app, legacy_format: bool = False):
+        super().__init__(app)
+        self.legacy_format = legacy_format
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if self.legacy_format:
+            kwargs.setdefault("default", legacy_default)
+            kwargs.setdefault("sort_keys", True)
+            kwargs.setdefault("separators", (",", ":"))
+            return json.dumps(obj, **kwargs)
+        if kwargs:
+            kwargs.setdefault("default", bson_default)
+            return json.dumps(obj, **kwargs)
+        return dumps(obj)
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """Serialize to UTF-8 JSON in this provider's format"""
+        if self.legacy_format:
+            return self.dumps(obj).encode()
+        return dumps_bytes(obj)
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        start = time.perf_counter()
+        body = self.dumps_bytes(obj) + b"\n"
+        JSON_ENCODE_SECONDS.observe(time.perf_counter() - start)
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,54 @@
+from typing import Dict, List, Optional
+from src.services.async_database_service import AsyncDatabaseService
+
+
+class AsyncDTFactory:
+    """Asyncio counterpart of the DTFactory read path"""
+
+    def __init__(self, db_service: AsyncDatabaseService):
+        self.db_service = db_service
+
+    async def get_dt(self, dt_id: str) -> Optional[Dict]:
+        """
+        Get a Digital Twin by ID
+
+        Args:
+            dt_id: Digital Twin ID
+
+        Returns:
+            Dict: Digital Twin data if found, None otherwise
+        """
+        if not self.db_service.is_connected():
+            raise ConnectionError("Database service not connected")
+        try:
+            return await self.db_service.db["digital_twins"].find_one({"_id": dt_id})
+        except Exception as e:
+            raise Exception(f"Failed to get Digital Twin: {str(e)}")
+
+    async def get_dt_with_replicas(
+        self,
+        dt_id: str,
+        dr_fields: Optional[List[str]] = None,
+        last_n: Optional[int] = None,
+    ) -> Optional[Dict]:
+        """
+        Get a Digital Twin with its Digital Replicas resolved
+
+        The DT document is read once and its DR references are resolved with
+        concurrent $in queries (AsyncDatabaseService.get_drs_by_refs).
+
+        Args:
+            dt_id: Digital Twin ID
+            dr_fields: Optional list of DR fields to load
+            last_n: In time-series mode, only include the most recent N measurements
+
+        Returns:
+            Dict: Digital Twin data with a "replicas" list if found, None otherwise
+        """
+        dt_data = await self.get_dt(dt_id)
+        if not dt_data:
+            return None
+        dt_data["replicas"] = await self.db_service.get_drs_by_refs(
+            dt_data.get("digital_replicas", []), fields=dr_fields, last_n=last_n
+        )
+        return dt_data
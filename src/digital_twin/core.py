@@ -1,14 +1,18 @@
-from typing import Dict, List, Type, Any
+from typing import Dict, List, Type, Any, Optional
 from src.services.base import BaseService
 from datetime import datetime
+import time
+from src.observability.metrics import SERVICE_EXECUTE_SECONDS
 
 
 class DigitalTwin:
     """Core Digital Twin class that manages DRs and services"""
 
-    def __init__(self):
+    def __init__(self, context: Optional[Dict] = None, executor=None):
         self.digital_replicas: List = []  # Lista di DR objects
         self.active_services: Dict = {}  # service_name -> service_instance
+        self.context: Dict = context or {}  # shared resources passed to services
+        self.executor = executor  # optional ServiceExecutor; inline otherwise
 
     def add_digital_replica(self, dr_instance: Any) -> None:
         """Aggiunge una Digital Replica al twin"""
@@ -34,18 +38,37 @@ class DigitalTwin:
         """Get all DT data including DRs"""
         return {"digital_replicas": self.digital_replicas}
 
-    def execute_service(self, service_name: str, **kwargs):
-        """Execute a named service with parameters"""
+    def execute_service(
+        self, service_name: str, timeout: Optional[float] = None, **kwargs
+    ):
+        """
+        Execute a named service with parameters
+
+        With an executor the call runs in the pool chosen by the service's
+        execution_mode and is bounded by timeout (ServiceTimeoutError).
+        """
         if service_name not in self.active_services:
             raise ValueError(f"Service {service_name} not found")
 
         service = self.active_services[service_name]
 
         # Prepare data for service
-        data = {"digital_replicas": self.digital_replicas}
+        data = {"digital_replicas": self.digital_replicas, **self.context}
 
         # Execute service with data and additional parameters
-        return service.execute(data, **kwargs)
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            if self.executor is None:
+                result = service.execute(data, **kwargs)
+            else:
+                result = self.executor.run(service, data, kwargs, timeout=timeout)
+            outcome = "ok"
+            return result
+        finally:
+            SERVICE_EXECUTE_SECONDS.observe(
+                time.perf_counter() - start, service_name, outcome
+            )
 
     # def execute_service_on_dr(self, service_name: str, dr: Any) -> Any:
     #     """
@@ -0,0 +1,151 @@
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+from collections import OrderedDict
+import threading
+import time
+
+from src.digital_twin.core import DigitalTwin
+
+
+class DTInstanceCache:
+    """
+    Bounded in-process cache of built DigitalTwin instances
+
+    Entries are evicted in LRU order once max_size is reached and expire
+    after ttl_seconds. Entries are invalidated explicitly when the twin or
+    one of its Digital Replicas changes. Invalidation is local to the
+    process, so the TTL bounds staleness across workers.
+    """
+
+    def __init__(self, max_size: int = 128, ttl_seconds: float = 60.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, dt_id, dr_refs, instance)
+        self._entries: OrderedDict = OrderedDict()
+        self._keys_by_dt: Dict[str, Set[Tuple]] = {}
+        self._dts_by_dr: Dict[Tuple[str, str], Set[str]] = {}
+        self._generation = 0
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(dt_id: str, variant: Hashable = None) -> Tuple:
+        return (dt_id, variant)
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped by every invalidation, used to discard stale puts"""
+        return self._generation
+
+    def get(self, key: Tuple) -> Optional[DigitalTwin]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[3]
+
+    def put(
+        self,
+        key: Tuple,
+        instance: DigitalTwin,
+        dr_refs: List[Dict],
+        generation: Optional[int] = None,
+    ) -> None:
+        """
+        Store a built instance
+
+        Args:
+            key: Cache key from make_key
+            instance: Built DigitalTwin
+            dr_refs: DR references of the twin, used for invalidation
+            generation: Value of `generation` read before building; the put
+                is skipped if an invalidation happened in the meantime
+        """
+        if self.max_size <= 0:
+            return
+        dt_id = key[0]
+        refs = [(ref["type"], ref["id"]) for ref in dr_refs]
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (
+                time.monotonic() + self.ttl_seconds,
+                dt_id,
+                refs,
+                instance,
+            )
+            self._keys_by_dt.setdefault(dt_id, set()).add(key)
+            for ref in refs:
+                self._dts_by_dr.setdefault(ref, set()).add(dt_id)
+
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, dt_id: str) -> None:
+        """Drop every cached variant of a Digital Twin"""
+        with self._lock:
+            self._generation += 1
+            for key in list(self._keys_by_dt.get(dt_id, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate_dr(self, dr_type: str, dr_id: str) -> None:
+        """Drop every cached twin that references the given Digital Replica"""
+        with self._lock:
+            self._generation += 1
+            for dt_id in list(self._dts_by_dr.get((dr_type, dr_id), ())):
+                self.invalidate(dt_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys_by_dt.clear()
+            self._dts_by_dr.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: Tuple) -> None:
+        _, dt_id, refs, _ = self._entries.pop(key)
+        keys = self._keys_by_dt.get(dt_id)
+        if keys is not None:
+            keys.discard(key)
+            if keys:
+                return
+            del self._keys_by_dt[dt_id]
+        # Last variant of this twin is gone: drop its reverse DR index
+        for ref in refs:
+            dts = self._dts_by_dr.get(ref)
+            if dts is not None:
+                dts.discard(dt_id)
+                if not dts:
+                    del self._dts_by_dr[ref]
@@ -1,17 +1,51 @@
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 from datetime import datetime
 from bson import ObjectId
+import logging
 from src.services.database_service import DatabaseService
 from src.virtualization.digital_replica.schema_registry import SchemaRegistry
 from src.digital_twin.core import DigitalTwin
+from src.digital_twin.dt_cache import DTInstanceCache
+from src.digital_twin.service_executor import ServiceExecutor
+from src.services.service_registry import ServiceRegistry
+from src.services.pagination import (
+    build_keyset_query,
+    build_projection,
+    encode_cursor,
+)
+
+logger = logging.getLogger(__name__)
+
+# Measurements per DR loaded into a DigitalTwin in time-series mode;
+# aggregations read the store itself, so this only bounds instance memory
+DEFAULT_MEASUREMENTS_LAST_N = 100
 
 
 class DTFactory:
     """Factory class for creating and managing Digital Twins"""
 
-    def __init__(self, db_service: DatabaseService, schema_registry: SchemaRegistry):
+    def __init__(
+        self,
+        db_service: DatabaseService,
+        schema_registry: SchemaRegistry,
+        cache_size: int = 128,
+        cache_ttl: float = 60.0,
+        service_executor: Optional[ServiceExecutor] = None,
+        service_registry: Optional[ServiceRegistry] = None,
+        measurements_last_n: Optional[int] = DEFAULT_MEASUREMENTS_LAST_N,
+    ):
         self.db_service = db_service
         self.schema_registry = schema_registry
+        # Most recent measurements per DR hydrated into built twins in
+        # time-series mode (None loads every point)
+        self.measurements_last_n = measurements_last_n
+        self.service_executor = service_executor
+        if service_registry is None:
+            service_registry = ServiceRegistry()
+            service_registry.discover()
+        self.service_registry = service_registry
+        self.instance_cache = DTInstanceCache(max_size=cache_size, ttl_seconds=cache_ttl)
+        self.db_service.add_change_listener(self.instance_cache.invalidate_dr)
         self._init_dt_collection()
 
     def create_dt(self, name: str, description: str = "") -> str:
@@ -70,18 +104,10 @@ class DTFactory:
                     "$set": {"metadata.updated_at": datetime.utcnow()},
                 },
             )
+            self.instance_cache.invalidate(dt_id)
         except Exception as e:
             raise Exception(f"Failed to add Digital Replica: {str(e)}")
 
-    def _get_service_module_mapping(self) -> Dict[str, str]:
-        """
-        Returns a mapping of service names to their module paths
-        """
-        return {
-            "AggregationService": "src.services.analytics",
-            "TemperaturePredictionService": "src.services.TemperaturePredictionService",
-        }
-
     def add_service(
         self, dt_id: str, service_name: str, service_config: Dict = None
     ) -> None:
@@ -90,65 +116,50 @@ class DTFactory:
 
         Args:
             dt_id: Digital Twin ID
-            service_name: Name of the service
+            service_name: Name of a service known to the service registry
             service_config: Optional service configuration
         """
         try:
-            dt_collection = self.db_service.db["digital_twins"]
-
-            # Ottieni il mapping dei moduli
-            module_mapping = self._get_service_module_mapping()
-
-            # Usa il mapping per trovare il modulo corretto
-            if service_name not in module_mapping:
-                raise ValueError(
-                    f"Service {service_name} not configured in module mapping"
-                )
-
-            module_name = module_mapping[service_name]
-
-            try:
-                service_module = __import__(module_name, fromlist=[service_name])
-                service_class = getattr(service_module, service_name)
-
-                # Verifica che il servizio esista prima di aggiungerlo
-                service = service_class()
-
-                service_data = {
-                    "name": service_name,
-                    "config": service_config or {},
-                    "status": "active",
-                    "added_at": datetime.utcnow(),
-                }
+            if not self.service_registry.has(service_name):
+                raise ValueError(f"Service {service_name} not registered")
+            if service_config:
+                # Fail now rather than when the twin is next loaded
+                self.service_registry.get_instance(service_name, service_config)
+
+            service_data = {
+                "name": service_name,
+                "config": service_config or {},
+                "status": "active",
+                "added_at": datetime.utcnow(),
+            }
 
-                dt_collection.update_one(
-                    {"_id": dt_id},
-                    {
-                        "$push": {"services": service_data},
-                        "$set": {"metadata.updated_at": datetime.utcnow()},
-                    },
-                )
-            except (ImportError, AttributeError) as e:
-                raise ValueError(
-                    f"Failed to load service {service_name} from module {module_name}: {str(e)}"
-                )
+            dt_collection = self.db_service.db["digital_twins"]
+            dt_collection.update_one(
+                {"_id": dt_id},
+                {
+                    "$push": {"services": service_data},
+                    "$set": {"metadata.updated_at": datetime.utcnow()},
+                },
+            )
+            self.instance_cache.invalidate(dt_id)
 
         except Exception as e:
             raise Exception(f"Failed to add service: {str(e)}")
 
-    def get_dt(self, dt_id: str) -> Optional[Dict]:
+    def get_dt(self, dt_id: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
         """
         Get a Digital Twin by ID
 
         Args:
             dt_id: Digital Twin ID
+            fields: Optional list of (dotted) fields to project
 
         Returns:
             Dict: Digital Twin data if found, None otherwise
         """
         try:
             dt_collection = self.db_service.db["digital_twins"]
-            return dt_collection.find_one({"_id": dt_id})
+            return dt_collection.find_one({"_id": dt_id}, build_projection(fields))
         except Exception as e:
             raise Exception(f"Failed to get Digital Twin: {str(e)}")
 
@@ -181,6 +192,56 @@ class DTFactory:
         except Exception as e:
             raise Exception(f"Failed to list Digital Twins: {str(e)}")
 
+    def iter_dts(self, batch_size: int = 500) -> Iterator[Dict]:
+        """
+        Iterate over all Digital Twins without loading them all in memory
+
+        Args:
+            batch_size: Number of documents fetched per round trip
+
+        Returns:
+            Iterator[Dict]: Cursor over the Digital Twin documents
+        """
+        if not self.db_service.is_connected():
+            raise ConnectionError("Not connected to MongoDB")
+        return self.db_service.db["digital_twins"].find(batch_size=batch_size)
+
+    def list_dts_page(
+        self,
+        limit: int = 100,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        order_by: str = "_id",
+    ) -> Dict:
+        """
+        List Digital Twins one page at a time (keyset pagination)
+
+        Args:
+            limit: Maximum number of Digital Twins returned
+            after: Cursor returned as next_after by the previous page
+            fields: Optional list of (dotted) fields to project
+            order_by: "_id" or "updated_at"
+
+        Returns:
+            Dict: {"items": [...], "next_after": cursor or None on the last page}
+        """
+        query, sort = build_keyset_query(order_by, after)
+        try:
+            dt_collection = self.db_service.db["digital_twins"]
+            items = list(
+                dt_collection.find(query, build_projection(fields, order_by))
+                .sort(sort)
+                .limit(limit + 1)
+            )
+        except Exception as e:
+            raise Exception(f"Failed to list Digital Twins: {str(e)}")
+
+        next_after = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_after = encode_cursor(order_by, items[-1])
+        return {"items": items, "next_after": next_after}
+
     # def update_dt(self, dt_id: str, update_data: Dict) -> None:
     #     """
     #     Update a Digital Twin
@@ -292,89 +353,125 @@ class DTFactory:
                 dt_collection.create_index("name", unique=True)
                 dt_collection.create_index("metadata.created_at")
                 dt_collection.create_index("metadata.updated_at")
+                # Keyset pagination ordered by updated_at (see list_dts_page)
+                dt_collection.create_index([("metadata.updated_at", 1), ("_id", 1)])
         except Exception as e:
             raise Exception(f"Failed to initialize DT collection: {str(e)}")
 
-    def create_dt_from_data(self, dt_data: dict) -> DigitalTwin:
+    def create_dt_from_data(
+        self,
+        dt_data: dict,
+        dr_fields: Optional[List[str]] = None,
+        dr_exclude: Optional[List[str]] = None,
+    ) -> DigitalTwin:
         """
-        Create a DigitalTwin instance from database data with enhanced debugging
+        Create a DigitalTwin instance from database data
+
+        Args:
+            dt_data: Digital Twin document
+            dr_fields: Optional list of DR fields to load (e.g. ["data.measurements"]);
+                whole documents are loaded when omitted. In time-series mode
+                at most measurements_last_n measurements per DR are loaded.
+            dr_exclude: Optional list of DR fields not to load when dr_fields
+                is omitted (e.g. ["data.measurements"])
         """
-        print("\n=== Creating DT Instance ===")
         try:
             # Create new DT instance
-            dt = DigitalTwin()
-            print(f"Created new DT instance for {dt_data.get('name', 'unnamed')}")
-
-            # Add Digital Replicas
-            for dr_ref in dt_data.get("digital_replicas", []):
-                dr = self.db_service.get_dr(dr_ref["type"], dr_ref["id"])
-                if dr:
-                    dt.add_digital_replica(dr)
-                    print(f"Added DR: {dr_ref['type']} - {dr_ref['id']}")
+            dt = DigitalTwin(
+                context={"db_service": self.db_service},
+                executor=self.service_executor,
+            )
 
-            # Add Services
-            print("\nLoading services...")
-            service_mapping = self._get_service_module_mapping()
-            print(f"Service mapping: {service_mapping}")
+            # Add Digital Replicas (one $in query per DR type)
+            refs = dt_data.get("digital_replicas", [])
+            drs = (
+                self.db_service.get_drs_by_refs(
+                    refs,
+                    fields=dr_fields,
+                    last_n=self.measurements_last_n,
+                    exclude=dr_exclude,
+                )
+                if refs
+                else []
+            )
+            for dr in drs:
+                dt.add_digital_replica(dr)
 
+            # Add Services (shared instances from the registry)
             for service_data in dt_data.get("services", []):
                 service_name = service_data["name"]
-                print(f"\nProcessing service: {service_name}")
-
-                if service_name in service_mapping:
-                    try:
-                        module_name = service_mapping[service_name]
-                        print(f"Loading module: {module_name}")
-
-                        service_module = __import__(
-                            module_name, fromlist=[service_name]
-                        )
-                        print(f"Module loaded successfully")
-
-                        service_class = getattr(service_module, service_name)
-                        print(f"Got service class: {service_class}")
-
-                        service = service_class()
-                        print(f"Service instance created")
-
-                        if hasattr(service, "configure") and "config" in service_data:
-                            service.configure(service_data["config"])
-                            print(f"Service configured with: {service_data['config']}")
-
-                        dt.add_service(service)
-                        print(f"Service added to DT")
-                        print(f"Current DT services: {dt.list_services()}")
-                    except Exception as e:
-                        print(f"Error adding service {service_name}: {str(e)}")
-                        print(f"Exception type: {type(e)}")
-                else:
-                    print(f"Warning: Service {service_name} not found in mapping")
+                try:
+                    service = self.service_registry.get_instance(
+                        service_name, service_data.get("config")
+                    )
+                    dt.add_service(service)
+                except Exception as e:
+                    logger.warning(
+                        "DT %s: cannot add service %s: %s",
+                        dt_data.get("_id"),
+                        service_name,
+                        e,
+                    )
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Built DT %s (%s): %d DRs, services %s",
+                    dt_data.get("_id"),
+                    dt_data.get("name", "unnamed"),
+                    len(drs),
+                    dt.list_services(),
+                )
 
             return dt
 
         except Exception as e:
-            print(f"Error creating DT: {str(e)}")
-            print(f"Exception type: {type(e)}")
             raise Exception(f"Failed to create DT from data: {str(e)}")
 
-    def get_dt_instance(self, dt_id: str) -> Optional[DigitalTwin]:
+    def get_dt_instance(
+        self,
+        dt_id: str,
+        dr_fields: Optional[List[str]] = None,
+        dr_exclude: Optional[List[str]] = None,
+    ) -> Optional[DigitalTwin]:
         """
         Get a fully initialized DigitalTwin instance by ID
 
+        Instances are served from the in-process instance cache when possible.
+
         Args:
             dt_id: Digital Twin ID
+            dr_fields: Optional list of DR fields to load; see create_dt_from_data
+            dr_exclude: Optional list of DR fields not to load; see create_dt_from_data
 
         Returns:
             Optional[DigitalTwin]: Digital Twin instance if found, None otherwise
         """
         try:
+            if dr_fields:
+                variant = tuple(dr_fields)
+            elif dr_exclude:
+                variant = ("exclude", *dr_exclude)
+            else:
+                variant = None
+            key = self.instance_cache.make_key(dt_id, variant)
+            dt = self.instance_cache.get(key)
+            if dt is not None:
+                return dt
+            generation = self.instance_cache.generation
+
             # Get DT data from database
             dt_data = self.get_dt(dt_id)
             if not dt_data:
                 return None
 
-            # Create and return DT instance
-            return self.create_dt_from_data(dt_data)
+            # Create, cache and return DT instance
+            dt = self.create_dt_from_data(
+                dt_data, dr_fields=dr_fields, dr_exclude=dr_exclude
+            )
+            self.instance_cache.put(
+                key, dt, dt_data.get("digital_replicas", []), generation=generation
+            )
+            return dt
 
         except Exception as e:
             raise Exception(f"Failed to get DT instance: {str(e)}")
@@ -0,0 +1,287 @@
+from typing import Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import hashlib
+import json
+import logging
+import threading
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from src.observability.logging_setup import request_id_var
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+ACTIVE = (QUEUED, RUNNING)
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many jobs are waiting to run"""
+
+
+class JobManager:
+    """
+    Runs Digital Twin services as background jobs persisted in MongoDB
+
+    Jobs are stored in the `jobs` collection and run on a small pool of
+    runner threads (the service itself still goes through the DT's
+    ServiceExecutor). A finished job is kept for result_ttl seconds, then
+    removed by a TTL index.
+
+    Identical requests (same DT, service and parameters) made while a job is
+    queued or running are attached to that job instead of starting another
+    run: active jobs carry an `active_fingerprint` covered by a unique
+    partial index, which is removed when the job finishes. An active job
+    older than job_deadline seconds (e.g. left behind by a crashed worker)
+    is marked failed, when it is read or joined, and no longer deduplicates.
+    On shutdown, the jobs this process queued but did not start are marked
+    failed.
+
+    Services run with default_timeout rather than the executor's (request
+    sized) default, unless the job sets its own timeout.
+    """
+
+    COLLECTION = "jobs"
+
+    def __init__(
+        self,
+        db_service,
+        dt_factory,
+        workers: int = 4,
+        max_pending: int = 100,
+        result_ttl: int = 86400,
+        job_deadline: int = 3600,
+        default_timeout: Optional[float] = 600,
+    ):
+        self.db_service = db_service
+        self.dt_factory = dt_factory
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.job_deadline = job_deadline
+        self.default_timeout = default_timeout
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="dt-job"
+        )
+        self._pending = 0
+        # Jobs submitted to this process's pool that have not started yet
+        self._queued_ids = set()
+        self._lock = threading.Lock()
+        self._init_jobs_collection()
+
+    @property
+    def collection(self):
+        return self.db_service.db[self.COLLECTION]
+
+    def _init_jobs_collection(self) -> None:
+        """Create the jobs indexes (TTL, deduplication, listing)"""
+        if not self.db_service.is_connected():
+            raise ConnectionError("Database service not connected")
+
+        try:
+            self.collection.create_index("expires_at", expireAfterSeconds=0)
+            self.collection.create_index(
+                "active_fingerprint",
+                unique=True,
+                partialFilterExpression={"active_fingerprint": {"$type": "string"}},
+            )
+            self.collection.create_index(
+                [("dt_id", ASCENDING), ("service", ASCENDING), ("created_at", DESCENDING)]
+            )
+        except Exception as e:
+            raise Exception(f"Failed to initialize jobs collection: {str(e)}")
+
+    @staticmethod
+    def fingerprint(dt_id: str, service_name: str, params: Dict) -> str:
+        """Identify identical requests"""
+        payload = json.dumps([dt_id, service_name, params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def submit(
+        self,
+        dt_id: str,
+        service_name: str,
+        params: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+    ) -> Tuple[Dict, bool]:
+        """
+        Enqueue a service run, or join an identical active one
+
+        Args:
+            dt_id: Digital Twin ID
+            service_name: Service attached to the Digital Twin
+            params: Keyword arguments passed to the service
+            timeout: Per-run timeout in seconds (defaults to default_timeout)
+
+        Returns:
+            Tuple[Dict, bool]: The job document and whether it was deduplicated
+
+        Raises:
+            JobQueueFullError: If max_pending jobs are already waiting
+        """
+        params = params or {}
+        fingerprint = self.fingerprint(dt_id, service_name, params)
+
+        for _ in range(3):
+            job_id = str(ObjectId())
+            existing = self.collection.find_one_and_update(
+                {"active_fingerprint": fingerprint},
+                {"$inc": {"waiters": 1}},
+                return_document=ReturnDocument.AFTER,
+            )
+            if existing is not None:
+                if existing["deadline"] > datetime.utcnow():
+                    return existing, True
+                self._finish(
+                    existing["_id"], FAILED, error="Job abandoned", from_status=ACTIVE
+                )
+                continue
+
+            with self._lock:
+                if self._pending >= self.max_pending:
+                    raise JobQueueFullError(
+                        f"Too many pending jobs ({self.max_pending})"
+                    )
+                self._pending += 1
+                self._queued_ids.add(job_id)
+
+            now = datetime.utcnow()
+            job = {
+                "_id": job_id,
+                "dt_id": dt_id,
+                "service": service_name,
+                "params": params,
+                "timeout": timeout or self.default_timeout,
+                "status": QUEUED,
+                "active_fingerprint": fingerprint,
+                "waiters": 1,
+                "request_id": request_id_var.get(),
+                "created_at": now,
+                "updated_at": now,
+                "deadline": now + timedelta(seconds=self.job_deadline),
+            }
+            try:
+                self.collection.insert_one(job)
+            except DuplicateKeyError:
+                # An identical job was created concurrently: join it
+                with self._lock:
+                    self._pending -= 1
+                    self._queued_ids.discard(job_id)
+                continue
+            except Exception:
+                with self._lock:
+                    self._pending -= 1
+                    self._queued_ids.discard(job_id)
+                raise
+
+            self._pool.submit(self._run, job["_id"])
+            return job, False
+
+        raise Exception("Failed to submit job: too much contention")
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Get a job by ID; an active job past its deadline is reported failed"""
+        job = self.collection.find_one({"_id": job_id})
+        if job is None:
+            return None
+        if job["status"] in ACTIVE and job["deadline"] <= datetime.utcnow():
+            self._finish(job_id, FAILED, error="Job abandoned", from_status=ACTIVE)
+            job = self.collection.find_one({"_id": job_id})
+            if job is None:
+                return None
+        job.pop("active_fingerprint", None)
+        return job
+
+    def _run(self, job_id: str) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._queued_ids.discard(job_id)
+
+        job = self.collection.find_one_and_update(
+            {"_id": job_id, "status": QUEUED},
+            {"$set": {"status": RUNNING, "started_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            return
+        # Correlate the job's log records with the request that created it
+        request_id_var.set(job.get("request_id", "-"))
+        if job["deadline"] <= datetime.utcnow():
+            self._finish(job_id, FAILED, error="Job expired before it could run")
+            return
+
+        try:
+            dt = self.dt_factory.get_dt_instance(job["dt_id"])
+            if dt is None:
+                raise ValueError(f"Digital Twin not found: {job['dt_id']}")
+            result = dt.execute_service(
+                job["service"], timeout=job["timeout"], **job["params"]
+            )
+        except Exception as e:
+            logger.warning("Job %s (%s) failed: %s", job_id, job["service"], e)
+            self._finish(job_id, FAILED, error=f"{type(e).__name__}: {str(e)}")
+            return
+
+        try:
+            self._finish(job_id, SUCCEEDED, result=result)
+        except Exception as e:
+            self._finish(job_id, FAILED, error=f"Failed to store result: {str(e)}")
+
+    def _finish(
+        self,
+        job_id: str,
+        status: str,
+        result=None,
+        error: str = None,
+        from_status: Optional[Tuple[str, ...]] = None,
+    ) -> None:
+        """Store the outcome of a job (if its status is in from_status, when given)"""
+        now = datetime.utcnow()
+        update = {
+            "status": status,
+            "finished_at": now,
+            "updated_at": now,
+            "expires_at": now + timedelta(seconds=self.result_ttl),
+        }
+        if status == SUCCEEDED:
+            update["result"] = result
+        else:
+            update["error"] = error
+        query = {"_id": job_id}
+        if from_status is not None:
+            query["status"] = {"$in": list(from_status)}
+        self.collection.update_one(
+            query, {"$set": update, "$unset": {"active_fingerprint": ""}}
+        )
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            pending = self._pending
+        return {"pending": pending, "max_pending": self.max_pending}
+
+    def shutdown(self, wait: bool = False) -> None:
+        """
+        Stop the runner threads
+
+        Jobs queued by this process that did not start are marked failed (and
+        stop deduplicating), so clients do not wait for them until their
+        deadline. Running jobs are left to finish, or to expire.
+        """
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        with self._lock:
+            job_ids, self._queued_ids = list(self._queued_ids), set()
+            self._pending -= len(job_ids)
+        for job_id in job_ids:
+            try:
+                self._finish(
+                    job_id,
+                    FAILED,
+                    error="Server shut down before the job started",
+                    from_status=(QUEUED,),
+                )
+            except Exception as e:
+                logger.warning("Job %s not marked failed on shutdown: %s", job_id, e)
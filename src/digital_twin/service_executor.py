@@ -0,0 +1,243 @@
+from typing import Any, Dict, Optional
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    TimeoutError as FutureTimeoutError,
+)
+import contextvars
+import sys
+import threading
+
+from src.observability.profiling import is_profiling
+
+# BaseService.execution_mode values
+INLINE_MODE = "inline"  # on the calling (request) thread
+THREAD_MODE = "thread"  # I/O bound services (e.g. database aggregations)
+PROCESS_MODE = "process"  # CPU bound services, bypassing the GIL
+
+# Context entries that cannot be sent to a worker process
+UNPICKLABLE_CONTEXT = ("db_service", "cancel_event")
+
+
+class ServiceRejectedError(Exception):
+    """Raised when the executor queue is full"""
+
+
+class ServiceTimeoutError(Exception):
+    """Raised when a service call exceeds its timeout"""
+
+
+def _run_service(service, data: Dict, kwargs: Dict) -> Any:
+    """Entry point of worker threads and processes"""
+    return service.execute(data, **kwargs)
+
+
+class ServiceExecutor:
+    """
+    Runs Digital Twin services off the request thread
+
+    Each service picks a pool with its `execution_mode` attribute: "thread"
+    for I/O bound services, "process" for CPU bound ones and "inline" to
+    keep running on the caller's thread. At most max_queue calls per pool
+    may be queued or running; further calls are rejected immediately
+    (ServiceRejectedError) instead of piling up.
+
+    Calls that exceed their timeout raise ServiceTimeoutError. A call that
+    has not started yet is cancelled; a running thread call is asked to stop
+    through the `cancel_event` (threading.Event) passed in its data, which
+    long running services should poll. Running process calls cannot be
+    interrupted and keep their slot until they finish.
+
+    While a profiler is active (sys.getprofile(), or a profiled request)
+    calls run inline, so that profiles include the service code.
+    """
+
+    def __init__(
+        self,
+        thread_workers: int = 8,
+        process_workers: int = 2,
+        max_queue: int = 64,
+        default_timeout: Optional[float] = 30.0,
+    ):
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+
+        self._pools: Dict[str, Any] = {}
+        self._slots = {
+            THREAD_MODE: threading.BoundedSemaphore(max_queue),
+            PROCESS_MODE: threading.BoundedSemaphore(max_queue),
+        }
+        self._lock = threading.Lock()
+        self._stats = {
+            mode: {
+                "submitted": 0,
+                "completed": 0,
+                "failed": 0,
+                "rejected": 0,
+                "timed_out": 0,
+                "cancelled": 0,
+                "in_flight": 0,
+            }
+            for mode in (INLINE_MODE, THREAD_MODE, PROCESS_MODE)
+        }
+
+    def _get_pool(self, mode: str):
+        pool = self._pools.get(mode)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(mode)
+                if pool is None:
+                    if mode == PROCESS_MODE:
+                        pool = ProcessPoolExecutor(max_workers=self.process_workers)
+                    else:
+                        pool = ThreadPoolExecutor(
+                            max_workers=self.thread_workers,
+                            thread_name_prefix="service-executor",
+                        )
+                    self._pools[mode] = pool
+        return pool
+
+    def _count(self, mode: str, counter: str, delta: int = 1) -> None:
+        with self._lock:
+            self._stats[mode][counter] += delta
+
+    @staticmethod
+    def get_mode(service) -> str:
+        mode = getattr(service, "execution_mode", INLINE_MODE)
+        if mode not in (INLINE_MODE, THREAD_MODE, PROCESS_MODE):
+            raise ValueError(f"Unknown execution mode for {service.name}: {mode}")
+        if mode != INLINE_MODE and (sys.getprofile() is not None or is_profiling()):
+            return INLINE_MODE
+        return mode
+
+    def submit(self, service, data: Dict, kwargs: Optional[Dict] = None) -> Future:
+        """
+        Schedule a service call and return its Future
+
+        Raises:
+            ServiceRejectedError: If the pool of the service is full
+        """
+        kwargs = kwargs or {}
+        mode = self.get_mode(service)
+        self._count(mode, "submitted")
+
+        if mode == INLINE_MODE:
+            future = Future()
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(_run_service(service, data, kwargs))
+                self._count(mode, "completed")
+            except Exception as e:
+                future.set_exception(e)
+                self._count(mode, "failed")
+            return future
+
+        if not self._slots[mode].acquire(blocking=False):
+            self._count(mode, "rejected")
+            raise ServiceRejectedError(
+                f"Service executor queue full ({self.max_queue} {mode} calls pending)"
+            )
+
+        if mode == PROCESS_MODE:
+            data = {k: v for k, v in data.items() if k not in UNPICKLABLE_CONTEXT}
+        else:
+            data = {**data, "cancel_event": threading.Event()}
+
+        self._count(mode, "in_flight")
+        try:
+            if mode == THREAD_MODE:
+                # Keep the caller's context variables (e.g. the request id for logs)
+                future = self._get_pool(mode).submit(
+                    contextvars.copy_context().run, _run_service, service, data, kwargs
+                )
+            else:
+                future = self._get_pool(mode).submit(
+                    _run_service, service, data, kwargs
+                )
+        except Exception:
+            self._count(mode, "in_flight", -1)
+            self._slots[mode].release()
+            raise
+        future.cancel_event = data.get("cancel_event")
+        future.add_done_callback(lambda f: self._on_done(mode, f))
+        return future
+
+    def _on_done(self, mode: str, future: Future) -> None:
+        self._slots[mode].release()
+        with self._lock:
+            stats = self._stats[mode]
+            stats["in_flight"] -= 1
+            if future.cancelled():
+                stats["cancelled"] += 1
+            elif future.exception() is not None:
+                stats["failed"] += 1
+            else:
+                stats["completed"] += 1
+
+    def cancel(self, future: Future) -> bool:
+        """
+        Cancel a call: queued calls are dropped, running thread calls are
+        signalled through their cancel_event
+
+        Returns:
+            bool: True if the call will not run (or was told to stop)
+        """
+        if future.cancel():
+            return True
+        cancel_event = getattr(future, "cancel_event", None)
+        if cancel_event is not None and not future.done():
+            cancel_event.set()
+            return True
+        return False
+
+    def run(
+        self,
+        service,
+        data: Dict,
+        kwargs: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        Run a service call and wait for its result
+
+        Args:
+            service: Service instance
+            data: Data passed to service.execute
+            kwargs: Keyword arguments passed to service.execute
+            timeout: Seconds to wait; defaults to the service's `timeout`
+                attribute, then to default_timeout
+
+        Raises:
+            ServiceRejectedError: If the pool of the service is full
+            ServiceTimeoutError: If the call did not finish in time
+        """
+        if timeout is None:
+            timeout = getattr(service, "timeout", None) or self.default_timeout
+
+        future = self.submit(service, data, kwargs)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self.cancel(future)
+            self._count(self.get_mode(service), "timed_out")
+            raise ServiceTimeoutError(
+                f"Service {service.name} did not finish within {timeout}s"
+            )
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = {mode: dict(counters) for mode, counters in self._stats.items()}
+        stats["max_queue"] = self.max_queue
+        stats["thread_workers"] = self.thread_workers
+        stats["process_workers"] = self.process_workers
+        return stats
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker pools, dropping calls that did not start"""
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,158 @@
+from typing import Dict, Optional
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+import json
+import logging
+import queue
+import sys
+import uuid
+
+from flask import g, request
+
+# Id of the request being handled, attached to every log record
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+REQUEST_ID_HEADER = "X-Request-ID"
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+DEFAULT_QUEUE_SIZE = 10000
+
+# LogRecord attributes that are not `extra` fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+    "request_id",
+}
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[logging.Handler] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Copy the current request id onto the record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks the caller
+
+    When the writer thread falls behind and the queue is full, records are
+    dropped and counted instead of stalling request threads.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(config: Optional[Dict] = None) -> logging.Handler:
+    """
+    Configure the root logger from the server.logging config section
+
+    Records are formatted on the calling thread only if they pass the level
+    checks, then handed to a bounded queue; a listener thread does the
+    actual writes to stderr. Calling it again replaces the previous setup
+    (e.g. in a gunicorn worker after fork, where the listener thread of the
+    master does not exist).
+
+    Args:
+        config: {"level", "format" ("text" or "json"), "queue_size",
+                 "levels" (logger name -> level)}
+
+    Returns:
+        logging.Handler: The handler installed on the root logger
+    """
+    global _listener, _handler
+    config = config or {}
+    stop_logging()
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    if config.get("format", "text") == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    queue_size = config.get("queue_size", DEFAULT_QUEUE_SIZE)
+    if queue_size:
+        handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        _listener = QueueListener(handler.queue, stream_handler)
+        _listener.start()
+    else:
+        handler = stream_handler
+    # Filters run on the calling thread, where the request id is set
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(config.get("level", "INFO"))
+    for name, level in (config.get("levels") or {}).items():
+        logging.getLogger(name).setLevel(level)
+
+    _handler = handler
+    return handler
+
+
+def stop_logging() -> None:
+    """Flush queued records and remove the handler installed by setup_logging"""
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+
+
+def get_dropped_records() -> int:
+    return getattr(_handler, "dropped", 0)
+
+
+def init_request_id(app) -> None:
+    """
+    Give every request an id (X-Request-ID, or a new one) for log correlation
+
+    The id is echoed in the X-Request-ID response header.
+    """
+    @app.before_request
+    def _set_request_id():
+        request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+        g.request_id_token = request_id_var.set(request_id[:64])
+
+    @app.after_request
+    def _add_request_id_header(response):
+        response.headers[REQUEST_ID_HEADER] = request_id_var.get()
+        return response
+
+    @app.teardown_request
+    def _reset_request_id(exc=None):
+        token = g.pop("request_id_token", None)
+        if token is not None:
+            request_id_var.reset(token)
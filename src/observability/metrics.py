@@ -0,0 +1,526 @@
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from bisect import bisect_left
+from contextvars import ContextVar
+import functools
+import inspect
+import math
+import threading
+import time
+
+from flask import Response, g, request
+from pymongo import monitoring
+
+from src.observability.logging_setup import get_dropped_records
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds; covers sub-millisecond Mongo commands up to slow service calls
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# DatabaseService method being executed, used to attribute Mongo commands
+db_method_var: ContextVar[str] = ContextVar("db_method", default="other")
+
+# (name, type, help, [(labels, value), ...]) produced by a collector at scrape time
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, *label_values, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        lines = self._header()
+        for label_values, value in values:
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}{labels} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *label_values, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, value: float, *label_values) -> None:
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *label_values) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                # [per-bucket counts (last one is +Inf), sum, count]
+                state = self._values[label_values] = [
+                    [0] * (len(self.buckets) + 1),
+                    0.0,
+                    0,
+                ]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()]
+        lines = self._header()
+        bucket_names = self.label_names + ("le",)
+        for label_values, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                labels = _format_labels(
+                    bucket_names, label_values + (_format_value(bound),)
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Minimal Prometheus-style metrics registry
+
+    Counters, gauges and histograms are updated in place (one lock
+    acquisition per update). Values owned by other components (cache hit
+    counters, pool statistics, ...) are read by collectors only when
+    /metrics is scraped. Metrics are per process: under gunicorn each
+    worker exposes its own values.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], Iterable[Family]]] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"Metric {name} already registered as {metric.type}")
+            return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labels)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labels, buckets)
+
+    def add_collector(
+        self, collector: Callable[[], Iterable[Family]], name: Optional[str] = None
+    ) -> None:
+        """
+        Register a callable returning metric families at scrape time
+
+        A collector registered under an existing name replaces it, so its
+        families are never reported twice.
+        """
+        with self._lock:
+            self._collectors[name or f"collector-{id(collector)}"] = collector
+
+    def clear_collectors(self) -> None:
+        with self._lock:
+            self._collectors.clear()
+
+    def render(self) -> str:
+        """Text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception:
+                # A component that is shutting down must not break the scrape
+                continue
+            for name, metric_type, help, samples in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    label_text = _format_labels(tuple(labels), tuple(labels.values()))
+                    lines.append(f"{name}{label_text} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests handled", ("method", "endpoint", "status")
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Time to handle an HTTP request (until the response is built)",
+    ("method", "endpoint"),
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled"
+)
+JSON_ENCODE_SECONDS = REGISTRY.histogram(
+    "json_encode_duration_seconds", "Time to encode JSON response bodies"
+)
+MONGO_COMMAND_SECONDS = REGISTRY.histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB round trips, by command and DatabaseService method",
+    ("command", "method"),
+)
+MONGO_COMMAND_FAILURES = REGISTRY.counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands", ("command", "method")
+)
+DB_METHOD_SECONDS = REGISTRY.histogram(
+    "db_service_method_duration_seconds",
+    "Time spent in DatabaseService methods",
+    ("method",),
+)
+SERVICE_EXECUTE_SECONDS = REGISTRY.histogram(
+    "dt_service_execute_duration_seconds",
+    "Digital Twin service calls (execute_service)",
+    ("service", "outcome"),
+)
+
+
+def timed_db_method(func):
+    """
+    Time a DatabaseService method and attribute its Mongo commands to it
+
+    Generator methods are timed while they produce items, not while the
+    consumer holds them, and observed once the stream ends.
+    """
+    name = func.__name__
+
+    if inspect.isgeneratorfunction(func):
+
+        @functools.wraps(func)
+        def gen_wrapper(*args, **kwargs):
+            gen = func(*args, **kwargs)
+            elapsed = 0.0
+            try:
+                while True:
+                    # Set per step: the consumer may resume us in another context
+                    token = db_method_var.set(name)
+                    start = time.perf_counter()
+                    try:
+                        item = next(gen)
+                    except StopIteration:
+                        return
+                    finally:
+                        elapsed += time.perf_counter() - start
+                        db_method_var.reset(token)
+                    yield item
+            finally:
+                gen.close()
+                DB_METHOD_SECONDS.observe(elapsed, name)
+
+        return gen_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = db_method_var.set(name)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            DB_METHOD_SECONDS.observe(time.perf_counter() - start, name)
+            db_method_var.reset(token)
+
+    return wrapper
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """
+    Records the duration of every MongoDB command
+
+    Pass an instance in MongoClient(event_listeners=[...]). Events of the
+    synchronous driver are published on the thread that ran the command,
+    so the current DatabaseService method (timed_db_method) is known.
+    """
+
+    def started(self, event) -> None:
+        pass
+
+    def succeeded(self, event) -> None:
+        MONGO_COMMAND_SECONDS.observe(
+            event.duration_micros / 1e6, event.command_name, db_method_var.get()
+        )
+
+    def failed(self, event) -> None:
+        method = db_method_var.get()
+        MONGO_COMMAND_SECONDS.observe(
+            event.duration_micros / 1e6, event.command_name, method
+        )
+        MONGO_COMMAND_FAILURES.inc(event.command_name, method)
+
+
+def _family(name: str, metric_type: str, help: str, value, labels=None) -> Family:
+    return (name, metric_type, help, [(labels or {}, value)])
+
+
+def _collect_components(config) -> List[Family]:
+    """Gauges and counters read from the components stored in the Flask app config"""
+    families = []
+
+    dt_factory = config.get("DT_FACTORY")
+    if dt_factory is not None:
+        stats = dt_factory.instance_cache.get_stats()
+        families += [
+            _family(
+                "dt_instance_cache_hits_total",
+                "counter",
+                "DT instance cache hits",
+                stats["hits"],
+            ),
+            _family(
+                "dt_instance_cache_misses_total",
+                "counter",
+                "DT instance cache misses",
+                stats["misses"],
+            ),
+            _family(
+                "dt_instance_cache_hit_ratio",
+                "gauge",
+                "DT instance cache hit ratio since start",
+                stats["hit_ratio"],
+            ),
+            _family(
+                "dt_instance_cache_size", "gauge", "Cached DT instances", stats["size"]
+            ),
+            _family(
+                "dt_instance_cache_evictions_total",
+                "counter",
+                "DT instance cache evictions",
+                stats["evictions"],
+            ),
+        ]
+
+    db_service = config.get("DB_SERVICE")
+    if db_service is not None:
+        stats = db_service.pool_monitor.get_stats()
+        families += [
+            _family(
+                "mongodb_pool_connections_in_use",
+                "gauge",
+                "Connections checked out of the pool",
+                stats["in_use"],
+            ),
+            _family(
+                "mongodb_pool_connections_open",
+                "gauge",
+                "Open pool connections",
+                stats["open_connections"],
+            ),
+            _family(
+                "mongodb_pool_checkouts_total",
+                "counter",
+                "Connection checkouts",
+                stats["checkouts"],
+            ),
+            _family(
+                "mongodb_pool_checkout_wait_p95_seconds",
+                "gauge",
+                "p95 wait for a pool connection over recent checkouts",
+                stats["wait_p95_ms"] / 1000,
+            ),
+            (
+                "mongodb_pool_checkout_failures_total",
+                "counter",
+                "Failed connection checkouts",
+                [
+                    ({"reason": reason}, count)
+                    for reason, count in stats["checkout_failures"].items()
+                ],
+            ),
+        ]
+
+    executor = config.get("SERVICE_EXECUTOR")
+    if executor is not None:
+        stats = executor.get_stats()
+        modes = ("inline", "thread", "process")
+        for counter, metric_type, name, help in (
+            (
+                "in_flight",
+                "gauge",
+                "service_executor_in_flight",
+                "Service calls queued or running",
+            ),
+            (
+                "rejected",
+                "counter",
+                "service_executor_rejected_total",
+                "Service calls rejected (queue full)",
+            ),
+            (
+                "timed_out",
+                "counter",
+                "service_executor_timed_out_total",
+                "Service calls that timed out",
+            ),
+        ):
+            families.append(
+                (
+                    name,
+                    metric_type,
+                    help,
+                    [({"mode": mode}, stats[mode][counter]) for mode in modes],
+                )
+            )
+
+    buffer = config.get("MEASUREMENT_BUFFER")
+    if buffer is not None:
+        stats = buffer.get_stats()
+        families += [
+            _family(
+                "measurement_buffer_pending",
+                "gauge",
+                "Measurements waiting to be written",
+                stats["pending"],
+            ),
+            _family(
+                "measurement_buffer_rejected_total",
+                "counter",
+                "Measurements rejected (buffer full)",
+                stats["rejected"],
+            ),
+        ]
+
+    job_manager = config.get("JOB_MANAGER")
+    if job_manager is not None:
+        families.append(
+            _family(
+                "service_jobs_pending",
+                "gauge",
+                "Service jobs waiting for a runner",
+                job_manager.get_stats()["pending"],
+            )
+        )
+
+    families.append(
+        _family(
+            "log_records_dropped_total",
+            "counter",
+            "Log records dropped because the log queue was full",
+            get_dropped_records(),
+        )
+    )
+    return families
+
+
+def init_metrics(app, registry: Optional[MetricsRegistry] = None) -> None:
+    """
+    Time every request and expose the registry on GET /metrics
+
+    Requests are labelled by URL rule (e.g. /api/dt/<dt_id>), not by path,
+    to keep the number of series bounded. The component collector replaces
+    the one of any app initialized before on the same registry.
+    """
+    registry = registry or REGISTRY
+    registry.add_collector(lambda: _collect_components(app.config), name="components")
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_start = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+
+    @app.after_request
+    def _record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _observe_request(exc=None):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return
+        HTTP_IN_FLIGHT.dec()
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        status = g.pop("metrics_status", 500)
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start, request.method, endpoint
+        )
+        HTTP_REQUESTS.inc(request.method, endpoint, str(status))
+
+    def metrics():
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+    app.add_url_rule("/metrics", "metrics", metrics, methods=["GET"])
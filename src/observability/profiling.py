@@ -0,0 +1,274 @@
+"""
+Opt-in profiling of individual API requests
+
+A request is profiled when it matches the configured paths while profiling
+is enabled, or when it carries a valid signed X-Profile header. Generate a
+header value (valid for token_max_age seconds) with:
+
+    DT_PROFILE_SECRET=... python -m src.observability.profiling token [--mode sampling]
+"""
+
+from typing import Dict, List, Optional
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+import argparse
+import cProfile
+import json
+import marshal
+import os
+import re
+import sys
+import threading
+import time
+
+from flask import g, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from src.observability.logging_setup import request_id_var
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+CPROFILE = "cprofile"  # deterministic; pstats file (.prof)
+SAMPLING = "sampling"  # stack sampling; collapsed stacks for flamegraphs (.folded)
+EXTENSIONS = {CPROFILE: ".prof", SAMPLING: ".folded"}
+TOKEN_SALT = "dt-profile"
+DEFAULT_SECRET_ENV = "DT_PROFILE_SECRET"
+
+# Set while the current request is profiled; work that would normally move
+# to other threads (service executor, DR fetch workers) stays on the
+# request thread so that the profile covers it
+profiling_active_var: ContextVar[bool] = ContextVar("profiling_active", default=False)
+
+
+def is_profiling() -> bool:
+    return profiling_active_var.get()
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread at a fixed interval
+
+    Produces collapsed stacks ("outer;...;inner count" lines), the input
+    format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="profile-sampler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.items())
+
+
+class ProfileStore:
+    """
+    Bounded on-disk ring of request profiles
+
+    Each profile is a .prof or .folded file with a .json sidecar holding
+    the request details. Once max_files profiles are stored the oldest
+    ones are deleted.
+    """
+
+    def __init__(self, directory: str = "profiles", max_files: int = 50):
+        self.directory = os.path.abspath(directory)
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def save(self, profile_mode: str, data: bytes, info: Dict) -> str:
+        """Write a profile and its details; returns the profile file name"""
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", info.get("path", "")).strip("-")[:60]
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        name = f"{stamp}_{slug or 'root'}{EXTENSIONS[profile_mode]}"
+        with self._lock:
+            with open(os.path.join(self.directory, name), "wb") as f:
+                f.write(data)
+            with open(os.path.join(self.directory, name + ".json"), "w") as f:
+                json.dump({**info, "file": name, "profiler": profile_mode}, f)
+            self._prune()
+        return name
+
+    def _profile_files(self) -> List[str]:
+        extensions = tuple(EXTENSIONS.values())
+        return sorted(
+            name for name in os.listdir(self.directory) if name.endswith(extensions)
+        )
+
+    def _prune(self) -> None:
+        files = self._profile_files()
+        for name in files[: max(0, len(files) - self.max_files)]:
+            for path in (name, name + ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, path))
+                except FileNotFoundError:
+                    pass
+
+    def list(self) -> List[Dict]:
+        """Stored profiles, newest first"""
+        profiles = []
+        for name in reversed(self._profile_files()):
+            try:
+                with open(os.path.join(self.directory, name + ".json")) as f:
+                    info = json.load(f)
+            except (OSError, ValueError):
+                info = {"file": name}
+            profiles.append(info)
+        return profiles
+
+    def has(self, name: str) -> bool:
+        return name in self._profile_files()
+
+
+def _serializer(secret: str) -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(secret, salt=TOKEN_SALT)
+
+
+def sign_profile_token(secret: str, profile_mode: str = CPROFILE) -> str:
+    """Create a X-Profile header value"""
+    if profile_mode not in EXTENSIONS:
+        raise ValueError(f"Unknown profiler: {profile_mode}")
+    return _serializer(secret).dumps({"mode": profile_mode})
+
+
+class ProfilingMiddleware:
+    """
+    Profiles selected Flask requests and stores the results in a ProfileStore
+
+    Args:
+        app: Flask app
+        config: server.profiling section: enabled, paths, profiler,
+            sample_interval_ms, directory, max_files, secret_env, token_max_age
+    """
+
+    def __init__(self, app, config: Dict):
+        self.enabled = config.get("enabled", False)
+        self.paths = tuple(config.get("paths") or ())
+        self.profiler = config.get("profiler", CPROFILE)
+        if self.profiler not in EXTENSIONS:
+            raise ValueError(f"Unknown profiler: {self.profiler}")
+        self.sample_interval = config.get("sample_interval_ms", 5) / 1000
+        self.token_max_age = config.get("token_max_age", 3600)
+        secret = os.environ.get(config.get("secret_env", DEFAULT_SECRET_ENV))
+        self.serializer = _serializer(secret) if secret else None
+        self.store = ProfileStore(
+            config.get("directory", "profiles"), config.get("max_files", 50)
+        )
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+
+    def _requested_mode(self) -> Optional[str]:
+        """Profiler to use for the current request, None to skip it"""
+        token = request.headers.get(PROFILE_HEADER)
+        if token and self.serializer is not None:
+            try:
+                payload = self.serializer.loads(token, max_age=self.token_max_age)
+            except BadSignature:
+                return None
+            return payload.get("mode", self.profiler)
+        if self.enabled and (not self.paths or request.path.startswith(self.paths)):
+            return self.profiler
+        return None
+
+    def _start(self):
+        profile_mode = self._requested_mode()
+        if profile_mode not in EXTENSIONS:
+            return
+        g.profile_token = profiling_active_var.set(True)
+        g.profile_mode = profile_mode
+        g.profile_started = time.perf_counter()
+        if profile_mode == SAMPLING:
+            g.profiler = StackSampler(threading.get_ident(), self.sample_interval)
+            g.profiler.start()
+        else:
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    def _stop(self):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return None
+        if isinstance(profiler, StackSampler):
+            profiler.stop()
+        else:
+            profiler.disable()
+        profiling_active_var.reset(g.pop("profile_token"))
+        return profiler
+
+    def _finish(self, response):
+        profiler = self._stop()
+        if profiler is None:
+            return response
+        info = {
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.url_rule.rule if request.url_rule else None,
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - g.profile_started) * 1000, 3),
+            "request_id": request_id_var.get(),
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        if isinstance(profiler, StackSampler):
+            info["samples"] = sum(profiler.samples.values())
+            data = profiler.collapsed().encode()
+        else:
+            profiler.create_stats()
+            data = _marshal_stats(profiler)
+        response.headers[PROFILE_ID_HEADER] = self.store.save(
+            g.profile_mode, data, info
+        )
+        return response
+
+    def _teardown(self, exc=None):
+        # after_request does not run when the response could not be built
+        self._stop()
+
+
+def _marshal_stats(profiler: cProfile.Profile) -> bytes:
+    """Serialize stats in the pstats file format (loadable with pstats.Stats, snakeviz)"""
+    return marshal.dumps(profiler.stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request profiling tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    token_parser = subparsers.add_parser("token", help="Print a X-Profile header value")
+    token_parser.add_argument("--mode", choices=sorted(EXTENSIONS), default=CPROFILE)
+    token_parser.add_argument("--secret-env", default=DEFAULT_SECRET_ENV)
+    args = parser.parse_args()
+
+    secret = os.environ.get(args.secret_env)
+    if not secret:
+        parser.error(f"{args.secret_env} is not set")
+    print(sign_profile_token(secret, args.mode))
+
+
+if __name__ == "__main__":
+    main()
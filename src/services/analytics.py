@@ -1,17 +1,213 @@
-from typing import List, Dict
-from datetime import datetime
-from .base import BaseService
-
-from typing import List, Dict, Any
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timedelta, timezone
 from .base import BaseService
 import statistics
+import math
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the statistics module is the fallback
+    np = None
+
+
+# Execution modes
+AUTO_MODE = 'auto'  # server-side when measurements are not loaded in memory
+SERVER_MODE = 'server'  # always push the computation down to MongoDB
+PYTHON_MODE = 'python'  # always compute in-process
+ROLLUP_MODE = 'rollup'  # always answer from the incremental rollups
+
+# In-process engines
+NUMPY_ENGINE = 'numpy'
+PYTHON_ENGINE = 'python'
+
+# Reported as p50/p95/p99 when percentiles are requested
+PERCENTILES = (50, 95, 99)
+
+# Time windows: suffix -> ($dateTrunc unit, seconds per unit)
+WINDOW_UNITS = {
+    's': ('second', 1),
+    'm': ('minute', 60),
+    'h': ('hour', 3600),
+    'd': ('day', 86400),
+}
+# Statistics that can be requested per window bucket
+BUCKET_AGGREGATES = ('count', 'sum', 'mean', 'min', 'max', 'stddev')
+DEFAULT_BUCKET_AGGREGATES = ('count', 'mean', 'min', 'max', 'stddev')
+# $dateTrunc aligns bins with binSize > 1 on this reference date
+BUCKET_ORIGIN = datetime(2000, 1, 1)
+_ONE_MS = timedelta(milliseconds=1)
+
+
+def parse_window(window: str) -> Tuple[str, int, int]:
+    """
+    Parse a window such as '1m', '15m', '1h' or '1d'
+
+    Returns:
+        Tuple[str, int, int]: ($dateTrunc unit, binSize, window length in seconds)
+    """
+    window = (window or '').strip()
+    suffix, amount = window[-1:], window[:-1]
+    if suffix not in WINDOW_UNITS or not amount.isdigit() or int(amount) <= 0:
+        raise ValueError(f"Invalid window '{window}': expected <n>s, <n>m, <n>h or <n>d")
+    unit, seconds = WINDOW_UNITS[suffix]
+    return unit, int(amount), int(amount) * seconds
+
+
+def parse_aggregates(agg) -> Tuple[str, ...]:
+    """Parse the requested bucket statistics ('mean,max' or a list)"""
+    if not agg:
+        return DEFAULT_BUCKET_AGGREGATES
+    names = agg.split(',') if isinstance(agg, str) else list(agg)
+    names = tuple(name.strip() for name in names if name.strip())
+    unknown = [name for name in names if name not in BUCKET_AGGREGATES]
+    if unknown:
+        raise ValueError(f"Unknown aggregates {unknown}: expected any of {list(BUCKET_AGGREGATES)}")
+    return names
+
+
+def to_utc_datetime(value) -> datetime:
+    """Normalise a datetime or ISO-8601 string to a naive UTC datetime"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if not isinstance(value, datetime):
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def bucketize_python(timestamps: List[datetime], values: List, window_seconds: int,
+                     aggregates: Tuple[str, ...]) -> List[Dict]:
+    """Bucket points into fixed windows; only non-empty buckets are returned"""
+    window_ms = window_seconds * 1000
+    buckets = {}
+    for timestamp, value in zip(timestamps, values):
+        offset_ms = (timestamp - BUCKET_ORIGIN) // _ONE_MS
+        buckets.setdefault(offset_ms // window_ms, []).append(float(value))
+
+    series = []
+    for index in sorted(buckets):
+        bucket_values = buckets[index]
+        count = len(bucket_values)
+        total = math.fsum(bucket_values)
+        stats = {
+            'count': count,
+            'sum': total,
+            'mean': total / count,
+            'min': min(bucket_values),
+            'max': max(bucket_values),
+            'stddev': statistics.stdev(bucket_values) if count > 1 else 0,
+        }
+        bucket = {'start': BUCKET_ORIGIN + index * _ONE_MS * window_ms}
+        bucket.update({name: stats[name] for name in aggregates})
+        series.append(bucket)
+    return series
+
+
+def bucketize_numpy(timestamps: List[datetime], values, window_seconds: int,
+                    aggregates: Tuple[str, ...]) -> List[Dict]:
+    """Vectorized bucketing into fixed windows; only non-empty buckets are returned"""
+    window_ms = window_seconds * 1000
+    origin_ms = np.datetime64(BUCKET_ORIGIN, 'ms').astype(np.int64)
+    times_ms = np.array(timestamps, dtype='datetime64[ms]').astype(np.int64)
+    array = np.ascontiguousarray(values, dtype=np.float64)
+
+    keys, inverse = np.unique((times_ms - origin_ms) // window_ms, return_inverse=True)
+    counts = np.bincount(inverse)
+    sums = np.bincount(inverse, weights=array)
+    means = sums / counts
+
+    columns = {'count': counts, 'sum': sums, 'mean': means}
+    if 'min' in aggregates or 'max' in aggregates:
+        order = np.argsort(inverse, kind='stable')
+        boundaries = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        columns['min'] = np.minimum.reduceat(array[order], boundaries)
+        columns['max'] = np.maximum.reduceat(array[order], boundaries)
+    if 'stddev' in aggregates:
+        deviations = array - means[inverse]
+        squares = np.bincount(inverse, weights=deviations * deviations)
+        columns['stddev'] = np.where(counts > 1, np.sqrt(squares / np.maximum(counts - 1, 1)), 0.0)
+
+    starts = (keys * window_ms + origin_ms).astype('datetime64[ms]').tolist()
+    series = []
+    for i, bucket_start in enumerate(starts):
+        bucket = {'start': bucket_start}
+        for name in aggregates:
+            bucket[name] = int(columns[name][i]) if name == 'count' else float(columns[name][i])
+        series.append(bucket)
+    return series
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """Percentile with linear interpolation (same definition as numpy.percentile)"""
+    position = (len(sorted_values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def compute_stats_python(values: List, percentiles: bool = False) -> Dict:
+    """Compute count/mean/min/max/stddev (and percentiles) with the statistics module"""
+    values = [float(value) for value in values]
+    stats = {
+        'count': len(values),
+        'mean': statistics.mean(values),
+        'min': min(values),
+        'max': max(values),
+        'stddev': statistics.stdev(values) if len(values) > 1 else 0
+    }
+    if percentiles:
+        sorted_values = sorted(values)
+        for q in PERCENTILES:
+            stats[f'p{q}'] = _percentile(sorted_values, q)
+    return stats
+
+
+def compute_stats_numpy(values, percentiles: bool = False) -> Dict:
+    """Compute count/mean/min/max/stddev (and percentiles) on a contiguous float64 array"""
+    array = np.ascontiguousarray(values, dtype=np.float64)
+    if array.size == 0:
+        raise ValueError("no values to aggregate")
+    stats = {
+        'count': int(array.size),
+        'mean': float(array.mean()),
+        'min': float(array.min()),
+        'max': float(array.max()),
+        'stddev': float(array.std(ddof=1)) if array.size > 1 else 0
+    }
+    if percentiles:
+        for q, value in zip(PERCENTILES, np.percentile(array, PERCENTILES)):
+            stats[f'p{q}'] = float(value)
+    return stats
 
 
 class AggregationService(BaseService):
     """Service for aggregating measurements across different Digital Replicas"""
 
-    def execute(self, data: Dict, dr_type: str = None, attribute: str = None) -> Dict:
+    # Mostly waits on MongoDB aggregations (NumPy releases the GIL otherwise)
+    execution_mode = 'thread'
+
+    def __init__(self):
+        super().__init__()
+        self.mode = AUTO_MODE
+        self.engine = NUMPY_ENGINE if np is not None else PYTHON_ENGINE
+
+    def configure(self, config: Dict) -> None:
+        """Configure the service (supported keys: 'mode', 'engine')"""
+        mode = config.get('mode', self.mode)
+        if mode not in (AUTO_MODE, SERVER_MODE, PYTHON_MODE, ROLLUP_MODE):
+            raise ValueError(f"Unknown aggregation mode: {mode}")
+        engine = config.get('engine', self.engine)
+        if engine not in (NUMPY_ENGINE, PYTHON_ENGINE):
+            raise ValueError(f"Unknown aggregation engine: {engine}")
+        if engine == NUMPY_ENGINE and np is None:
+            raise ValueError("The numpy engine requires NumPy to be installed")
+        self.mode = mode
+        self.engine = engine
+
+    def execute(self, data: Dict, dr_type: str = None, attribute: str = None,
+                mode: str = None, window: str = None, start=None, end=None,
+                agg=None, percentiles: bool = False) -> Dict:
         """
         Execute aggregation on measurements from specified DR type
 
@@ -19,9 +215,25 @@ class AggregationService(BaseService):
             data: Dictionary containing the DT data including all DRs
             dr_type: Type of DR to aggregate (e.g., 'bottle', 'device')
             attribute: Specific measurement type to aggregate (e.g., 'temperature')
+            mode: Optional override of the configured execution mode
+            window: Optional bucket size ('1m', '1h', '1d', ...); when set, a
+                series of per-window statistics is returned instead of one summary
+            start: Optional inclusive lower time bound (datetime or ISO string)
+            end: Optional exclusive upper time bound (datetime or ISO string)
+            agg: Statistics reported per bucket (e.g. 'mean,max'), see BUCKET_AGGREGATES
+            percentiles: Also report p50/p95/p99 of the summary, whatever the
+                path: exact in-process, $percentile (approximate, MongoDB 7.0+)
+                server-side. Rollups cannot answer such queries.
         """
         if not data or 'digital_replicas' not in data:
             raise ValueError("Invalid data: missing digital replicas")
+        if percentiles and window:
+            raise ValueError("percentiles are only available without window")
+
+        window_spec = parse_window(window) if window else None
+        aggregates = parse_aggregates(agg)
+        start = to_utc_datetime(start) if start else None
+        end = to_utc_datetime(end) if end else None
 
         # Filter DRs by type if specified
         drs = [dr for dr in data['digital_replicas'] if dr_type is None or dr['type'] == dr_type]
@@ -29,43 +241,289 @@ class AggregationService(BaseService):
         if not drs:
             return {"error": f"No digital replicas found of type {dr_type}"}
 
-        # Collect all measurements
-        all_measurements = []
-        for dr in drs:
-            if 'data' in dr and 'measurements' in dr['data']:
-                measurements = dr['data']['measurements']
-                if attribute:
-                    # Filter measurements by attribute
-                    measurements = [m for m in measurements
-                                    if m['measure_type'] == attribute]
-                all_measurements.extend(measurements)
+        mode = mode or self.mode
+        db_service = data.get('db_service')
+
+        rollup_store = getattr(db_service, 'rollup_store', None)
+        if mode == ROLLUP_MODE and percentiles:
+            raise ValueError("Percentiles cannot be answered from rollups")
+        if mode in (AUTO_MODE, ROLLUP_MODE) and not percentiles:
+            granularity = rollup_store.choose_granularity(
+                window_spec[2] if window_spec else None, start, end) if rollup_store else None
+            # Rollups only hold what was written after they were enabled: auto
+            # mode uses them once a backfill has completed, raw data otherwise
+            if granularity and mode == AUTO_MODE:
+                if not rollup_store.is_backfilled([dr['type'] for dr in drs]):
+                    granularity = None
+            if granularity:
+                return self._execute_rollups(rollup_store, granularity, drs, attribute,
+                                             window, window_spec, aggregates, start, end)
+            if mode == ROLLUP_MODE:
+                raise ValueError("This query cannot be answered from rollups: rollups must be "
+                                 "enabled and window/from/to aligned to minutes, hours or days")
+
+        if self._use_server(mode, db_service, drs):
+            try:
+                if window_spec:
+                    return self._execute_window_pipeline(
+                        db_service, drs, attribute, window, window_spec, aggregates, start, end)
+                return self._execute_pipeline(db_service, drs, attribute, start, end,
+                                              percentiles)
+            except Exception:
+                # The in-Python path is the fallback, unless explicitly disabled
+                if mode == SERVER_MODE:
+                    raise
+
+        store = self._get_measurement_store(data)
+        timed = bool(window_spec or start or end)
+        if store is not None:
+            grouped_measurements = self._collect_from_store(store, drs, attribute, start, end, timed)
+        else:
+            if db_service is not None and not self._has_embedded_measurements(drs):
+                # The twin was loaded without its measurement arrays
+                drs = self._load_embedded(db_service, drs)
+            grouped_measurements = self._collect_embedded(drs, attribute, start, end, timed)
 
-        if not all_measurements:
+        if not grouped_measurements:
             return {"error": f"No measurements found for attribute {attribute}"}
 
-        # Group measurements by type
-        grouped_measurements = {}
-        for measure in all_measurements:
-            measure_type = measure['measure_type']
-            if measure_type not in grouped_measurements:
-                grouped_measurements[measure_type] = []
-            grouped_measurements[measure_type].append(float(measure['value']))
+        if window_spec:
+            bucketize = bucketize_numpy if self.engine == NUMPY_ENGINE else bucketize_python
+            return {
+                measure_type: self._window_result(
+                    window, start, end, bucketize(timestamps, values, window_spec[2], aggregates))
+                for measure_type, (timestamps, values) in grouped_measurements.items()
+            }
 
         # Calculate statistics for each measurement type
+        compute_stats = compute_stats_numpy if self.engine == NUMPY_ENGINE else compute_stats_python
         stats = {}
-        for measure_type, values in grouped_measurements.items():
+        for measure_type, (_, values) in grouped_measurements.items():
             try:
-                stats[measure_type] = {
-                    'count': len(values),
-                    'mean': statistics.mean(values),
-                    'min': min(values),
-                    'max': max(values),
-                    'stddev': statistics.stdev(values) if len(values) > 1 else 0
-                }
-            except (statistics.StatisticsError, ValueError) as e:
+                stats[measure_type] = compute_stats(values, percentiles)
+            except (statistics.StatisticsError, ValueError, TypeError) as e:
                 stats[measure_type] = {
                     'error': str(e),
                     'count': len(values)
                 }
 
-        return stats
\ No newline at end of file
+        return stats
+
+    @staticmethod
+    def _window_result(window: str, start: Optional[datetime], end: Optional[datetime],
+                       buckets: List[Dict]) -> Dict:
+        return {'window': window, 'from': start, 'to': end, 'buckets': buckets}
+
+    @staticmethod
+    def _has_embedded_measurements(drs: List[Dict]) -> bool:
+        return all('measurements' in dr.get('data', {}) for dr in drs)
+
+    def _use_server(self, mode: str, db_service, drs: List[Dict]) -> bool:
+        """Decide whether the aggregation runs as a MongoDB pipeline"""
+        if db_service is None or mode == PYTHON_MODE:
+            if mode == SERVER_MODE:
+                raise ValueError("Server-side aggregation requires a database service")
+            return False
+        if mode == SERVER_MODE:
+            return True
+        # Auto: push down unless the measurements are already in memory
+        return (getattr(db_service, 'measurement_store', None) is not None
+                or not self._has_embedded_measurements(drs))
+
+    @staticmethod
+    def _ids_by_type(drs: List[Dict]) -> Dict[str, List[str]]:
+        ids_by_type = {}
+        for dr in drs:
+            ids_by_type.setdefault(dr['type'], []).append(dr['_id'])
+        return ids_by_type
+
+    def _execute_pipeline(self, db_service, drs: List[Dict], attribute: str = None,
+                          start: datetime = None, end: datetime = None,
+                          percentiles: bool = False) -> Dict:
+        """Compute the statistics with a $group stage run by MongoDB"""
+        group = {
+            '_id': '$measure_type',
+            'count': {'$sum': 1},
+            'mean': {'$avg': '$value'},
+            'min': {'$min': '$value'},
+            'max': {'$max': '$value'},
+            'stddev': {'$stdDevSamp': '$value'},
+        }
+        if percentiles:
+            # MongoDB 7.0+; older servers fail here and auto mode falls back
+            group['percentiles'] = {'$percentile': {
+                'input': '$value',
+                'p': [q / 100 for q in PERCENTILES],
+                'method': 'approximate',
+            }}
+        results = db_service.aggregate_measurements(
+            self._ids_by_type(drs),
+            [{'$group': group}],
+            measure_type=attribute,
+            start=start,
+            end=end,
+            timestamps=False,
+        )
+
+        if not results:
+            return {"error": f"No measurements found for attribute {attribute}"}
+
+        stats = {}
+        for row in results:
+            stats[row['_id']] = {
+                'count': row['count'],
+                'mean': row['mean'],
+                'min': row['min'],
+                'max': row['max'],
+                # $stdDevSamp is null for a single value
+                'stddev': row['stddev'] if row['count'] > 1 else 0
+            }
+            if percentiles:
+                for q, value in zip(PERCENTILES, row['percentiles']):
+                    stats[row['_id']][f'p{q}'] = value
+        return stats
+
+    def _execute_window_pipeline(self, db_service, drs: List[Dict], attribute: str,
+                                 window: str, window_spec: Tuple[str, int, int],
+                                 aggregates: Tuple[str, ...], start: datetime = None,
+                                 end: datetime = None) -> Dict:
+        """Compute per-window statistics with $dateTrunc buckets run by MongoDB"""
+        unit, bin_size, _ = window_spec
+        accumulators = {
+            'count': {'$sum': 1},
+            'sum': {'$sum': '$value'},
+            'mean': {'$avg': '$value'},
+            'min': {'$min': '$value'},
+            'max': {'$max': '$value'},
+            'stddev': {'$stdDevSamp': '$value'},
+        }
+        group = {
+            '_id': {
+                'measure_type': '$measure_type',
+                'start': {'$dateTrunc': {'date': '$timestamp', 'unit': unit, 'binSize': bin_size}},
+            },
+            # count is always needed to report stddev of single-point buckets as 0
+            'count': accumulators['count'],
+        }
+        for name in aggregates:
+            group[name] = accumulators[name]
+
+        results = db_service.aggregate_measurements(
+            self._ids_by_type(drs),
+            [{'$group': group}, {'$sort': {'_id.start': 1}}],
+            measure_type=attribute,
+            start=start,
+            end=end,
+        )
+
+        if not results:
+            return {"error": f"No measurements found for attribute {attribute}"}
+
+        series = {}
+        for row in results:
+            bucket = {'start': row['_id']['start']}
+            for name in aggregates:
+                value = row[name]
+                if name == 'stddev' and row['count'] <= 1:
+                    value = 0
+                bucket[name] = value
+            series.setdefault(row['_id']['measure_type'], []).append(bucket)
+
+        return {
+            measure_type: self._window_result(window, start, end, buckets)
+            for measure_type, buckets in series.items()
+        }
+
+    def _execute_rollups(self, rollup_store, granularity: str, drs: List[Dict], attribute: str,
+                         window: str, window_spec: Optional[Tuple[str, int, int]],
+                         aggregates: Tuple[str, ...], start: datetime = None,
+                         end: datetime = None) -> Dict:
+        """Answer from the pre-aggregated rollups instead of raw measurements"""
+        rows = rollup_store.query(
+            self._ids_by_type(drs),
+            granularity,
+            measure_type=attribute,
+            start=start,
+            end=end,
+            window=window_spec[:2] if window_spec else None,
+        )
+
+        if not rows:
+            return {"error": f"No measurements found for attribute {attribute}"}
+
+        if not window_spec:
+            return {
+                row['measure_type']: {name: row[name] for name in DEFAULT_BUCKET_AGGREGATES}
+                for row in rows
+            }
+
+        series = {}
+        for row in rows:
+            bucket = {'start': row['start']}
+            bucket.update({name: row[name] for name in aggregates})
+            series.setdefault(row['measure_type'], []).append(bucket)
+        return {
+            measure_type: self._window_result(window, start, end, buckets)
+            for measure_type, buckets in series.items()
+        }
+
+    @staticmethod
+    def _get_measurement_store(data: Dict):
+        """Return the time-series measurement store, if the DT uses one"""
+        db_service = data.get('db_service')
+        return getattr(db_service, 'measurement_store', None)
+
+    def _load_embedded(self, db_service, drs: List[Dict]) -> List[Dict]:
+        """Read the embedded measurement arrays of DRs loaded without them"""
+        loaded = []
+        for dr_type, dr_ids in self._ids_by_type(drs).items():
+            loaded.extend(db_service.get_drs(dr_type, dr_ids, fields=['data.measurements']))
+        return loaded
+
+    @staticmethod
+    def _collect_embedded(drs: List[Dict], attribute: str = None, start: datetime = None,
+                          end: datetime = None, timed: bool = False) -> Dict[str, Tuple]:
+        """
+        Group raw measurement values embedded in DR documents by measure type
+
+        Returns measure_type -> (timestamps, values); timestamps are only
+        collected (and start/end only applied) when timed is set, otherwise None.
+        """
+        grouped_measurements = {}
+        for dr in drs:
+            if 'data' in dr and 'measurements' in dr['data']:
+                for measure in dr['data']['measurements']:
+                    measure_type = measure['measure_type']
+                    # Filter measurements by attribute
+                    if attribute and measure_type != attribute:
+                        continue
+                    if timed:
+                        timestamp = to_utc_datetime(measure['timestamp'])
+                        if (start and timestamp < start) or (end and timestamp >= end):
+                            continue
+                    if measure_type not in grouped_measurements:
+                        grouped_measurements[measure_type] = ([] if timed else None, [])
+                    if timed:
+                        grouped_measurements[measure_type][0].append(timestamp)
+                    grouped_measurements[measure_type][1].append(measure['value'])
+        return grouped_measurements
+
+    def _collect_from_store(self, store, drs: List[Dict], attribute: str = None,
+                            start: datetime = None, end: datetime = None,
+                            timed: bool = False) -> Dict[str, Tuple]:
+        """Group raw measurement values read from the time-series store by measure type"""
+        grouped_measurements = {}
+        for dr_type, dr_ids in self._ids_by_type(drs).items():
+            if timed:
+                for measure_type, timestamp, value in store.iter_points(
+                        dr_type, dr_ids, attribute, start, end):
+                    if measure_type not in grouped_measurements:
+                        grouped_measurements[measure_type] = ([], [])
+                    grouped_measurements[measure_type][0].append(timestamp)
+                    grouped_measurements[measure_type][1].append(value)
+            else:
+                for measure_type, value in store.iter_values(dr_type, dr_ids, attribute):
+                    if measure_type not in grouped_measurements:
+                        grouped_measurements[measure_type] = (None, [])
+                    grouped_measurements[measure_type][1].append(value)
+        return grouped_measurements
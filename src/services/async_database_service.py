@@ -0,0 +1,196 @@
+from typing import Dict, List, Optional, Any, Tuple
+import asyncio
+from pymongo import AsyncMongoClient, ASCENDING
+from src.virtualization.digital_replica.schema_registry import SchemaRegistry
+from src.services.database_service import (
+    DatabaseService,
+    EMBEDDED_STORAGE,
+    TIMESERIES_STORAGE,
+    IN_QUERY_BATCH_SIZE,
+)
+from src.services.measurement_store import MeasurementStore
+
+
+class AsyncDatabaseService:
+    """
+    Read path of DatabaseService on pymongo's asyncio client
+
+    Independent queries (one $in query per DR type and batch, plus the
+    time-series reads that hydrate them) run concurrently on the event loop
+    instead of one after the other on the request thread. The client is
+    bound to the event loop that calls connect(); all methods must be
+    awaited on that loop.
+    """
+
+    def __init__(
+        self,
+        connection_string: str,
+        db_name: str,
+        schema_registry: SchemaRegistry,
+        measurement_storage: str = EMBEDDED_STORAGE,
+        client_options: Optional[Dict[str, Any]] = None,
+    ):
+        if measurement_storage not in (EMBEDDED_STORAGE, TIMESERIES_STORAGE):
+            raise ValueError(f"Unknown measurement storage: {measurement_storage}")
+
+        self.connection_string = connection_string
+        self.client_options = dict(client_options or {})
+        self.db_name = db_name
+        self.schema_registry = schema_registry
+        self.measurement_storage = measurement_storage
+        # Only used for its collection naming and point conversion helpers
+        self.measurement_store: Optional[MeasurementStore] = None
+        self.client = None
+        self.db = None
+
+    async def connect(self) -> None:
+        try:
+            self.client = AsyncMongoClient(self.connection_string, **self.client_options)
+            self.db = self.client[self.db_name]
+            if self.measurement_storage == TIMESERIES_STORAGE:
+                self.measurement_store = MeasurementStore(None)
+        except Exception as e:
+            raise ConnectionError(f"Failed to connect to MongoDB: {str(e)}")
+
+    async def disconnect(self) -> None:
+        if self.client:
+            await self.client.close()
+            self.client = None
+            self.db = None
+            self.measurement_store = None
+
+    def is_connected(self) -> bool:
+        return self.client is not None and self.db is not None
+
+    async def _hydrate_measurements(
+        self,
+        dr_type: str,
+        docs: List[Dict],
+        fields: Optional[List[str]] = None,
+        last_n: Optional[int] = None,
+    ) -> List[Dict]:
+        """Fill data.measurements from the time-series store (see DatabaseService)"""
+        store = self.measurement_store
+        if store is None or not docs:
+            return docs
+        if fields and not any(
+            f in ("data", "data.measurements") or f.startswith("data.measurements.")
+            for f in fields
+        ):
+            return docs
+
+        series = {doc["_id"]: [] for doc in docs}
+        if last_n != 0:
+            collection = self.db[store.get_collection_name(dr_type)]
+            match = store.build_match(list(series))
+            if last_n is None:
+                cursor = collection.find(match).sort(store.TIME_FIELD, ASCENDING)
+            else:
+                cursor = await collection.aggregate(
+                    store.build_last_n_pipeline(match, last_n), allowDiskUse=True
+                )
+            async for point in cursor:
+                series[point[store.META_FIELD]["dr_id"]].append(store.from_point(point))
+
+        for doc in docs:
+            doc.setdefault("data", {})["measurements"] = series[doc["_id"]]
+        return docs
+
+    async def get_dr(
+        self,
+        dr_type: str,
+        dr_id: str,
+        fields: Optional[List[str]] = None,
+        last_n: Optional[int] = None,
+    ) -> Optional[Dict]:
+        """
+        Get a Digital Replica by ID
+
+        Args:
+            dr_type: Type of Digital Replica
+            dr_id: Digital Replica ID
+            fields: Optional list of (dotted) fields to project
+            last_n: In time-series mode, only include the most recent N measurements
+        """
+        if not self.is_connected():
+            raise ConnectionError("Not connected to MongoDB")
+
+        try:
+            collection_name = self.schema_registry.get_collection_name(dr_type)
+            dr = await self.db[collection_name].find_one(
+                {"_id": dr_id}, DatabaseService._build_projection(fields)
+            )
+            if dr:
+                await self._hydrate_measurements(dr_type, [dr], fields, last_n)
+            return dr
+        except Exception as e:
+            raise Exception(f"Failed to get Digital Replica: {str(e)}")
+
+    async def get_drs_by_refs(
+        self,
+        refs: List[Dict],
+        fields: Optional[List[str]] = None,
+        last_n: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        Resolve a list of DR references ({"type": ..., "id": ...})
+
+        One $in query per DR type and batch of IN_QUERY_BATCH_SIZE ids, all
+        awaited concurrently.
+
+        Args:
+            refs: DR references as stored in a Digital Twin document
+            fields: Optional list of (dotted) fields to project
+            last_n: In time-series mode, only include the most recent N measurements
+
+        Returns:
+            List[Dict]: Found replicas, in the order of refs (missing ones are skipped)
+        """
+        if not self.is_connected():
+            raise ConnectionError("Not connected to MongoDB")
+
+        try:
+            grouped: Dict[str, List[str]] = {}
+            for ref in refs:
+                grouped.setdefault(ref["type"], []).append(ref["id"])
+
+            tasks: List[Tuple[str, List[str]]] = []
+            for dr_type, ids in grouped.items():
+                unique_ids = list(dict.fromkeys(ids))
+                for i in range(0, len(unique_ids), IN_QUERY_BATCH_SIZE):
+                    tasks.append((dr_type, unique_ids[i : i + IN_QUERY_BATCH_SIZE]))
+
+            results = await asyncio.gather(
+                *(
+                    self._fetch_by_ids(dr_type, ids, fields, last_n)
+                    for dr_type, ids in tasks
+                )
+            )
+
+            found: Dict[Tuple[str, str], Dict] = {}
+            for (dr_type, _), docs in zip(tasks, results):
+                for doc in docs:
+                    found[(dr_type, doc["_id"])] = doc
+
+            return [
+                found[(ref["type"], ref["id"])]
+                for ref in refs
+                if (ref["type"], ref["id"]) in found
+            ]
+        except Exception as e:
+            raise Exception(f"Failed to resolve Digital Replicas: {str(e)}")
+
+    async def _fetch_by_ids(
+        self,
+        dr_type: str,
+        dr_ids: List[str],
+        fields: Optional[List[str]] = None,
+        last_n: Optional[int] = None,
+    ) -> List[Dict]:
+        """Fetch one batch of replicas of one type by ID"""
+        collection_name = self.schema_registry.get_collection_name(dr_type)
+        cursor = self.db[collection_name].find(
+            {"_id": {"$in": dr_ids}}, DatabaseService._build_projection(fields)
+        )
+        docs = await cursor.to_list(None)
+        return await self._hydrate_measurements(dr_type, docs, fields, last_n)
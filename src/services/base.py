@@ -1,9 +1,19 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 class BaseService(ABC):
     """Base class for all services in the pool"""
 
+    # Where DigitalTwin.execute_service runs the service (see ServiceExecutor):
+    # "inline" (request thread), "thread" (I/O bound) or "process" (CPU bound;
+    # the service and its inputs must be picklable, db_service is not passed)
+    execution_mode: str = "inline"
+    # Maximum seconds per call; None uses the executor default
+    timeout: Optional[float] = None
+    # One instance (per configuration) is shared by all Digital Twins (see
+    # ServiceRegistry); set to False if execute keeps state on the instance
+    shared: bool = True
+
     def __init__(self):
         self.name = self.__class__.__name__
 
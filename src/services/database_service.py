@@ -1,73 +1,737 @@
-from typing import Dict, List, Optional, Any
-from pymongo import MongoClient
+from typing import Dict, List, Optional, Any, Callable, Iterable, Iterator, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import MongoClient, UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError
 from datetime import datetime
+import contextvars
+import threading
+import time
 from src.virtualization.digital_replica.schema_registry import SchemaRegistry
+from src.services.measurement_store import MeasurementStore, parse_timestamp
+from src.services.rollup_store import RollupStore
+from src.services.pool_monitor import PoolMonitor
+from src.services.query_diagnostics import SlowQueryLog, DEFAULT_SLOW_QUERY_MS
+from src.observability.metrics import timed_db_method
+from src.observability.profiling import is_profiling
+
+
+# Maximum number of ids sent in a single $in query
+IN_QUERY_BATCH_SIZE = 1000
+# Threads of the executor running the $in queries of get_drs/get_drs_by_refs
+MAX_FETCH_WORKERS = 8
+# Seconds (and entries) for which dr_exists remembers an existing DR
+KNOWN_DR_TTL = 60
+KNOWN_DR_MAX_ENTRIES = 100000
+
+# Measurement storage modes
+EMBEDDED_STORAGE = "embedded"  # data.measurements array inside each DR document
+TIMESERIES_STORAGE = "timeseries"  # one time-series collection per DR type
+
+
+class ConcurrentModificationError(Exception):
+    """Raised when a Digital Replica changed since the version a patch expects"""
 
 
 class DatabaseService:
     def __init__(
-        self, connection_string: str, db_name: str, schema_registry: SchemaRegistry
+        self,
+        connection_string: str,
+        db_name: str,
+        schema_registry: SchemaRegistry,
+        measurement_storage: str = EMBEDDED_STORAGE,
+        rollups: bool = False,
+        client_options: Optional[Dict[str, Any]] = None,
+        slow_query_ms: float = DEFAULT_SLOW_QUERY_MS,
+        event_listeners: Optional[List] = None,
     ):
+        if measurement_storage not in (EMBEDDED_STORAGE, TIMESERIES_STORAGE):
+            raise ValueError(f"Unknown measurement storage: {measurement_storage}")
+
         self.connection_string = connection_string
+        self.client_options = dict(client_options or {})
+        self.pool_monitor = PoolMonitor()
+        # Extra pymongo listeners (e.g. CommandMetricsListener)
+        self.event_listeners = list(event_listeners or [])
         self.db_name = db_name
         self.schema_registry = schema_registry
+        self.measurement_storage = measurement_storage
+        self.measurement_store: Optional[MeasurementStore] = None
+        self.rollups_enabled = rollups
+        self.rollup_store: Optional[RollupStore] = None
         self.client = None
         self.db = None
+        # Runs independent $in batches concurrently, see _fetch_grouped
+        self._fetch_executor: Optional[ThreadPoolExecutor] = None
+        self._change_listeners: List[Callable[[str, str], None]] = []
+        # DR types whose collection enforces the registry's $jsonSchema
+        self.validated_types = set()
+        self.slow_queries = SlowQueryLog(threshold_ms=slow_query_ms)
+        # (dr_type, dr_id) -> expiry of DRs known to exist, see dr_exists
+        self._known_drs: OrderedDict = OrderedDict()
+        self._known_drs_lock = threading.Lock()
+
+    def add_change_listener(self, listener: Callable[[str, str], None]) -> None:
+        """
+        Register a callback invoked as listener(dr_type, dr_id) after a
+        Digital Replica is updated or deleted
+        """
+        self._change_listeners.append(listener)
+
+    def _notify_change(self, dr_type: str, dr_id: str) -> None:
+        for listener in self._change_listeners:
+            listener(dr_type, dr_id)
 
     def connect(self) -> None:
         try:
-            self.client = MongoClient(self.connection_string)
+            self.client = MongoClient(
+                self.connection_string,
+                event_listeners=[self.pool_monitor, *self.event_listeners],
+                **self.client_options,
+            )
             self.db = self.client[self.db_name]
+            self._fetch_executor = ThreadPoolExecutor(
+                max_workers=MAX_FETCH_WORKERS, thread_name_prefix="dr-fetch"
+            )
+            if self.measurement_storage == TIMESERIES_STORAGE:
+                self.measurement_store = MeasurementStore(self.db)
+            if self.rollups_enabled:
+                self.rollup_store = RollupStore(self.db)
         except Exception as e:
             raise ConnectionError(f"Failed to connect to MongoDB: {str(e)}")
 
     def disconnect(self) -> None:
         if self.client:
+            if self.rollup_store is not None:
+                try:
+                    self.rollup_store.close()
+                except Exception:
+                    pass  # Its heartbeat expires after WRITER_TTL anyway
+            if self._fetch_executor is not None:
+                # Let in-flight fetches finish before their client closes
+                self._fetch_executor.shutdown(wait=True)
+                self._fetch_executor = None
             self.client.close()
             self.client = None
             self.db = None
+            self.measurement_store = None
+            self.rollup_store = None
 
     def is_connected(self) -> bool:
         return self.client is not None and self.db is not None
 
+    def get_pool_stats(self) -> Dict:
+        """Get connection pool options and checkout statistics"""
+        stats = self.pool_monitor.get_stats()
+        if self.client is not None:
+            pool_options = self.client.options.pool_options
+            stats["max_pool_size"] = pool_options.max_pool_size
+            stats["min_pool_size"] = pool_options.min_pool_size
+            stats["wait_queue_timeout_ms"] = (
+                pool_options.wait_queue_timeout * 1000
+                if pool_options.wait_queue_timeout is not None
+                else None
+            )
+        return stats
+
+    def sync_schema(
+        self,
+        dr_type: str,
+        validation_level: str = "moderate",
+        validation_action: str = "error",
+    ) -> str:
+        """
+        Apply the registry's $jsonSchema as the validator of a DR collection
+
+        The collection is created with the validator, or updated with collMod
+        when it already exists.
+
+        Args:
+            dr_type: Type of Digital Replica
+            validation_level: "strict" validates every write; "moderate" does
+                not validate updates to documents that were already invalid
+            validation_action: "error" rejects invalid writes, "warn" only logs them
+
+        Returns:
+            str: "created" or "updated"
+        """
+        if not self.is_connected():
+            raise ConnectionError("Not connected to MongoDB")
+
+        try:
+            collection_name = self.schema_registry.get_collection_name(dr_type)
+            validator = self.schema_registry.get_validation_schema(dr_type)
+            if collection_name in self.db.list_collection_names():
+                self.db.command(
+                    "collMod",
+                    collection_name,
+                    validator=validator,
+                    validationLevel=validation_level,
+                    validationAction=validation_action,
+                )
+                action = "updated"
+            else:
+                self.db.create_collection(
+                    collection_name,
+                    validator=validator,
+                    validationLevel=validation_level,
+                    validationAction=validation_action,
+                )
+                action = "created"
+            if validation_action == "error":
+                self.validated_types.add(dr_type)
+            else:
+                self.validated_types.discard(dr_type)
+            return action
+        except Exception as e:
+            raise Exception(f"Failed to sync schema for {dr_type}: {str(e)}")
+
+    def sync_schemas(self, **options) -> Dict[str, str]:
+        """Apply sync_schema to every registered DR type"""
+        return {
+            dr_type: self.sync_schema(dr_type, **options)
+            for dr_type in self.schema_registry.schemas
+        }
+
+    def sync_indexes(self, dr_type: str, drop_undeclared: bool = False) -> Dict:
+        """
+        Reconcile the indexes of a DR collection with its template
+
+        Missing indexes are created; an index whose keys or options changed
+        is dropped and recreated. Indexes that the template does not declare
+        are only dropped with drop_undeclared.
+
+        Args:
+            dr_type: Type of Digital Replica
+            drop_undeclared: Drop indexes (other than _id) not in the template
+
+        Returns:
+            Dict: index names by outcome
+                {"created", "replaced", "unchanged", "dropped", "undeclared"}
+        """
+        if not self.is_connected():
+            raise ConnectionError("Not connected to MongoDB")
+
+        try:
+            collection = self.db[self.schema_registry.get_collection_name(dr_type)]
+            existing = collection.index_information()
+            result = {
+                "created": [],
+                "replaced": [],
+                "unchanged": [],
+                "dropped": [],
+                "undeclared": [],
+            }
+
+            declared = set()
+            for index in self.schema_registry.get_indexes(dr_type):
+                options = index["options"]
+                name = options["name"]
+                declared.add(name)
+                current = existing.get(name)
+                if current is not None:
+                    wanted = {k: v for k, v in options.items() if k != "name"}
+                    actual = {
+                        k: v for k, v in current.items() if k not in ("key", "v", "ns")
+                    }
+                    if [tuple(pair) for pair in current["key"]] == index["keys"] and (
+                        actual == wanted
+                    ):
+                        result["unchanged"].append(name)
+                        continue
+                    collection.drop_index(name)
+                    result["replaced"].append(name)
+                else:
+                    result["created"].append(name)
+                collection.create_index(index["keys"], **options)
+
+            for name in existing:
+                if name == "_id_" or name in declared:
+                    continue
+                if drop_undeclared:
+                    collection.drop_index(name)
+                    result["dropped"].append(name)
+                else:
+                    result["undeclared"].append(name)
+            return result
+        except Exception as e:
+            raise Exception(f"Failed to sync indexes for {dr_type}: {str(e)}")
+
+    def sync_all_indexes(self, drop_undeclared: bool = False) -> Dict[str, Dict]:
+        """Apply sync_indexes to every registered DR type"""
+        return {
+            dr_type: self.sync_indexes(dr_type, drop_undeclared=drop_undeclared)
+            for dr_type in self.schema_registry.schemas
+        }
+
+    @timed_db_method
     def save_dr(self, dr_type: str, dr_data: Dict) -> str:
         """Save a Digital Replica"""
         if not self.is_connected():
             raise ConnectionError("Not connected to MongoDB")
 
         try:
-            # Get collection name and validation schema from registry
+            # Get collection name from registry (fails for unregistered types)
             collection_name = self.schema_registry.get_collection_name(dr_type)
-            validation_schema = self.schema_registry.get_validation_schema(dr_type)
+            self.schema_registry.get_validation_schema(dr_type)
 
-            # The SchemaRegistry handles ALL validation - no type-specific logic here!
+            # The registry's $jsonSchema is enforced by the collection itself
+            # once sync_schema has run - no type-specific logic here!
             collection = self.db[collection_name]
 
+            dr_data, measurements = self._split_measurements(dr_data)
             result = collection.insert_one(dr_data)
+            self._store_measurements(dr_type, [(dr_data["_id"], m) for m in measurements])
             return str(dr_data["_id"])
         except Exception as e:
             raise Exception(f"Failed to save Digital Replica: {str(e)}")
 
-    def get_dr(self, dr_type: str, dr_id: str) -> Optional[Dict]:
+    @timed_db_method
+    def save_drs(self, dr_type: str, drs: List[Dict]) -> Dict:
+        """
+        Save many Digital Replicas with one unordered insert_many
+
+        A failing document (e.g. duplicate _id) does not stop the others.
+
+        Args:
+            dr_type: Type of Digital Replica
+            drs: Digital Replica documents (e.g. from DRFactory.create_dr)
+
+        Returns:
+            Dict: {"inserted": n, "inserted_ids": [...],
+                   "errors": [{"index": i, "_id": ..., "error": "..."}]}
+        """
         if not self.is_connected():
             raise ConnectionError("Not connected to MongoDB")
+        if not drs:
+            return {"inserted": 0, "inserted_ids": [], "errors": []}
 
         try:
             collection_name = self.schema_registry.get_collection_name(dr_type)
-            return self.db[collection_name].find_one({"_id": dr_id})
+            documents, measurements = [], []
+            for dr_data in drs:
+                document, dr_measurements = self._split_measurements(dr_data)
+                documents.append(document)
+                measurements.append(dr_measurements)
+
+            errors = []
+            try:
+                self.db[collection_name].insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                for write_error in e.details.get("writeErrors", []):
+                    index = write_error["index"]
+                    errors.append(
+                        {
+                            "index": index,
+                            "_id": documents[index].get("_id"),
+                            "error": write_error.get("errmsg", "write error"),
+                        }
+                    )
+
+            failed = {error["index"] for error in errors}
+            inserted = [i for i in range(len(documents)) if i not in failed]
+            self._store_measurements(
+                dr_type,
+                [
+                    (documents[i]["_id"], m)
+                    for i in inserted
+                    for m in measurements[i]
+                ],
+            )
+            return {
+                "inserted": len(inserted),
+                "inserted_ids": [str(documents[i]["_id"]) for i in inserted],
+                "errors": errors,
+            }
         except Exception as e:
-            raise Exception(f"Failed to get Digital Replica: {str(e)}")
+            raise Exception(f"Failed to save Digital Replicas: {str(e)}")
+
+    def _split_measurements(self, dr_data: Dict) -> Tuple[Dict, List[Dict]]:
+        """
+        Return the document to insert and the DR's measurements
 
-    def query_drs(self, dr_type: str, query: Dict = None) -> List[Dict]:
+        In time-series mode the measurements are removed from the document,
+        since they live in the measurement store.
+        """
+        measurements = dr_data.get("data", {}).get("measurements") or []
+        if self.measurement_store is not None and "measurements" in dr_data.get(
+            "data", {}
+        ):
+            dr_data = {**dr_data, "data": dict(dr_data["data"])}
+            dr_data["data"].pop("measurements")
+        return dr_data, measurements
+
+    def _store_measurements(self, dr_type: str, items: List[Tuple[str, Dict]]) -> None:
+        """Write (dr_id, measurement) pairs of new DRs to the store and rollups"""
+        if not items:
+            return
+        if self.measurement_store is not None:
+            self.measurement_store.append_many(dr_type, items)
+        if self.rollup_store is not None:
+            self.rollup_store.apply(dr_type, items)
+
+    @staticmethod
+    def _build_projection(
+        fields: Optional[Iterable[str]], exclude: Optional[Iterable[str]] = None
+    ) -> Optional[Dict]:
+        """
+        Build a MongoDB projection, always keeping _id and type
+
+        fields (inclusion) takes precedence over exclude (exclusion), since
+        MongoDB does not accept both in one projection.
+        """
+        if fields:
+            projection = {field: 1 for field in fields}
+            projection["type"] = 1
+            return projection
+        if exclude:
+            return {field: 0 for field in exclude}
+        return None
+
+    def _hydrate_measurements(
+        self,
+        dr_type: str,
+        docs: List[Dict],
+        fields: Optional[List[str]] = None,
+        last_n: Optional[int] = None,
+        exclude: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """
+        Fill data.measurements from the time-series store
+
+        No-op in embedded mode, or when a projection excludes measurements.
+        """
+        if self.measurement_store is None or not docs:
+            return docs
+        if fields and not any(
+            f in ("data", "data.measurements") or f.startswith("data.measurements.")
+            for f in fields
+        ):
+            return docs
+        if not fields and exclude and (
+            "data" in exclude or "data.measurements" in exclude
+        ):
+            return docs
+
+        series = self.measurement_store.find(
+            dr_type, [doc["_id"] for doc in docs], last_n=last_n
+        )
+        for doc in docs:
+            doc.setdefault("data", {})["measurements"] = series.get(doc["_id"], [])
+        return docs
+
+    @timed_db_method
+    def get_dr(
+        self,
+        dr_type: str,
+        dr_id: str,
+        fields: Optional[List[str]] = None,
+        last_n: Optional[int] = None,
+    ) -> Optional[Dict]:
+        """
+        Get a Digital Replica by ID
+
+        Args:
+            dr_type: Type of Digital Replica
+            dr_id: Digital Replica ID
+            fields: Optional list of (dotted) fields to project
+            last_n: In time-series mode, only include the most recent N
+                measurements (all of them when None)
+        """
         if not self.is_connected():
             raise ConnectionError("Not connected to MongoDB")
 
         try:
             collection_name = self.schema_registry.get_collection_name(dr_type)
-            return list(self.db[collection_name].find(query or {}))
+            dr = self.db[collection_name].find_one(
+                {"_id": dr_id}, self._build_projection(fields)
+            )
+            if dr:
+                self._hydrate_measurements(dr_type, [dr], fields, last_n)
+            return dr
+        except Exception as e:
+            raise Exception(f"Failed to get Digital Replica: {str(e)}")
+
+    def dr_exists(self, dr_type: str, dr_id: str) -> bool:
+        """
+        Whether a Digital Replica exists
+
+        Positive answers are remembered for KNOWN_DR_TTL seconds, so the
+        append path does not read the DR on every request. delete_dr forgets
+        the entry in this process; other processes rely on the TTL (and
+        append_measurements_bulk skips DRs deleted meanwhile).
+        """
+        key = (dr_type, dr_id)
+        now = time.monotonic()
+        with self._known_drs_lock:
+            expires_at = self._known_drs.get(key)
+            if expires_at is not None and expires_at > now:
+                return True
+        if self.get_dr(dr_type, dr_id, fields=["_id"]) is None:
+            return False
+        with self._known_drs_lock:
+            self._known_drs[key] = now + KNOWN_DR_TTL
+            self._known_drs.move_to_end(key)
+            while len(self._known_drs) > KNOWN_DR_MAX_ENTRIES:
+                self._known_drs.popitem(last=False)
+        return True
+
+    @timed_db_method
+    def get_drs(
+        self,
+        dr_type: str,
+        dr_ids: List[str],
+        fields: Optional[List[str]] = None,
+        last_n: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        Get several Digital Replicas of the same type with $in queries
+
+        Args:
+            dr_type: Type of Digital Replica
+            dr_ids: IDs to fetch
+            fields: Optional list of (dotted) fields to project
+            last_n: In time-series mode, only include the most recent N measurements
+
+        Returns:
+            List[Dict]: Found replicas, in the order of dr_ids (missing IDs are skipped)
+        """
+        if not self.is_connected():
+            raise ConnectionError("Not connected to MongoDB")
+
+        try:
+            found = self._fetch_grouped({dr_type: dr_ids}, fields, last_n)
+            return [
+                found[(dr_type, dr_id)] for dr_id in dr_ids if (dr_type, dr_id) in found
+            ]
+        except Exception as e:
+            raise Exception(f"Failed to get Digital Replicas: {str(e)}")
+
+    @timed_db_method
+    def get_drs_by_refs(
+        self,
+        refs: List[Dict],
+        fields: Optional[List[str]] = None,
+        last_n: Optional[int] = None,
+        exclude: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """
+        Resolve a list of DR references ({"type": ..., "id": ...})
+
+        References are grouped by type and fetched with $in queries, see
+        _fetch_grouped.
+
+        Args:
+            refs: DR references as stored in a Digital Twin document
+            fields: Optional list of (dotted) fields to project
+            last_n: In time-series mode, only include the most recent N measurements
+            exclude: Optional list of (dotted) fields to leave out when
+                fields is not given (e.g. ["data.measurements"])
+
+        Returns:
+            List[Dict]: Found replicas, in the order of refs (missing ones are skipped)
+        """
+        if not self.is_connected():
+            raise ConnectionError("Not connected to MongoDB")
+        if not refs:
+            # A new Digital Twin has no replicas yet
+            return []
+
+        try:
+            grouped: Dict[str, List[str]] = {}
+            for ref in refs:
+                ids = grouped.setdefault(ref["type"], [])
+                ids.append(ref["id"])
+
+            found = self._fetch_grouped(grouped, fields, last_n, exclude)
+            return [
+                found[(ref["type"], ref["id"])]
+                for ref in refs
+                if (ref["type"], ref["id"]) in found
+            ]
+        except Exception as e:
+            raise Exception(f"Failed to resolve Digital Replicas: {str(e)}")
+
+    def _fetch_grouped(
+        self,
+        grouped: Dict[str, List[str]],
+        fields: Optional[List[str]] = None,
+        last_n: Optional[int] = None,
+        exclude: Optional[List[str]] = None,
+    ) -> Dict[Tuple[str, str], Dict]:
+        """
+        Fetch replicas by type and ID, returning a mapping (type, id) -> document
+
+        The IDs of each type are split into $in queries of at most
+        IN_QUERY_BATCH_SIZE; when there are several, they run concurrently
+        on the service's fetch executor.
+        """
+        tasks: List[Tuple[str, List[str]]] = []
+        for dr_type, ids in grouped.items():
+            unique_ids = list(dict.fromkeys(ids))
+            for i in range(0, len(unique_ids), IN_QUERY_BATCH_SIZE):
+                tasks.append((dr_type, unique_ids[i : i + IN_QUERY_BATCH_SIZE]))
+
+        if len(tasks) <= 1 or is_profiling():
+            # Profiled requests stay on one thread so the profile sees the fetches
+            results = [
+                self._fetch_by_ids(dr_type, dr_ids, fields, last_n, exclude)
+                for dr_type, dr_ids in tasks
+            ]
+        else:
+            # Each task runs in a copy of the caller's context, so its
+            # Mongo commands are attributed to the calling method
+            futures = [
+                self._fetch_executor.submit(
+                    contextvars.copy_context().run,
+                    self._fetch_by_ids,
+                    dr_type,
+                    dr_ids,
+                    fields,
+                    last_n,
+                    exclude,
+                )
+                for dr_type, dr_ids in tasks
+            ]
+            results = [future.result() for future in futures]
+
+        found: Dict[Tuple[str, str], Dict] = {}
+        for (dr_type, _), docs in zip(tasks, results):
+            for doc in docs:
+                found[(dr_type, doc["_id"])] = doc
+        return found
+
+    def _fetch_by_ids(
+        self,
+        dr_type: str,
+        dr_ids: List[str],
+        fields: Optional[List[str]] = None,
+        last_n: Optional[int] = None,
+        exclude: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """Fetch one batch (see _fetch_grouped) of replicas of one type by ID"""
+        collection_name = self.schema_registry.get_collection_name(dr_type)
+        docs = list(
+            self.db[collection_name].find(
+                {"_id": {"$in": dr_ids}}, self._build_projection(fields, exclude)
+            )
+        )
+        self._hydrate_measurements(dr_type, docs, fields, last_n, exclude)
+        return docs
+
+    @timed_db_method
+    def query_drs(
+        self,
+        dr_type: str,
+        query: Dict = None,
+        last_n: Optional[int] = None,
+        fields: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+    ) -> List[Dict]:
+        try:
+            # iter_drs records the query in the slow query log
+            return list(self.iter_drs(dr_type, query, fields, limit, after, last_n))
+        except ConnectionError:
+            raise
         except Exception as e:
             raise Exception(f"Failed to query Digital Replicas: {str(e)}")
 
+    @staticmethod
+    def _build_dr_query(query: Optional[Dict], after: Optional[str]) -> Dict:
+        """Combine a DR filter with the keyset condition of iter_drs"""
+        conditions = [query] if query else []
+        if after:
+            conditions.append({"_id": {"$gt": after}})
+        if len(conditions) > 1:
+            return {"$and": conditions}
+        return conditions[0] if conditions else {}
+
+    @timed_db_method
+    def iter_drs(
+        self,
+        dr_type: str,
+        query: Dict = None,
+        fields: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        last_n: Optional[int] = None,
+        batch_size: int = 500,
+    ) -> Iterator[Dict]:
+        """
+        Stream Digital Replicas straight from a cursor, ordered by _id
+
+        Time spent reading the cursor (not in the consumer between items) is
+        checked against the slow query log once the stream ends.
+
+        Args:
+            dr_type: Type of Digital Replica
+            query: Optional MongoDB filter
+            fields: Optional list of (dotted) fields to project
+            limit: Optional maximum number of DRs
+            after: Only return DRs whose _id sorts after this one (keyset)
+            last_n: In time-series mode, only include the most recent N measurements
+            batch_size: Cursor batch size (and hydration batch in time-series mode)
+        """
+        if not self.is_connected():
+            raise ConnectionError("Not connected to MongoDB")
+
+        collection_name = self.schema_registry.get_collection_name(dr_type)
+        query = self._build_dr_query(query, after)
+
+        cursor = (
+            self.db[collection_name]
+            .find(query, self._build_projection(fields))
+            .sort("_id", 1)
+            .batch_size(batch_size)
+        )
+        if limit:
+            cursor = cursor.limit(limit)
+
+        elapsed = 0.0
+        returned = 0
+        resumed = time.perf_counter()
+        try:
+            for doc in self._hydrated(dr_type, cursor, fields, last_n, batch_size):
+                elapsed += time.perf_counter() - resumed
+                returned += 1
+                yield doc
+                resumed = time.perf_counter()
+            elapsed += time.perf_counter() - resumed
+        finally:
+            self.slow_queries.record(
+                dr_type,
+                collection_name,
+                query,
+                [("_id", 1)],
+                limit,
+                self._build_projection(fields),
+                elapsed * 1000,
+                returned,
+            )
+
+    def _hydrated(
+        self,
+        dr_type: str,
+        cursor,
+        fields: Optional[List[str]],
+        last_n: Optional[int],
+        batch_size: int,
+    ) -> Iterator[Dict]:
+        """Yield the documents of a cursor with their measurements hydrated"""
+        if self.measurement_store is None:
+            yield from cursor
+            return
+
+        batch = []
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                yield from self._hydrate_measurements(dr_type, batch, fields, last_n)
+                batch = []
+        yield from self._hydrate_measurements(dr_type, batch, fields, last_n)
+
+    @timed_db_method
     def update_dr(self, dr_type: str, dr_id: str, update_data: Dict) -> None:
         if not self.is_connected():
             raise ConnectionError("Not connected to MongoDB")
@@ -80,6 +744,12 @@ class DatabaseService:
                 update_data["metadata"] = {}
             update_data["metadata"]["updated_at"] = datetime.utcnow()
 
+            measurements = update_data.get("data", {}).get("measurements")
+            if self.measurement_store is not None and measurements is not None:
+                # The full array replaces the stored series
+                update_data = {**update_data, "data": dict(update_data["data"])}
+                update_data["data"].pop("measurements")
+
             # Let SchemaRegistry handle validation through MongoDB schema
             result = self.db[collection_name].update_one(
                 {"_id": dr_id}, {"$set": update_data}
@@ -88,9 +758,206 @@ class DatabaseService:
             if result.matched_count == 0:
                 raise ValueError(f"Digital Replica not found: {dr_id}")
 
+            if measurements is not None:
+                if self.measurement_store is not None:
+                    self.measurement_store.replace(dr_type, dr_id, measurements)
+                if self.rollup_store is not None:
+                    self.rollup_store.replace(dr_type, dr_id, measurements)
+
+            self._notify_change(dr_type, dr_id)
         except Exception as e:
             raise Exception(f"Failed to update Digital Replica: {str(e)}")
 
+    @timed_db_method
+    def patch_dr(
+        self,
+        dr_type: str,
+        dr_id: str,
+        patch: Dict[str, Dict],
+        expected_updated_at: Optional[datetime] = None,
+    ) -> Dict:
+        """
+        Apply a partial update atomically (see DRFactory.build_patch)
+
+        Args:
+            dr_type: Type of Digital Replica
+            dr_id: Digital Replica ID
+            patch: Update document with dotted-path $set/$unset/$push
+            expected_updated_at: Optimistic concurrency - only apply the patch
+                if metadata.updated_at still has this value
+
+        Returns:
+            Dict: {"_id": ..., "metadata": {"updated_at": ...}} after the update
+
+        Raises:
+            ValueError: If the Digital Replica does not exist
+            ConcurrentModificationError: If it was modified since expected_updated_at
+        """
+        if not self.is_connected():
+            raise ConnectionError("Not connected to MongoDB")
+
+        collection = self.db[self.schema_registry.get_collection_name(dr_type)]
+        patch = {operator: dict(fields) for operator, fields in patch.items()}
+
+        replaced = patch.get("$set", {}).get("data.measurements")
+        if "data.measurements" in patch.get("$unset", {}):
+            replaced = []
+        pushed = patch.get("$push", {}).get("data.measurements")
+        if self.measurement_store is not None:
+            # In time-series mode measurements live in the store, not the document
+            for fields in patch.values():
+                fields.pop("data.measurements", None)
+        patch = {operator: fields for operator, fields in patch.items() if fields}
+
+        query = {"_id": dr_id}
+        if expected_updated_at is not None:
+            query["metadata.updated_at"] = expected_updated_at
+
+        try:
+            result = collection.find_one_and_update(
+                query,
+                patch,
+                projection={"metadata.updated_at": 1},
+                return_document=ReturnDocument.AFTER,
+            )
+        except Exception as e:
+            raise Exception(f"Failed to patch Digital Replica: {str(e)}")
+
+        if result is None:
+            if expected_updated_at is not None and collection.count_documents(
+                {"_id": dr_id}, limit=1
+            ):
+                raise ConcurrentModificationError(
+                    f"Digital Replica {dr_id} was modified concurrently"
+                )
+            raise ValueError(f"Digital Replica not found: {dr_id}")
+
+        if replaced is not None:
+            if self.measurement_store is not None:
+                self.measurement_store.replace(dr_type, dr_id, replaced)
+            if self.rollup_store is not None:
+                self.rollup_store.replace(dr_type, dr_id, replaced)
+        if pushed is not None:
+            items = [(dr_id, m) for m in pushed["$each"]]
+            if self.measurement_store is not None:
+                self.measurement_store.append_many(dr_type, items)
+            if self.rollup_store is not None:
+                self.rollup_store.apply(dr_type, items)
+
+        self._notify_change(dr_type, dr_id)
+        return result
+
+    @timed_db_method
+    def append_measurements(
+        self, dr_type: str, dr_id: str, measurements: List[Dict]
+    ) -> None:
+        """
+        Append measurements to a Digital Replica without rewriting the document
+
+        Uses $push/$each in embedded mode and the time-series store otherwise.
+        Measurements are expected to be validated already.
+        """
+        if not self.is_connected():
+            raise ConnectionError("Not connected to MongoDB")
+
+        try:
+            collection_name = self.schema_registry.get_collection_name(dr_type)
+            update = {"$set": {"metadata.updated_at": datetime.utcnow()}}
+            if self.measurement_store is None:
+                update["$push"] = {"data.measurements": {"$each": measurements}}
+
+            result = self.db[collection_name].update_one({"_id": dr_id}, update)
+            if result.matched_count == 0:
+                raise ValueError(f"Digital Replica not found: {dr_id}")
+
+            if self.measurement_store is not None:
+                self.measurement_store.append(dr_type, dr_id, measurements)
+            if self.rollup_store is not None:
+                self.rollup_store.apply(dr_type, [(dr_id, m) for m in measurements])
+
+            self._notify_change(dr_type, dr_id)
+        except Exception as e:
+            raise Exception(f"Failed to append measurements: {str(e)}")
+
+    @timed_db_method
+    def append_measurements_bulk(
+        self, dr_type: str, batches: Dict[str, List[Dict]]
+    ) -> int:
+        """
+        Append measurements to many Digital Replicas of one type at once
+
+        Embedded mode issues one unordered bulk_write with a
+        $push/$each per DR; time-series mode inserts all points at once.
+        The measurements of a DR are dropped when one of their timestamps
+        cannot be parsed, so a bad item never fails the other DRs of the
+        batch, and when the DR does not exist (e.g. deleted since they were
+        queued).
+
+        Args:
+            dr_type: Type of Digital Replica
+            batches: dr_id -> measurements to append (already validated)
+
+        Returns:
+            int: Number of measurements appended
+        """
+        if not self.is_connected():
+            raise ConnectionError("Not connected to MongoDB")
+
+        batches = {
+            dr_id: items
+            for dr_id, items in batches.items()
+            if self._valid_timestamps(items)
+        }
+        if not batches:
+            return 0
+
+        try:
+            collection_name = self.schema_registry.get_collection_name(dr_type)
+            now = datetime.utcnow()
+            operations = []
+            for dr_id, measurements in batches.items():
+                update = {"$set": {"metadata.updated_at": now}}
+                if self.measurement_store is None:
+                    update["$push"] = {"data.measurements": {"$each": measurements}}
+                operations.append(UpdateOne({"_id": dr_id}, update))
+
+            result = self.db[collection_name].bulk_write(operations, ordered=False)
+            if result.matched_count < len(operations):
+                # Some DRs were deleted since their measurements were accepted:
+                # never write time-series points or rollups for them
+                existing = {
+                    doc["_id"]
+                    for doc in self.db[collection_name].find(
+                        {"_id": {"$in": list(batches)}}, {"_id": 1}
+                    )
+                }
+                batches = {
+                    dr_id: batch
+                    for dr_id, batch in batches.items()
+                    if dr_id in existing
+                }
+            # Time-series points and rollups (the array was pushed above otherwise)
+            items = [(dr_id, m) for dr_id, batch in batches.items() for m in batch]
+            self._store_measurements(dr_type, items)
+
+            for dr_id in batches:
+                self._notify_change(dr_type, dr_id)
+            return len(items)
+        except Exception as e:
+            raise Exception(f"Failed to append measurements: {str(e)}")
+
+    @staticmethod
+    def _valid_timestamps(measurements: List[Dict]) -> bool:
+        """Whether every timestamp of a batch can be stored and rolled up"""
+        try:
+            for measurement in measurements:
+                if measurement.get("timestamp") is not None:
+                    parse_timestamp(measurement["timestamp"])
+        except ValueError:
+            return False
+        return True
+
+    @timed_db_method
     def delete_dr(self, dr_type: str, dr_id: str) -> None:
         if not self.is_connected():
             raise ConnectionError("Not connected to MongoDB")
@@ -101,5 +968,203 @@ class DatabaseService:
 
             if result.deleted_count == 0:
                 raise ValueError(f"Digital Replica not found: {dr_id}")
+            with self._known_drs_lock:
+                self._known_drs.pop((dr_type, dr_id), None)
+
+            if self.measurement_store is not None:
+                self.measurement_store.delete(dr_type, dr_id)
+            if self.rollup_store is not None:
+                self.rollup_store.delete(dr_type, [dr_id])
+
+            self._notify_change(dr_type, dr_id)
         except Exception as e:
             raise Exception(f"Failed to delete Digital Replica: {str(e)}")
+
+    def _measurement_branch(
+        self,
+        dr_type: str,
+        dr_ids: List[str],
+        measure_type: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        timestamps: bool = True,
+    ) -> Tuple[str, List[Dict]]:
+        """
+        Build the pipeline reading the measurements of one DR type
+
+        Returns the collection to run on and stages emitting one
+        {measure_type, value, timestamp} document per measurement,
+        whatever the storage mode. Embedded timestamps are only converted
+        to dates when a bound or the caller (timestamps) needs them.
+        """
+        if self.measurement_store is not None:
+            self.measurement_store.ensure_collection(dr_type)
+            match = self.measurement_store.build_match(
+                dr_ids, measure_type, start, end
+            )
+            return self.measurement_store.get_collection_name(dr_type), [
+                {"$match": match},
+                {
+                    "$project": {
+                        "_id": 0,
+                        "measure_type": f"${MeasurementStore.META_FIELD}.measure_type",
+                        "value": {"$toDouble": "$value"},
+                        "timestamp": f"${MeasurementStore.TIME_FIELD}",
+                    }
+                },
+            ]
+
+        match = {"_id": {"$in": list(dr_ids)}}
+        if measure_type:
+            match["data.measurements.measure_type"] = measure_type
+        project = {
+            "_id": 0,
+            "measure_type": "$data.measurements.measure_type",
+            "value": {"$toDouble": "$data.measurements.value"},
+        }
+        item_match = {}
+        if measure_type:
+            item_match["measure_type"] = measure_type
+        if timestamps or start or end:
+            # Unparseable timestamps become null and are filtered out
+            # instead of failing the whole aggregation
+            project["timestamp"] = {
+                "$convert": {
+                    "input": "$data.measurements.timestamp",
+                    "to": "date",
+                    "onError": None,
+                    "onNull": None,
+                }
+            }
+            item_match["timestamp"] = {"$type": "date"}
+            if start:
+                item_match["timestamp"]["$gte"] = start
+            if end:
+                item_match["timestamp"]["$lt"] = end
+        stages = [
+            {"$match": match},
+            {"$unwind": "$data.measurements"},
+            {"$project": project},
+        ]
+        if item_match:
+            stages.append({"$match": item_match})
+        return self.schema_registry.get_collection_name(dr_type), stages
+
+    @timed_db_method
+    def aggregate_measurements(
+        self,
+        ids_by_type: Dict[str, List[str]],
+        stages: List[Dict],
+        measure_type: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        timestamps: bool = True,
+    ) -> List[Dict]:
+        """
+        Run an aggregation over the measurements of several DRs server-side
+
+        The measurements of every DR type are normalised to
+        {measure_type, value, timestamp} documents (combined with $unionWith
+        when several types are involved) and fed into the given stages.
+
+        Args:
+            ids_by_type: dr_type -> DR IDs whose measurements are aggregated
+            stages: Pipeline stages applied to the normalised measurements
+            measure_type: Optional measurement type filter
+            start: Optional inclusive lower time bound
+            end: Optional exclusive upper time bound
+            timestamps: Whether the stages read the timestamp field
+
+        Returns:
+            List[Dict]: Aggregation results
+        """
+        if not self.is_connected():
+            raise ConnectionError("Not connected to MongoDB")
+
+        try:
+            branches = [
+                self._measurement_branch(
+                    dr_type, dr_ids, measure_type, start, end, timestamps
+                )
+                for dr_type, dr_ids in ids_by_type.items()
+                if dr_ids
+            ]
+            if not branches:
+                return []
+
+            collection_name, pipeline = branches[0]
+            pipeline = list(pipeline)
+            for other_collection, other_pipeline in branches[1:]:
+                pipeline.append(
+                    {"$unionWith": {"coll": other_collection, "pipeline": other_pipeline}}
+                )
+            pipeline.extend(stages)
+
+            return list(
+                self.db[collection_name].aggregate(pipeline, allowDiskUse=True)
+            )
+        except Exception as e:
+            raise Exception(f"Failed to aggregate measurements: {str(e)}")
+
+    def rebuild_rollups(
+        self,
+        dr_type: str,
+        dr_ids: Optional[List[str]] = None,
+        batch_size: int = 500,
+        force: bool = False,
+    ) -> int:
+        """
+        Recompute rollups from raw measurements (backfill)
+
+        This is an offline operation: the rollups are deleted and then refolded
+        from the raw measurements, so measurements appended meanwhile would be
+        counted twice or lost. It refuses to run while other processes are
+        writing rollups (see RollupStore.active_writers), unless forced.
+
+        Args:
+            dr_type: Type of Digital Replica
+            dr_ids: Optional DR IDs to rebuild; the whole type when omitted
+            batch_size: Number of DRs read per batch
+            force: Rebuild even if other writers are active
+
+        Returns:
+            int: Number of measurements folded into the rollups
+        """
+        if not self.is_connected():
+            raise ConnectionError("Not connected to MongoDB")
+        if self.rollup_store is None:
+            raise ValueError("Rollups are not enabled")
+        writers = self.rollup_store.active_writers()
+        if writers and not force:
+            raise ValueError(
+                f"{len(writers)} process(es) are writing rollups; stop the "
+                "servers (or their measurement writes) before rebuilding"
+            )
+
+        try:
+            collection_name = self.schema_registry.get_collection_name(dr_type)
+            full = dr_ids is None
+            if full:
+                dr_ids = [
+                    doc["_id"] for doc in self.db[collection_name].find({}, {"_id": 1})
+                ]
+
+            self.rollup_store.delete(dr_type, None if full else dr_ids)
+            folded = 0
+            for i in range(0, len(dr_ids), batch_size):
+                drs = self.get_drs(
+                    dr_type, dr_ids[i : i + batch_size], fields=["data.measurements"]
+                )
+                items = [
+                    (dr["_id"], m)
+                    for dr in drs
+                    for m in dr.get("data", {}).get("measurements", [])
+                ]
+                self.rollup_store.apply(dr_type, items)
+                folded += len(items)
+            if full:
+                # Plain (unbounded) statistics may now be answered from rollups
+                self.rollup_store.mark_backfilled(dr_type)
+            return folded
+        except Exception as e:
+            raise Exception(f"Failed to rebuild rollups: {str(e)}")
@@ -0,0 +1,157 @@
+from typing import Dict, List, Optional
+import threading
+import time
+
+
+class BufferFullError(Exception):
+    """Raised when the write buffer cannot accept more measurements in time"""
+
+
+class MeasurementWriteBuffer:
+    """
+    Coalesces measurement appends into bulk writes
+
+    Appends are buffered in memory per (dr_type, dr_id) and flushed by a
+    background thread as one DatabaseService.append_measurements_bulk call
+    per DR type, every flush_interval_ms or as soon as max_batch points are
+    pending. At most max_pending points are held: callers wait up to
+    put_timeout seconds for room and get BufferFullError otherwise
+    (backpressure). Batches that fail to write, and points of DRs that no
+    longer exist, are counted in `failed` and dropped.
+    """
+
+    def __init__(
+        self,
+        db_service,
+        flush_interval_ms: int = 200,
+        max_batch: int = 1000,
+        max_pending: int = 100000,
+        put_timeout: float = 0.5,
+    ):
+        self.db_service = db_service
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.put_timeout = put_timeout
+
+        self._pending: Dict[str, Dict[str, List[Dict]]] = {}
+        self._pending_count = 0
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.accepted = 0
+        self.written = 0
+        self.flushes = 0
+        self.rejected = 0
+        self.failed = 0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        """Start the background flush thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="measurement-write-buffer", daemon=True
+            )
+            self._thread.start()
+
+    def add(self, dr_type: str, dr_id: str, measurements: List[Dict]) -> None:
+        """
+        Queue validated measurements for a Digital Replica
+
+        Raises:
+            BufferFullError: The buffer stayed full for put_timeout seconds
+        """
+        count = len(measurements)
+        if count == 0:
+            return
+        if count > self.max_pending:
+            raise ValueError(
+                f"Cannot buffer {count} measurements at once (max_pending={self.max_pending})"
+            )
+
+        with self._condition:
+            if self._closed:
+                raise BufferFullError("Measurement buffer is closed")
+            deadline = time.monotonic() + self.put_timeout
+            while self._pending_count + self._in_flight + count > self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += count
+                    raise BufferFullError("Measurement buffer is full, retry later")
+                self._condition.notify_all()
+                self._condition.wait(remaining)
+
+            self._pending.setdefault(dr_type, {}).setdefault(dr_id, []).extend(
+                measurements
+            )
+            self._pending_count += count
+            self.accepted += count
+            if self._pending_count >= self.max_batch:
+                self._condition.notify_all()
+
+    def flush(self) -> None:
+        """Write every pending measurement now"""
+        with self._flush_lock:
+            with self._condition:
+                pending, self._pending = self._pending, {}
+                self._in_flight, self._pending_count = self._pending_count, 0
+
+            try:
+                for dr_type, batches in pending.items():
+                    count = sum(len(items) for items in batches.values())
+                    try:
+                        appended = self.db_service.append_measurements_bulk(
+                            dr_type, batches
+                        )
+                        self.written += appended
+                        # Points of DRs deleted while queued were dropped
+                        self.failed += count - appended
+                    except Exception as e:
+                        self.failed += count
+                        self.last_error = str(e)
+                if pending:
+                    self.flushes += 1
+            finally:
+                with self._condition:
+                    self._in_flight = 0
+                    self._condition.notify_all()
+
+    def close(self) -> None:
+        """Stop the flush thread and write what is left"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def get_stats(self) -> Dict:
+        with self._condition:
+            return {
+                "pending": self._pending_count,
+                "in_flight": self._in_flight,
+                "max_pending": self.max_pending,
+                "accepted": self.accepted,
+                "written": self.written,
+                "flushes": self.flushes,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "last_error": self.last_error,
+            }
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed and self._pending_count < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._closed:
+                    return
+            self.flush()
@@ -0,0 +1,247 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+from datetime import datetime, timezone
+from pymongo import ASCENDING, DESCENDING
+
+
+def parse_timestamp(value) -> datetime:
+    """
+    Normalise a measurement timestamp (datetime or ISO-8601 string) to a
+    naive UTC datetime
+
+    Raises:
+        ValueError: If the value is not a datetime or an ISO-8601 string
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if not isinstance(value, datetime):
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class MeasurementStore:
+    """
+    Stores Digital Replica measurements in MongoDB time-series collections
+
+    One collection per DR type (`<dr_type>_measurements`) holds one document
+    per point, with `timestamp` as timeField and {dr_id, measure_type} as
+    metaField. This keeps DR documents small instead of growing an embedded
+    `data.measurements` array without bound.
+    """
+
+    TIME_FIELD = "timestamp"
+    META_FIELD = "meta"
+
+    def __init__(
+        self,
+        db,
+        granularity: str = "seconds",
+        expire_after_seconds: Optional[int] = None,
+    ):
+        self.db = db
+        self.granularity = granularity
+        self.expire_after_seconds = expire_after_seconds
+        self._ensured = set()
+
+    def get_collection_name(self, dr_type: str) -> str:
+        """Get time-series collection name for a DR type"""
+        return f"{dr_type}_measurements"
+
+    def ensure_collection(self, dr_type: str) -> None:
+        """Create the time-series collection for a DR type if it does not exist"""
+        if dr_type in self._ensured:
+            return
+
+        name = self.get_collection_name(dr_type)
+        if name not in self.db.list_collection_names():
+            options = {
+                "timeseries": {
+                    "timeField": self.TIME_FIELD,
+                    "metaField": self.META_FIELD,
+                    "granularity": self.granularity,
+                }
+            }
+            if self.expire_after_seconds:
+                options["expireAfterSeconds"] = self.expire_after_seconds
+            self.db.create_collection(name, **options)
+            self.db[name].create_index(
+                [
+                    (f"{self.META_FIELD}.dr_id", ASCENDING),
+                    (f"{self.META_FIELD}.measure_type", ASCENDING),
+                    (self.TIME_FIELD, ASCENDING),
+                ]
+            )
+        self._ensured.add(dr_type)
+
+    def _to_point(self, dr_id: str, measurement: Dict) -> Dict:
+        """Convert an embedded-style measurement into a time-series document"""
+        point = {k: v for k, v in measurement.items() if k != "measure_type"}
+        timestamp = point.get(self.TIME_FIELD)
+        if isinstance(timestamp, str):
+            point[self.TIME_FIELD] = parse_timestamp(timestamp)
+        elif timestamp is None:
+            point[self.TIME_FIELD] = datetime.utcnow()
+        point[self.META_FIELD] = {
+            "dr_id": dr_id,
+            "measure_type": measurement.get("measure_type"),
+        }
+        return point
+
+    def from_point(self, point: Dict) -> Dict:
+        """Convert a time-series document back into an embedded-style measurement"""
+        meta = point.get(self.META_FIELD, {})
+        measurement = {"measure_type": meta.get("measure_type")}
+        for key, value in point.items():
+            if key not in ("_id", self.META_FIELD):
+                measurement[key] = value
+        return measurement
+
+    def append(self, dr_type: str, dr_id: str, measurements: List[Dict]) -> int:
+        """Append measurements of one DR, returning the number of points written"""
+        return self.append_many(dr_type, [(dr_id, m) for m in measurements])
+
+    def append_many(self, dr_type: str, items: List[Tuple[str, Dict]]) -> int:
+        """Append (dr_id, measurement) pairs of one DR type in a single insert"""
+        if not items:
+            return 0
+        self.ensure_collection(dr_type)
+        points = [self._to_point(dr_id, m) for dr_id, m in items]
+        self.db[self.get_collection_name(dr_type)].insert_many(points, ordered=False)
+        return len(points)
+
+    def replace(self, dr_type: str, dr_id: str, measurements: List[Dict]) -> None:
+        """Replace the whole series of a DR"""
+        self.delete(dr_type, dr_id)
+        self.append(dr_type, dr_id, measurements)
+
+    def delete(self, dr_type: str, dr_id: str) -> None:
+        """Delete every point of a DR"""
+        self.ensure_collection(dr_type)
+        self.db[self.get_collection_name(dr_type)].delete_many(
+            {f"{self.META_FIELD}.dr_id": dr_id}
+        )
+
+    def build_match(
+        self,
+        dr_ids: List[str],
+        measure_type: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Dict:
+        match = {f"{self.META_FIELD}.dr_id": {"$in": list(dr_ids)}}
+        if measure_type:
+            match[f"{self.META_FIELD}.measure_type"] = measure_type
+        if start or end:
+            match[self.TIME_FIELD] = {}
+            if start:
+                match[self.TIME_FIELD]["$gte"] = start
+            if end:
+                match[self.TIME_FIELD]["$lt"] = end
+        return match
+
+    def build_last_n_pipeline(self, match: Dict, last_n: int) -> List[Dict]:
+        """Pipeline keeping the most recent last_n points per DR, in chronological order"""
+        # Rank points per DR, newest first, and keep the top N server-side
+        return [
+            {"$match": match},
+            {
+                "$setWindowFields": {
+                    "partitionBy": f"${self.META_FIELD}.dr_id",
+                    "sortBy": {self.TIME_FIELD: DESCENDING},
+                    "output": {"_rank": {"$documentNumber": {}}},
+                }
+            },
+            {"$match": {"_rank": {"$lte": last_n}}},
+            {"$unset": "_rank"},
+            {"$sort": {self.TIME_FIELD: ASCENDING}},
+        ]
+
+    def find(
+        self,
+        dr_type: str,
+        dr_ids: List[str],
+        measure_type: Optional[str] = None,
+        last_n: Optional[int] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Dict[str, List[Dict]]:
+        """
+        Read measurements for several DRs of one type
+
+        Args:
+            dr_type: Type of Digital Replica
+            dr_ids: DR IDs to read
+            measure_type: Optional measurement type filter
+            last_n: Only return the most recent N points per DR
+            start: Optional inclusive lower time bound
+            end: Optional exclusive upper time bound
+
+        Returns:
+            Dict[str, List[Dict]]: dr_id -> measurements in chronological order
+        """
+        result = {dr_id: [] for dr_id in dr_ids}
+        if not dr_ids or last_n == 0:
+            return result
+
+        self.ensure_collection(dr_type)
+        collection = self.db[self.get_collection_name(dr_type)]
+        match = self.build_match(dr_ids, measure_type, start, end)
+
+        if last_n is None:
+            cursor = collection.find(match).sort(self.TIME_FIELD, ASCENDING)
+        else:
+            cursor = collection.aggregate(
+                self.build_last_n_pipeline(match, last_n), allowDiskUse=True
+            )
+
+        for point in cursor:
+            result[point[self.META_FIELD]["dr_id"]].append(self.from_point(point))
+        return result
+
+    def iter_values(
+        self,
+        dr_type: str,
+        dr_ids: List[str],
+        measure_type: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Iterator[Tuple[str, float]]:
+        """Yield (measure_type, value) pairs, projecting only what aggregation needs"""
+        if not dr_ids:
+            return
+        self.ensure_collection(dr_type)
+        cursor = self.db[self.get_collection_name(dr_type)].find(
+            self.build_match(dr_ids, measure_type, start, end),
+            {f"{self.META_FIELD}.measure_type": 1, "value": 1, "_id": 0},
+        )
+        for point in cursor:
+            yield point[self.META_FIELD]["measure_type"], point["value"]
+
+    def iter_points(
+        self,
+        dr_type: str,
+        dr_ids: List[str],
+        measure_type: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Iterator[Tuple[str, datetime, float]]:
+        """Yield (measure_type, timestamp, value) triples for time-bucketed aggregation"""
+        if not dr_ids:
+            return
+        self.ensure_collection(dr_type)
+        cursor = self.db[self.get_collection_name(dr_type)].find(
+            self.build_match(dr_ids, measure_type, start, end),
+            {
+                f"{self.META_FIELD}.measure_type": 1,
+                self.TIME_FIELD: 1,
+                "value": 1,
+                "_id": 0,
+            },
+        )
+        for point in cursor:
+            yield (
+                point[self.META_FIELD]["measure_type"],
+                point[self.TIME_FIELD],
+                point["value"],
+            )
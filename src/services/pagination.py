@@ -0,0 +1,89 @@
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+import base64
+import json
+
+
+# Sort keys usable for keyset pagination: name -> document field
+ORDER_FIELDS = {
+    "_id": "_id",
+    "updated_at": "metadata.updated_at",
+}
+
+
+def encode_cursor(order_by: str, document: Dict) -> str:
+    """Build an opaque 'after' token pointing just past a document"""
+    value = _get_path(document, ORDER_FIELDS[order_by])
+    if isinstance(value, datetime):
+        value = {"$date": value.isoformat()}
+    payload = json.dumps({"o": order_by, "v": value, "id": str(document["_id"])})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[str, Any, str]:
+    """Decode an 'after' token into (order_by, value, _id)"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value = payload["v"]
+        if isinstance(value, dict) and "$date" in value:
+            value = datetime.fromisoformat(value["$date"])
+        return payload["o"], value, payload["id"]
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+def build_keyset_query(
+    order_by: str, after: Optional[str], query: Optional[Dict] = None
+) -> Tuple[Dict, List[Tuple[str, int]]]:
+    """
+    Combine a filter with the keyset condition of an 'after' token
+
+    Returns:
+        Tuple[Dict, List]: (MongoDB filter, sort specification)
+    """
+    if order_by not in ORDER_FIELDS:
+        raise ValueError(f"order_by must be one of {list(ORDER_FIELDS)}")
+
+    field = ORDER_FIELDS[order_by]
+    sort = [("_id", 1)] if field == "_id" else [(field, 1), ("_id", 1)]
+    conditions = [query] if query else []
+
+    if after:
+        cursor_order, value, last_id = decode_cursor(after)
+        if cursor_order != order_by:
+            raise ValueError("Pagination cursor was issued for another order_by")
+        if field == "_id":
+            conditions.append({"_id": {"$gt": last_id}})
+        else:
+            conditions.append(
+                {
+                    "$or": [
+                        {field: {"$gt": value}},
+                        {field: value, "_id": {"$gt": last_id}},
+                    ]
+                }
+            )
+
+    if not conditions:
+        return {}, sort
+    if len(conditions) == 1:
+        return conditions[0], sort
+    return {"$and": conditions}, sort
+
+
+def build_projection(fields: Optional[List[str]], order_by: str = "_id") -> Optional[Dict]:
+    """Project the requested fields, keeping what the next cursor needs"""
+    if not fields:
+        return None
+    projection = {field: 1 for field in fields}
+    if ORDER_FIELDS[order_by] != "_id":
+        projection[ORDER_FIELDS[order_by]] = 1
+    return projection
+
+
+def _get_path(document: Dict, path: str) -> Any:
+    value = document
+    for key in path.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
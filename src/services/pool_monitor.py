@@ -0,0 +1,91 @@
+from typing import Dict
+from collections import deque
+import threading
+
+from pymongo import monitoring
+
+# Number of recent checkout waits kept to compute percentiles
+WAIT_SAMPLE_SIZE = 1000
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Collects connection pool (CMAP) statistics of a MongoClient
+
+    Pass an instance in MongoClient(event_listeners=[...]). Tracks how long
+    operations wait to check a connection out of the pool, how many
+    checkouts failed (e.g. waitQueueTimeoutMS exceeded) and how many
+    connections are open and in use.
+    """
+
+    def __init__(self, sample_size: int = WAIT_SAMPLE_SIZE):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=sample_size)
+        self.checkouts = 0
+        self.checkout_failures: Dict[str, int] = {}
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.in_use = 0
+        self.open_connections = 0
+        self.pools_cleared = 0
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = {
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "wait_avg_ms": self.wait_total_ms / self.checkouts if self.checkouts else 0.0,
+                "wait_max_ms": self.wait_max_ms,
+                "in_use": self.in_use,
+                "open_connections": self.open_connections,
+                "pools_cleared": self.pools_cleared,
+            }
+            waits = sorted(self._waits)
+        for p in (50, 95, 99):
+            stats[f"wait_p{p}_ms"] = waits[len(waits) * p // 100] if waits else 0.0
+        return stats
+
+    def connection_checked_out(self, event) -> None:
+        wait_ms = event.duration * 1000
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            self._waits.append(wait_ms)
+
+    def connection_check_out_failed(self, event) -> None:
+        with self._lock:
+            reason = str(event.reason)
+            self.checkout_failures[reason] = self.checkout_failures.get(reason, 0) + 1
+
+    def connection_checked_in(self, event) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def connection_created(self, event) -> None:
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event) -> None:
+        with self._lock:
+            self.open_connections -= 1
+
+    def pool_cleared(self, event) -> None:
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_check_out_started(self, event) -> None:
+        pass
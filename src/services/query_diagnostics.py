@@ -0,0 +1,117 @@
+from typing import Dict, List, Optional
+from collections import deque
+from datetime import datetime
+import threading
+
+# query_drs calls slower than this are recorded
+DEFAULT_SLOW_QUERY_MS = 100
+# Number of slow queries kept (oldest are dropped first)
+DEFAULT_MAX_ENTRIES = 100
+
+
+class SlowQueryLog:
+    """
+    Bounded in-memory log of slow DR queries
+
+    Stores what is needed to re-run the query through explain() later, so
+    nothing is paid on the query path beyond a clock read.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = DEFAULT_SLOW_QUERY_MS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        self.threshold_ms = threshold_ms
+        self._entries = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def record(
+        self,
+        dr_type: str,
+        collection: str,
+        query: Dict,
+        sort: List,
+        limit: Optional[int],
+        projection: Optional[Dict],
+        duration_ms: float,
+        returned: int,
+    ) -> bool:
+        """Record a query if it exceeded the threshold; returns whether it did"""
+        if duration_ms < self.threshold_ms:
+            return False
+        with self._lock:
+            self.recorded += 1
+            self._entries.append(
+                {
+                    "dr_type": dr_type,
+                    "collection": collection,
+                    "filter": query,
+                    "sort": sort,
+                    "limit": limit,
+                    "projection": projection,
+                    "duration_ms": round(duration_ms, 3),
+                    "returned": returned,
+                    "at": datetime.utcnow(),
+                }
+            )
+        return True
+
+    def entries(self) -> List[Dict]:
+        """Recorded queries, slowest first"""
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries]
+        return sorted(entries, key=lambda entry: entry["duration_ms"], reverse=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def explain_find(db, entry: Dict) -> Dict:
+    """Run explain (executionStats) for a recorded find"""
+    command = {"find": entry["collection"], "filter": entry["filter"]}
+    if entry.get("sort"):
+        command["sort"] = dict(entry["sort"])
+    if entry.get("limit"):
+        command["limit"] = entry["limit"]
+    if entry.get("projection"):
+        command["projection"] = entry["projection"]
+    return db.command("explain", command, verbosity="executionStats")
+
+
+def summarize_plan(explain: Dict) -> Dict:
+    """
+    Reduce an explain() result to what matters for indexing
+
+    Returns:
+        Dict: {"stages": [...], "indexes": [...], "collection_scan": bool,
+               "docs_examined", "keys_examined", "returned", "execution_ms"}
+    """
+    stages, indexes = [], []
+
+    def walk(stage: Dict) -> None:
+        stages.append(stage.get("stage"))
+        if stage.get("indexName"):
+            indexes.append(stage["indexName"])
+        for child in stage.get("inputStages", []):
+            walk(child)
+        if "inputStage" in stage:
+            walk(stage["inputStage"])
+
+    planner = explain.get("queryPlanner", {})
+    winning_plan = planner.get("winningPlan", {})
+    # Slot based engine (SBE) nests the classic plan under queryPlan
+    walk(winning_plan.get("queryPlan", winning_plan))
+
+    stats = explain.get("executionStats", {})
+    return {
+        "stages": stages,
+        "indexes": indexes,
+        "collection_scan": "COLLSCAN" in stages,
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "returned": stats.get("nReturned"),
+        "execution_ms": stats.get("executionTimeMillis"),
+    }
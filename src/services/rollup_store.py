@@ -0,0 +1,344 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import math
+import os
+import socket
+import time
+import uuid
+from pymongo import ASCENDING, UpdateOne
+from src.services.measurement_store import parse_timestamp
+
+
+# Seconds after which a rollup writer that stopped refreshing its heartbeat
+# is no longer considered active (see RollupStore.active_writers)
+WRITER_TTL = 30
+
+# Rollup granularities, finest first: name -> ($dateTrunc unit, seconds)
+GRANULARITIES = {
+    "minute": ("minute", 60),
+    "hour": ("hour", 3600),
+    "day": ("day", 86400),
+}
+
+
+def _truncate(timestamp: datetime, seconds: int) -> datetime:
+    """Truncate a naive UTC datetime to a multiple of `seconds` since the epoch"""
+    epoch = datetime(1970, 1, 1)
+    offset = (timestamp - epoch) // timedelta(seconds=1)
+    return epoch + timedelta(seconds=offset - offset % seconds)
+
+
+class RollupStore:
+    """
+    Incrementally maintained per-DR, per-measure_type aggregates
+
+    For each granularity the `measurement_rollups` collection holds one
+    document per (dr_type, dr_id, measure_type, bucket_start) with count,
+    sum, sum_sq, min and max, so statistics over long periods can be
+    answered without reading raw measurements.
+
+    Every store registers itself as a writer in the state collection and
+    refreshes that heartbeat while it applies measurements, so that an
+    offline rebuild can tell whether servers are still writing.
+    """
+
+    COLLECTION = "measurement_rollups"
+    # One document per DR type whose rollups were backfilled from raw data
+    STATE_COLLECTION = "measurement_rollup_state"
+
+    def __init__(self, db):
+        self.db = db
+        self.collection = db[self.COLLECTION]
+        self.state = db[self.STATE_COLLECTION]
+        self.writer_id = (
+            f"writer:{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        )
+        self._next_heartbeat = 0.0
+        self._ensure_indexes()
+        self.heartbeat()
+
+    def _ensure_indexes(self) -> None:
+        self.collection.create_index(
+            [
+                ("dr_type", ASCENDING),
+                ("dr_id", ASCENDING),
+                ("granularity", ASCENDING),
+                ("measure_type", ASCENDING),
+                ("bucket_start", ASCENDING),
+            ],
+            unique=True,
+        )
+
+    def heartbeat(self) -> None:
+        """Record that this store is writing rollups"""
+        self.state.update_one(
+            {"_id": self.writer_id},
+            {"$set": {"writer": True, "seen_at": datetime.utcnow()}},
+            upsert=True,
+        )
+        self._next_heartbeat = time.monotonic() + WRITER_TTL / 3
+
+    def active_writers(self) -> List[str]:
+        """Other stores that applied measurements in the last WRITER_TTL seconds"""
+        cutoff = datetime.utcnow() - timedelta(seconds=WRITER_TTL)
+        return [
+            doc["_id"]
+            for doc in self.state.find(
+                {
+                    "writer": True,
+                    "seen_at": {"$gte": cutoff},
+                    "_id": {"$ne": self.writer_id},
+                },
+                {"_id": 1},
+            )
+        ]
+
+    def close(self) -> None:
+        """Unregister this store as a writer"""
+        self.state.delete_one({"_id": self.writer_id})
+
+    def apply(self, dr_type: str, items: List[Tuple[str, Dict]]) -> None:
+        """
+        Fold new measurements into the rollups
+
+        Args:
+            dr_type: Type of Digital Replica
+            items: (dr_id, measurement) pairs
+        """
+        partials: Dict[Tuple, List[float]] = {}
+        for dr_id, measurement in items:
+            value = float(measurement["value"])
+            timestamp = parse_timestamp(measurement["timestamp"])
+            for granularity, (_, seconds) in GRANULARITIES.items():
+                key = (
+                    dr_id,
+                    measurement["measure_type"],
+                    granularity,
+                    _truncate(timestamp, seconds),
+                )
+                partial = partials.get(key)
+                if partial is None:
+                    partials[key] = [1, value, value * value, value, value]
+                else:
+                    partial[0] += 1
+                    partial[1] += value
+                    partial[2] += value * value
+                    partial[3] = min(partial[3], value)
+                    partial[4] = max(partial[4], value)
+
+        if not partials:
+            return
+        if time.monotonic() >= self._next_heartbeat:
+            self.heartbeat()
+
+        operations = [
+            UpdateOne(
+                {
+                    "dr_type": dr_type,
+                    "dr_id": dr_id,
+                    "granularity": granularity,
+                    "measure_type": measure_type,
+                    "bucket_start": bucket_start,
+                },
+                {
+                    "$inc": {"count": count, "sum": total, "sum_sq": total_sq},
+                    "$min": {"min": low},
+                    "$max": {"max": high},
+                },
+                upsert=True,
+            )
+            for (dr_id, measure_type, granularity, bucket_start), (
+                count,
+                total,
+                total_sq,
+                low,
+                high,
+            ) in partials.items()
+        ]
+        self.collection.bulk_write(operations, ordered=False)
+
+    def delete(self, dr_type: str, dr_ids: Optional[List[str]] = None) -> None:
+        """Delete the rollups of some DRs, or of a whole DR type"""
+        query = {"dr_type": dr_type}
+        if dr_ids is not None:
+            query["dr_id"] = {"$in": list(dr_ids)}
+        else:
+            self.state.delete_one({"_id": dr_type})
+        self.collection.delete_many(query)
+
+    def mark_backfilled(self, dr_type: str) -> None:
+        """Record that the rollups of a DR type cover all its raw measurements"""
+        self.state.update_one(
+            {"_id": dr_type},
+            {"$set": {"backfilled_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+
+    def is_backfilled(self, dr_types: List[str]) -> bool:
+        """Whether a full backfill completed for every given DR type"""
+        dr_types = set(dr_types)
+        return bool(dr_types) and self.state.count_documents(
+            {"_id": {"$in": list(dr_types)}}
+        ) == len(dr_types)
+
+    def replace(self, dr_type: str, dr_id: str, measurements: List[Dict]) -> None:
+        """Recompute the rollups of one DR from its full list of measurements"""
+        self.delete(dr_type, [dr_id])
+        self.apply(dr_type, [(dr_id, m) for m in measurements])
+
+    def choose_granularity(
+        self,
+        window_seconds: Optional[int] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Optional[str]:
+        """
+        Return the coarsest granularity able to answer a query exactly
+
+        A granularity qualifies when it divides the window length and the
+        start/end bounds fall on its bucket boundaries. Returns None when
+        raw measurements must be used instead.
+        """
+        for granularity in reversed(list(GRANULARITIES)):
+            seconds = GRANULARITIES[granularity][1]
+            if window_seconds is not None and window_seconds % seconds:
+                continue
+            if any(
+                bound is not None and _truncate(bound, seconds) != bound
+                for bound in (start, end)
+            ):
+                continue
+            return granularity
+        return None
+
+    def query(
+        self,
+        ids_by_type: Dict[str, List[str]],
+        granularity: str,
+        measure_type: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        window: Optional[Tuple[str, int]] = None,
+    ) -> List[Dict]:
+        """
+        Combine rollup buckets server-side
+
+        Args:
+            ids_by_type: dr_type -> DR IDs to include
+            granularity: Rollup granularity to read
+            measure_type: Optional measurement type filter
+            start: Optional inclusive lower bound on bucket_start
+            end: Optional exclusive upper bound on bucket_start
+            window: Optional ($dateTrunc unit, binSize) to re-bucket into;
+                one total per measure type is returned when omitted
+
+        Returns:
+            List[Dict]: {measure_type, start (windowed only), count, sum, mean,
+            min, max, stddev} rows
+        """
+        match = {
+            "granularity": granularity,
+            "$or": [
+                {"dr_type": dr_type, "dr_id": {"$in": list(dr_ids)}}
+                for dr_type, dr_ids in ids_by_type.items()
+            ],
+        }
+        if measure_type:
+            match["measure_type"] = measure_type
+        if start or end:
+            match["bucket_start"] = {}
+            if start:
+                match["bucket_start"]["$gte"] = start
+            if end:
+                match["bucket_start"]["$lt"] = end
+
+        group_id = {"measure_type": "$measure_type"}
+        sort = {"_id.measure_type": 1}
+        if window:
+            unit, bin_size = window
+            group_id["start"] = {
+                "$dateTrunc": {"date": "$bucket_start", "unit": unit, "binSize": bin_size}
+            }
+            sort = {"_id.start": 1}
+
+        rows = self.collection.aggregate(
+            [
+                {"$match": match},
+                {
+                    "$group": {
+                        "_id": group_id,
+                        "count": {"$sum": "$count"},
+                        "sum": {"$sum": "$sum"},
+                        "sum_sq": {"$sum": "$sum_sq"},
+                        "min": {"$min": "$min"},
+                        "max": {"$max": "$max"},
+                    }
+                },
+                {"$sort": sort},
+            ]
+        )
+
+        results = []
+        for row in rows:
+            count = row["count"]
+            variance = (
+                max(row["sum_sq"] - row["sum"] * row["sum"] / count, 0.0) / (count - 1)
+                if count > 1
+                else 0.0
+            )
+            result = {
+                "measure_type": row["_id"]["measure_type"],
+                "count": count,
+                "sum": row["sum"],
+                "mean": row["sum"] / count,
+                "min": row["min"],
+                "max": row["max"],
+                "stddev": math.sqrt(variance) if count > 1 else 0,
+            }
+            if window:
+                result["start"] = row["_id"]["start"]
+            results.append(result)
+        return results
+
+
+def main():
+    """Command line entry point: python -m src.services.rollup_store rebuild ..."""
+    import argparse
+    from config.config_loader import ConfigLoader
+    from src.services.database_service import DatabaseService
+    from src.virtualization.digital_replica.schema_registry import SchemaRegistry
+
+    parser = argparse.ArgumentParser(description="Manage measurement rollups")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rebuild = subparsers.add_parser("rebuild", help="Recompute rollups from raw measurements")
+    rebuild.add_argument("--dr-type", required=True, help="Digital Replica type")
+    rebuild.add_argument(
+        "--dr-id", action="append", help="Only rebuild these DRs (repeatable)"
+    )
+    rebuild.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild even if servers are writing measurements (their appends "
+        "during the rebuild may be counted twice or lost)",
+    )
+    rebuild.add_argument("--config", default="config/database.yaml")
+    args = parser.parse_args()
+
+    db_config = ConfigLoader.load_database_config(args.config)
+    db_service = DatabaseService(
+        connection_string=ConfigLoader.build_connection_string(db_config),
+        db_name=db_config["settings"]["name"],
+        schema_registry=SchemaRegistry(),
+        measurement_storage=db_config["settings"].get("measurement_storage", "embedded"),
+        rollups=True,
+    )
+    db_service.connect()
+    try:
+        folded = db_service.rebuild_rollups(args.dr_type, args.dr_id, force=args.force)
+        print(f"Rebuilt rollups for {args.dr_type}: {folded} measurements folded")
+    finally:
+        db_service.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+from typing import Dict, Iterable, List, Optional, Type
+from importlib import import_module, metadata
+import inspect
+import json
+import pkgutil
+import threading
+
+from src.services.base import BaseService
+
+# Packages scanned for BaseService subclasses
+DEFAULT_PACKAGES = ("src.services",)
+# Entry point group of services shipped by other distributions, e.g. in pyproject.toml:
+#   [project.entry-points."digital_twin.services"]
+#   MyService = "my_package.services:MyService"
+ENTRY_POINT_GROUP = "digital_twin.services"
+
+
+class ServiceRegistry:
+    """
+    Registry of the service classes Digital Twins can use
+
+    discover() imports the service packages and entry points once and keeps
+    the BaseService subclasses by name, so attaching a service to a twin is
+    a dictionary lookup instead of an import.
+
+    get_instance() returns one shared instance per service name and
+    configuration. Services are expected to keep no per-call state (inputs
+    come through execute), so a single instance can serve every twin and
+    thread. Services that do keep state set `shared = False` and get a new
+    instance on every call.
+    """
+
+    def __init__(
+        self,
+        packages: Iterable[str] = DEFAULT_PACKAGES,
+        entry_point_group: Optional[str] = ENTRY_POINT_GROUP,
+    ):
+        self.packages = tuple(packages)
+        self.entry_point_group = entry_point_group
+        self._classes: Dict[str, Type[BaseService]] = {}
+        self._instances: Dict[tuple, BaseService] = {}
+        self._lock = threading.Lock()
+        self.errors: Dict[str, str] = {}  # module or entry point -> import error
+        self.discovered = False
+
+    def discover(self) -> List[str]:
+        """
+        Scan the packages and entry points for services
+
+        Modules that fail to import (e.g. a missing optional dependency) are
+        skipped and reported in `errors`.
+
+        Returns:
+            List[str]: Registered service names
+        """
+        for package_name in self.packages:
+            package = import_module(package_name)
+            for module_info in pkgutil.iter_modules(
+                package.__path__, prefix=f"{package_name}."
+            ):
+                try:
+                    module = import_module(module_info.name)
+                except Exception as e:
+                    self.errors[module_info.name] = str(e)
+                    continue
+                for _, cls in inspect.getmembers(module, inspect.isclass):
+                    if cls.__module__ == module.__name__ and self._is_service(cls):
+                        self.register(cls)
+
+        if self.entry_point_group:
+            for entry_point in metadata.entry_points(group=self.entry_point_group):
+                try:
+                    cls = entry_point.load()
+                except Exception as e:
+                    self.errors[entry_point.value] = str(e)
+                    continue
+                if not self._is_service(cls):
+                    self.errors[entry_point.value] = "Not a BaseService subclass"
+                    continue
+                self.register(cls, name=entry_point.name)
+
+        self.discovered = True
+        return self.names()
+
+    @staticmethod
+    def _is_service(cls) -> bool:
+        return (
+            inspect.isclass(cls)
+            and issubclass(cls, BaseService)
+            and not inspect.isabstract(cls)
+        )
+
+    def register(self, service_class: Type[BaseService], name: str = None) -> None:
+        """Register a service class (under its class name by default)"""
+        if not self._is_service(service_class):
+            raise ValueError(f"{service_class!r} is not a concrete BaseService subclass")
+        with self._lock:
+            self._classes[name or service_class.__name__] = service_class
+
+    def names(self) -> List[str]:
+        return sorted(self._classes)
+
+    def has(self, name: str) -> bool:
+        return name in self._classes
+
+    def get_class(self, name: str) -> Type[BaseService]:
+        """
+        Get a service class by name
+
+        Raises:
+            ValueError: If no service is registered under that name
+        """
+        try:
+            return self._classes[name]
+        except KeyError:
+            raise ValueError(f"Service {name} not registered")
+
+    def get_instance(self, name: str, config: Optional[Dict] = None) -> BaseService:
+        """
+        Get a configured service instance, shared unless the class sets shared = False
+
+        Args:
+            name: Service name
+            config: Optional configuration passed to the service's configure()
+
+        Raises:
+            ValueError: If the service is unknown or rejects the configuration
+        """
+        service_class = self.get_class(name)
+        if not getattr(service_class, "shared", True):
+            return self._create(service_class, config)
+
+        key = (name, json.dumps(config or {}, sort_keys=True, default=str))
+        service = self._instances.get(key)
+        if service is None:
+            with self._lock:
+                service = self._instances.get(key)
+                if service is None:
+                    service = self._create(service_class, config)
+                    self._instances[key] = service
+        return service
+
+    @staticmethod
+    def _create(service_class: Type[BaseService], config: Optional[Dict]) -> BaseService:
+        service = service_class()
+        if config and hasattr(service, "configure"):
+            service.configure(config)
+        return service
+
+    def get_stats(self) -> Dict:
+        return {
+            "services": self.names(),
+            "shared_instances": len(self._instances),
+            "errors": dict(self.errors),
+        }
@@ -1,23 +1,205 @@
 from datetime import datetime
-from typing import Dict, Any, Type, Optional, List, Union
-from pydantic import BaseModel, create_model, Field, field_validator
+from typing import Annotated, Dict, Any, Callable, Type, Optional, List, Tuple, Union
+from pydantic import BaseModel, create_model, Field, field_validator, TypeAdapter
+import os
+import threading
+import time
 import yaml
 import uuid
 
 
+# Compiled Profile/Data models and per-field validators shared by every
+# DRFactory instance.
+# schema path -> (mtime_ns, schema, ProfileModel, DataModel, field validators)
+_MODEL_CACHE: Dict[
+    str, Tuple[int, Dict, Type[BaseModel], Type[BaseModel], Dict[str, Any]]
+] = {}
+_MODEL_CACHE_LOCK = threading.Lock()
+
+# Seconds between two checks of a template's mtime (hot reload latency)
+SCHEMA_CHECK_INTERVAL = 2.0
+# schema path -> time.monotonic() of the last mtime check
+_MTIME_CHECKED_AT: Dict[str, float] = {}
+
+# Python types of scalar template types
+_SCALAR_TYPES = {"str": str, "int": int, "float": float, "bool": bool, "datetime": datetime}
+
+# Sections a patch may touch, and metadata fields managed by the factory
+PATCHABLE_SECTIONS = ("profile", "data", "metadata")
+MANAGED_METADATA = ("created_at", "updated_at")
+
+
+def _validate_list_items(
+    field_name: str,
+    value: Any,
+    required_fields: List[str],
+    type_mappings: Dict[str, str],
+) -> List[Dict]:
+    """Validate the items of a List[Dict] field against its item_constraints"""
+    if not isinstance(value, list):
+        raise ValueError(f"{field_name} must be a list")
+
+    for idx, item in enumerate(value):
+        if not isinstance(item, dict):
+            raise ValueError(f"Item {idx} in {field_name} must be a dictionary")
+
+        missing = [f for f in required_fields if f not in item]
+        if missing:
+            raise ValueError(f"Missing required fields {missing} in item {idx}")
+
+        for key, expected_type in type_mappings.items():
+            if key in item:
+                val = item[key]
+                if expected_type == "datetime":
+                    # Strings must parse now: storage converts them later
+                    try:
+                        if isinstance(val, str):
+                            datetime.fromisoformat(val.replace("Z", "+00:00"))
+                        elif not isinstance(val, datetime):
+                            raise ValueError
+                    except ValueError:
+                        raise ValueError(
+                            f"Field {key} in item {idx} must be an ISO-8601 datetime"
+                        )
+                elif expected_type == "float":
+                    try:
+                        item[key] = float(val)
+                    except (TypeError, ValueError):
+                        raise ValueError(f"Field {key} in item {idx} must be a number")
+    return value
+
+
+def _scalar_validator(field_name: str, field_type: str, rules: Dict) -> Callable:
+    """Validator for a scalar field, with its min/max/enum constraints"""
+    constraints = {}
+    if "min" in rules:
+        constraints["ge"] = rules["min"]
+    if "max" in rules:
+        constraints["le"] = rules["max"]
+    adapter = TypeAdapter(
+        Annotated[_SCALAR_TYPES.get(field_type, Any), Field(**constraints)]
+    )
+    enum_values = rules.get("enum")
+
+    def validate(value):
+        value = adapter.validate_python(value)
+        if enum_values is not None and value not in enum_values:
+            raise ValueError(f"{field_name} must be one of {enum_values}")
+        return value
+
+    return validate
+
+
+def _check_keys(path: str, value: Any) -> None:
+    """Reject nested keys MongoDB would read as operators or dotted paths"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if not isinstance(key, str) or key.startswith("$") or "." in key:
+                raise ValueError(f"Invalid key in {path}: {key!r}")
+            _check_keys(f"{path}.{key}", item)
+    elif isinstance(value, list):
+        for item in value:
+            _check_keys(path, item)
+
+
+def _list_of_dicts_validators(
+    field_name: str, item_rules: Dict
+) -> Tuple[Callable, Callable]:
+    """(whole list, single item) validators for a List[Dict] field"""
+    required_fields = item_rules.get("required_fields", [])
+    type_mappings = item_rules.get("type_mappings", {})
+
+    def validate_list(value):
+        return _validate_list_items(field_name, value, required_fields, type_mappings)
+
+    def validate_item(item):
+        return validate_list([item])[0]
+
+    return validate_list, validate_item
+
+
 class DRFactory:
     def __init__(self, schema_path: str):
-        self.schema = self._load_schema(schema_path)
-        if not self.schema or "schemas" not in self.schema:
-            raise ValueError(f"Invalid schema structure in {schema_path}")
+        self.schema_path = os.path.abspath(schema_path)
+        self.schema = None
+        self._get_models()
+
+    @classmethod
+    def clear_model_cache(cls) -> None:
+        """Drop every compiled model, forcing a rebuild on next use"""
+        with _MODEL_CACHE_LOCK:
+            _MODEL_CACHE.clear()
+
+    def reload(self) -> None:
+        """Recompile the models for this template even if the file is unchanged"""
+        with _MODEL_CACHE_LOCK:
+            _MODEL_CACHE.pop(self.schema_path, None)
+        self._get_models()
+
+    def _get_models(self) -> Tuple[Type[BaseModel], Type[BaseModel]]:
+        """Return the (ProfileModel, DataModel) pair for this template"""
+        entry = self._get_cache_entry()
+        return entry[2], entry[3]
+
+    def _get_field_validators(self) -> Dict[str, Any]:
+        """Return the dotted path -> validator mapping for this template"""
+        return self._get_cache_entry()[4]
+
+    def _get_cache_entry(
+        self,
+    ) -> Tuple[int, Dict, Type[BaseModel], Type[BaseModel], Dict[str, Any]]:
+        """
+        Return the _MODEL_CACHE entry for this template, compiling it if needed
+
+        Models are compiled once per (schema path, mtime) and shared across
+        instances. A change to the YAML file on disk bumps its mtime, which
+        triggers a recompile (hot reload); the mtime is only checked every
+        SCHEMA_CHECK_INTERVAL seconds, not on every call.
+        """
+        entry = _MODEL_CACHE.get(self.schema_path)
+        now = time.monotonic()
+        if (
+            entry is not None
+            and now - _MTIME_CHECKED_AT.get(self.schema_path, 0.0)
+            < SCHEMA_CHECK_INTERVAL
+        ):
+            self.schema = entry[1]
+            return entry
+
+        try:
+            mtime = os.stat(self.schema_path).st_mtime_ns
+        except OSError as e:
+            raise ValueError(f"Failed to load schema: {str(e)}")
+        _MTIME_CHECKED_AT[self.schema_path] = now
+
+        if entry is None or entry[0] != mtime:
+            with _MODEL_CACHE_LOCK:
+                entry = _MODEL_CACHE.get(self.schema_path)
+                if entry is None or entry[0] != mtime:
+                    self.schema = self._load_schema(self.schema_path)
+                    entry = (
+                        mtime,
+                        self.schema,
+                        self._create_profile_model(),
+                        self._create_data_model(),
+                        self._create_field_validators(),
+                    )
+                    _MODEL_CACHE[self.schema_path] = entry
+
+        self.schema = entry[1]
+        return entry
 
     def _load_schema(self, path: str) -> Dict:
         try:
             with open(path, "r") as file:
-                return yaml.safe_load(file)
+                schema = yaml.safe_load(file)
         except Exception as e:
             raise ValueError(f"Failed to load schema: {str(e)}")
 
+        if not schema or "schemas" not in schema:
+            raise ValueError(f"Invalid schema structure in {path}")
+        return schema
+
     def _create_profile_model(self) -> Type[BaseModel]:
         """Create Pydantic model for profile section"""
         mandatory_fields = (
@@ -140,47 +322,171 @@ class DRFactory:
 
                     @field_validator(field_name)
                     def validate_list_items(value, field):
-                        if not isinstance(value, list):
-                            raise ValueError(f"{field.name} must be a list")
-
-                        for idx, item in enumerate(value):
-                            if not isinstance(item, dict):
-                                raise ValueError(
-                                    f"Item {idx} in {field.name} must be a dictionary"
-                                )
-
-                            missing = [f for f in required_fields if f not in item]
-                            if missing:
-                                raise ValueError(
-                                    f"Missing required fields {missing} in item {idx}"
-                                )
-
-                            for key, expected_type in type_mappings.items():
-                                if key in item:
-                                    val = item[key]
-                                    if expected_type == "datetime":
-                                        if not isinstance(val, (datetime, str)):
-                                            raise ValueError(
-                                                f"Field {key} in item {idx} must be a datetime"
-                                            )
-                                    elif expected_type == "float":
-                                        try:
-                                            item[key] = float(val)
-                                        except (TypeError, ValueError):
-                                            raise ValueError(
-                                                f"Field {key} in item {idx} must be a number"
-                                            )
-                        return value
+                        return _validate_list_items(
+                            field.name, value, required_fields, type_mappings
+                        )
 
                     setattr(model, f"validate_{field_name}", validate_list_items)
 
         return model
 
-    def create_dr(self, dr_type: str, initial_data: Dict[str, Any]) -> Dict:
-        """Create a new Digital Replica instance"""
-        # Create Pydantic models for sections
-        ProfileModel = self._create_profile_model()
-        DataModel = self._create_data_model()
+    def _create_field_validators(self) -> Dict[str, Any]:
+        """
+        Create one validator per profile/data/metadata field, keyed by dotted
+        path (metadata fields managed by the factory are left out)
+
+        Validators take a value and return it coerced like the section models
+        would, or raise ValueError.
+
+        Returns:
+            Dict: {"fields": {path: validator}, "items": {path: validator for
+                one item of a list field}, "required": set of paths}
+        """
+        validations = self.schema["schemas"].get("validations", {})
+        type_constraints = validations.get("type_constraints", {})
+        mandatory_profile = validations.get("mandatory_fields", {}).get("profile", [])
+
+        fields, items, required = {}, {}, set()
+        sections = {
+            "profile": self.schema["schemas"]["common_fields"].get("profile", {}),
+            "data": self.schema["schemas"].get("entity", {}).get("data", {}),
+            "metadata": self.schema["schemas"]["common_fields"].get("metadata", {}),
+        }
+        for section, section_fields in sections.items():
+            for field_name, field_type in section_fields.items():
+                if section == "metadata" and field_name in MANAGED_METADATA:
+                    continue
+                path = f"{section}.{field_name}"
+                rules = type_constraints.get(field_name, {})
+                if field_type == "List[Dict]":
+                    fields[path], items[path] = _list_of_dicts_validators(
+                        field_name, rules.get("item_constraints", {})
+                    )
+                elif field_type == "List[str]":
+                    fields[path] = TypeAdapter(List[str]).validate_python
+                    items[path] = TypeAdapter(str).validate_python
+                else:
+                    fields[path] = _scalar_validator(field_name, field_type, rules)
+                if section == "profile" and field_name in mandatory_profile:
+                    required.add(path)
+        return {"fields": fields, "items": items, "required": required}
+
+    def build_patch(
+        self,
+        updates: Optional[Dict[str, Any]] = None,
+        push: Optional[Dict[str, List]] = None,
+    ) -> Dict[str, Dict]:
+        """
+        Build a MongoDB update document for a partial update
+
+        Only the given fields are validated, and each becomes its own dotted
+        path, so unchanged fields (e.g. a long measurements array) are
+        neither revalidated nor rewritten. Every field, metadata included,
+        must be declared by the template; metadata.created_at/updated_at
+        cannot be written.
+
+        Args:
+            updates: Nested changes per section, e.g.
+                {"data": {"status": "inactive"}, "profile": {"grape": None}};
+                None removes an optional field ($unset)
+            push: Items to append to list fields, e.g.
+                {"data.measurements": [{...}]}
+
+        Returns:
+            Dict: {"$set": {...}, "$unset": {...}, "$push": {...}} (empty
+                operators omitted); metadata.updated_at is always set
+        """
+        validators = self._get_field_validators()
+        field_validators = validators["fields"]
+        set_fields, unset_fields, push_fields = {}, {}, {}
+
+        for section, changes in (updates or {}).items():
+            if section not in PATCHABLE_SECTIONS:
+                raise ValueError(f"Cannot update section: {section}")
+            if not isinstance(changes, dict):
+                raise ValueError(f"{section} must be an object")
+            for field_name, value in changes.items():
+                path = f"{section}.{field_name}"
+                managed = field_name.split(".")[0] in MANAGED_METADATA
+                if section == "metadata" and managed:
+                    raise ValueError(f"{path} is managed automatically")
+                if path not in field_validators:
+                    raise ValueError(f"Unknown field: {path}")
+
+                if value is None:
+                    if path in validators["required"]:
+                        raise ValueError(f"{path} is required")
+                    unset_fields[path] = ""
+                else:
+                    try:
+                        set_fields[path] = field_validators[path](value)
+                    except Exception as e:
+                        raise ValueError(f"Invalid value for {path}: {str(e)}")
+                    _check_keys(path, set_fields[path])
+
+        for path, items in (push or {}).items():
+            item_validator = validators["items"].get(path)
+            if item_validator is None:
+                raise ValueError(f"Not a list field: {path}")
+            if not isinstance(items, list):
+                raise ValueError(f"Items to push to {path} must be a list")
+            if path in set_fields or path in unset_fields:
+                raise ValueError(f"Cannot both replace and push to {path}")
+            try:
+                push_fields[path] = {"$each": [item_validator(item) for item in items]}
+            except Exception as e:
+                raise ValueError(f"Invalid item for {path}: {str(e)}")
+            _check_keys(path, push_fields[path]["$each"])
+
+        set_fields["metadata.updated_at"] = datetime.utcnow()
+        patch = {"$set": set_fields}
+        if unset_fields:
+            patch["$unset"] = unset_fields
+        if push_fields:
+            patch["$push"] = push_fields
+        return patch
+
+    def validate_list_items(self, field_name: str, items: List[Dict]) -> List[Dict]:
+        """
+        Validate new items of a List[Dict] data field (e.g. measurements)
+
+        Only the given items are checked against the field's item_constraints,
+        so appending does not revalidate the whole Digital Replica.
+        """
+        self._get_models()
+        data_fields = self.schema["schemas"].get("entity", {}).get("data", {})
+        if data_fields.get(field_name) != "List[Dict]":
+            raise ValueError(f"{field_name} is not a List[Dict] data field")
+
+        item_rules = (
+            self.schema["schemas"]
+            .get("validations", {})
+            .get("type_constraints", {})
+            .get(field_name, {})
+            .get("item_constraints", {})
+        )
+        return _validate_list_items(
+            field_name,
+            items,
+            item_rules.get("required_fields", []),
+            item_rules.get("type_mappings", {}),
+        )
+
+    def create_dr(
+        self, dr_type: str, initial_data: Dict[str, Any], validate: bool = True
+    ) -> Dict:
+        """
+        Create a new Digital Replica instance
+
+        Args:
+            dr_type: Type of Digital Replica
+            initial_data: Initial profile/data/metadata sections
+            validate: Validate sections with the Pydantic models. Pass False
+                only when the collection enforces the template's $jsonSchema
+                (DatabaseService.sync_schema), e.g. for bulk loads.
+        """
+        # Compiled Pydantic models for sections (cached per template)
+        ProfileModel, DataModel = self._get_models()
 
         # Initialize with required fields and defaults
         dr_dict = {
@@ -215,12 +521,18 @@ class DRFactory:
 
         # Update with provided data and validate each section
         if "profile" in initial_data:
-            profile = ProfileModel(**initial_data["profile"])
-            dr_dict["profile"] = profile.model_dump(exclude_unset=True)
+            if validate:
+                profile = ProfileModel(**initial_data["profile"])
+                dr_dict["profile"] = profile.model_dump(exclude_unset=True)
+            else:
+                dr_dict["profile"] = dict(initial_data["profile"])
 
         if "data" in initial_data:
-            data = DataModel(**{**dr_dict["data"], **initial_data["data"]})
-            dr_dict["data"] = data.model_dump(exclude_unset=True)
+            if validate:
+                data = DataModel(**{**dr_dict["data"], **initial_data["data"]})
+                dr_dict["data"] = data.model_dump(exclude_unset=True)
+            else:
+                dr_dict["data"] = {**dr_dict["data"], **initial_data["data"]}
 
         if "metadata" in initial_data:
             dr_dict["metadata"].update(initial_data["metadata"])
@@ -229,9 +541,8 @@ class DRFactory:
 
     def update_dr(self, dr: Dict[str, Any], updates: Dict[str, Any]) -> Dict:
         """Update an existing Digital Replica"""
-        # Create Pydantic models
-        ProfileModel = self._create_profile_model()
-        DataModel = self._create_data_model()
+        # Compiled Pydantic models (cached per template)
+        ProfileModel, DataModel = self._get_models()
 
         updated_dr = dr.copy()
 
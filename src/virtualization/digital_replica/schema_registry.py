@@ -1,10 +1,25 @@
-from typing import Dict, Any
+from typing import Dict, Any, List
+import glob
+import os
 import yaml
 
 
+# Index options accepted in templates -> MongoDB createIndexes option names
+INDEX_OPTIONS = {
+    "name": "name",
+    "unique": "unique",
+    "sparse": "sparse",
+    "expire_after_seconds": "expireAfterSeconds",
+    "partial_filter": "partialFilterExpression",
+}
+INDEX_DIRECTIONS = (1, -1, "hashed", "2dsphere")
+
+
 class SchemaRegistry:
     def __init__(self):
         self.schemas = {}
+        self.schema_paths = {}
+        self.indexes = {}
 
     def load_schema(self, schema_type: str, yaml_path: str) -> None:
         """Load schema from YAML file"""
@@ -19,20 +34,89 @@ class SchemaRegistry:
             validation_schema = self._convert_yaml_to_mongodb_schema(
                 raw_schema["schemas"]
             )
+            indexes = self._parse_indexes(raw_schema["schemas"].get("indexes") or [])
             self.schemas[schema_type] = validation_schema
+            self.schema_paths[schema_type] = yaml_path
+            self.indexes[schema_type] = indexes
 
         except Exception as e:
             raise ValueError(f"Failed to load schema from {yaml_path}: {str(e)}")
 
-    def _convert_yaml_to_mongodb_schema(self, yaml_schema: Dict) -> Dict:
-        """Convert YAML schema format to MongoDB $jsonSchema format"""
+    def load_templates(self, directory: str) -> List[str]:
+        """
+        Load every YAML template of a directory, using the file name as type
+
+        Returns:
+            List[str]: Loaded schema types
+        """
+        loaded = []
+        for yaml_path in sorted(glob.glob(os.path.join(directory, "*.yaml"))):
+            schema_type = os.path.splitext(os.path.basename(yaml_path))[0]
+            self.load_schema(schema_type, yaml_path)
+            loaded.append(schema_type)
+        return loaded
+
+    def _parse_indexes(self, index_defs: List[Dict]) -> List[Dict]:
+        """
+        Parse the `indexes` section of a template
+
+        Each entry has `keys`, either a mapping ({field: 1|-1|hashed|2dsphere},
+        in order) or a list of [field, direction] pairs, plus optional name,
+        unique, sparse, expire_after_seconds (TTL) and partial_filter.
+
+        Returns:
+            List[Dict]: {"keys": [(field, direction), ...], "options": {...}}
+                with MongoDB option names and a name always set
+        """
+        indexes = []
+        for position, index_def in enumerate(index_defs):
+            if not isinstance(index_def, dict) or "keys" not in index_def:
+                raise ValueError(f"Index {position} must be a mapping with keys")
+            unknown = set(index_def) - set(INDEX_OPTIONS) - {"keys"}
+            if unknown:
+                raise ValueError(
+                    f"Unknown options for index {position}: {', '.join(sorted(unknown))}"
+                )
+
+            raw_keys = index_def["keys"]
+            if isinstance(raw_keys, dict):
+                keys = list(raw_keys.items())
+            else:
+                keys = [tuple(pair) for pair in raw_keys]
+            if not keys or any(
+                len(pair) != 2 or pair[1] not in INDEX_DIRECTIONS for pair in keys
+            ):
+                raise ValueError(f"Invalid keys for index {position}: {raw_keys}")
+
+            options = {
+                INDEX_OPTIONS[option]: value
+                for option, value in index_def.items()
+                if option != "keys"
+            }
+            options.setdefault(
+                "name", "_".join(f"{field}_{direction}" for field, direction in keys)
+            )
+            indexes.append({"keys": keys, "options": options})
+        return indexes
 
-        def convert_type(yaml_type: str) -> str:
+    def _convert_yaml_to_mongodb_schema(self, yaml_schema: Dict) -> Dict:
+        """
+        Convert YAML schema format to MongoDB $jsonSchema format
+
+        Mirrors what DRFactory enforces: mandatory_fields become `required`
+        at each level, min/max and enum constraints are carried over, and
+        List[Dict] items are checked against their item_constraints.
+        """
+        validations = yaml_schema.get("validations", {})
+        mandatory_fields = validations.get("mandatory_fields", {})
+        type_constraints = validations.get("type_constraints", {})
+
+        def convert_type(yaml_type: str) -> Any:
             """Convert YAML type to MongoDB BSON type"""
             type_mapping = {
                 "str": "string",
-                "int": "int",
-                "float": "double",
+                "int": ["int", "long"],
+                "float": "number",  # ints are accepted (and coerced) by DRFactory
                 "bool": "bool",
                 "datetime": "date",
                 "Dict": "object",
@@ -40,41 +124,82 @@ class SchemaRegistry:
             }
             return type_mapping.get(yaml_type, yaml_type)
 
-        def process_field(field_def):
+        def process_list(yaml_type: str, rules: Dict) -> Dict:
+            """Process List[...] field definitions"""
+            item_type = yaml_type[len("List[") : -1]
+            if item_type != "Dict":
+                return {"bsonType": "array", "items": {"bsonType": convert_type(item_type)}}
+
+            items = {"bsonType": "object"}
+            item_rules = rules.get("item_constraints", {})
+            if item_rules.get("required_fields"):
+                items["required"] = list(item_rules["required_fields"])
+            if item_rules.get("type_mappings"):
+                items["properties"] = {
+                    # DRFactory accepts ISO strings for datetime items
+                    key: {"bsonType": ["date", "string"]}
+                    if value == "datetime"
+                    else {"bsonType": convert_type(value)}
+                    for key, value in item_rules["type_mappings"].items()
+                }
+            return {"bsonType": "array", "items": items}
+
+        def process_field(field_name: str, field_def, required: List[str] = None):
             """Process a field definition from YAML to MongoDB format"""
+            rules = type_constraints.get(field_name, {})
+            if isinstance(field_def, str) and field_def.startswith("List["):
+                return process_list(field_def, rules)
             if isinstance(field_def, str):
-                return {"bsonType": convert_type(field_def)}
+                schema = {"bsonType": convert_type(field_def)}
+                if "min" in rules:
+                    schema["minimum"] = rules["min"]
+                if "max" in rules:
+                    schema["maximum"] = rules["max"]
+                if "enum" in rules:
+                    schema["enum"] = list(rules["enum"])
+                return schema
             elif isinstance(field_def, dict):
-                return {
+                schema = {
                     "bsonType": "object",
-                    "properties": {k: process_field(v) for k, v in field_def.items()},
+                    "properties": {
+                        k: process_field(k, v) for k, v in field_def.items()
+                    },
                 }
+                if required:
+                    schema["required"] = list(required)
+                return schema
             elif isinstance(field_def, list):
-                # Handle List[Dict] case
                 return {"bsonType": "array"}
             return field_def
 
         # Process common fields
         properties = {}
-        if "common_fields" in yaml_schema:
-            for field_name, field_def in yaml_schema["common_fields"].items():
-                properties[field_name] = process_field(field_def)
+        for field_name, field_def in yaml_schema.get("common_fields", {}).items():
+            if field_name in ("_id", "type"):
+                continue
+            properties[field_name] = process_field(
+                field_name, field_def, mandatory_fields.get(field_name)
+            )
 
         # Process entity fields
         if "entity" in yaml_schema and "data" in yaml_schema["entity"]:
-            properties["data"] = process_field(yaml_schema["entity"]["data"])
+            properties["data"] = process_field(
+                "data", yaml_schema["entity"]["data"], mandatory_fields.get("data")
+            )
 
-        # Process validations if present
-        required_fields = []
-        if "validations" in yaml_schema:
-            if "required" in yaml_schema["validations"]:
-                required_fields.extend(yaml_schema["validations"]["required"])
+        # Root level required fields (legacy templates use validations.required)
+        required_fields = ["_id", "type"]
+        for field_name in mandatory_fields.get("root", []) + validations.get(
+            "required", []
+        ):
+            if field_name not in required_fields:
+                required_fields.append(field_name)
 
         # Build final schema
         validation_schema = {
             "$jsonSchema": {
                 "bsonType": "object",
-                "required": ["_id", "type"] + required_fields,
+                "required": required_fields,
                 "properties": {
                     "_id": {"bsonType": "string"},
                     "type": {"bsonType": "string"},
@@ -94,3 +219,15 @@ class SchemaRegistry:
         if schema_type not in self.schemas:
             raise ValueError(f"Schema not found for type: {schema_type}")
         return self.schemas[schema_type]
+
+    def get_indexes(self, schema_type: str) -> List[Dict]:
+        """Get the indexes declared by the template of a schema type"""
+        if schema_type not in self.schemas:
+            raise ValueError(f"Schema not found for type: {schema_type}")
+        return self.indexes.get(schema_type, [])
+
+    def get_schema_path(self, schema_type: str) -> str:
+        """Get the YAML template path a schema type was loaded from"""
+        if schema_type not in self.schema_paths:
+            raise ValueError(f"Schema not found for type: {schema_type}")
+        return self.schema_paths[schema_type]
@@ -0,0 +1,163 @@
+"""
+Parity of AggregationService's MongoDB pipelines and in-process engines
+
+Every path runs on the same generated fleet and must report the same
+count/mean/min/max/stddev. The tests need a MongoDB server (5.0+ for the
+time-series cases), taken from DT_TEST_MONGODB_URI or config/database.yaml;
+they are skipped when none is reachable.
+"""
+
+import os
+
+import pytest
+from pymongo import MongoClient
+
+from benchmarks.fleet import FleetGenerator, template_types
+from config.config_loader import ConfigLoader
+from src.digital_twin.dt_factory import DTFactory
+from src.services.analytics import (
+    AUTO_MODE,
+    NUMPY_ENGINE,
+    PYTHON_ENGINE,
+    PYTHON_MODE,
+    SERVER_MODE,
+    AggregationService,
+    np,
+)
+from src.services.database_service import (
+    EMBEDDED_STORAGE,
+    TIMESERIES_STORAGE,
+    DatabaseService,
+)
+from src.virtualization.digital_replica.schema_registry import SchemaRegistry
+
+TEMPLATES = template_types(["src/virtualization/templates/bottle.yaml"])
+DR_TYPE = "bottle"
+DB_NAME = "dt_test_aggregation_parity"
+SUMMARY_FIELDS = ("count", "mean", "min", "max", "stddev")
+ENGINES = [PYTHON_ENGINE] + ([NUMPY_ENGINE] if np is not None else [])
+
+
+@pytest.fixture(scope="module")
+def connection_string():
+    uri = os.environ.get("DT_TEST_MONGODB_URI")
+    if not uri:
+        uri = ConfigLoader.build_connection_string(
+            ConfigLoader.load_database_config()
+        )
+    client = MongoClient(uri, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+    except Exception as e:
+        pytest.skip(f"MongoDB not reachable: {e}")
+    finally:
+        client.close()
+    return uri
+
+
+@pytest.fixture(scope="module", params=[EMBEDDED_STORAGE, TIMESERIES_STORAGE])
+def fleet(request, connection_string):
+    registry = SchemaRegistry()
+    for dr_type, path in TEMPLATES.items():
+        registry.load_schema(dr_type, path)
+    db_service = DatabaseService(
+        connection_string, DB_NAME, registry, measurement_storage=request.param
+    )
+    db_service.connect()
+    db_service.client.drop_database(DB_NAME)
+    try:
+        dt_factory = DTFactory(db_service, registry)
+        dt_ids = FleetGenerator(TEMPLATES, seed=7).load(
+            db_service, dt_factory, twins=2, replicas=6, measurements=90
+        )
+        yield db_service, dt_factory, dt_ids
+    finally:
+        db_service.client.drop_database(DB_NAME)
+        db_service.disconnect()
+
+
+def _execute(db_service, dt, mode, engine=PYTHON_ENGINE, **params):
+    service = AggregationService()
+    service.configure({"mode": mode, "engine": engine})
+    return service.execute(
+        {"digital_replicas": dt.digital_replicas, "db_service": db_service},
+        dr_type=DR_TYPE,
+        **params,
+    )
+
+
+def _assert_same_stats(expected, actual, fields=SUMMARY_FIELDS):
+    assert "error" not in expected
+    assert set(actual) == set(expected)
+    for measure_type, stats in expected.items():
+        for field in fields:
+            assert actual[measure_type][field] == pytest.approx(
+                stats[field], rel=1e-9, abs=1e-9
+            ), f"{measure_type}.{field}"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("attribute", [None, "temperature"])
+def test_summary_parity(fleet, engine, attribute):
+    db_service, dt_factory, dt_ids = fleet
+    for dt_id in dt_ids:
+        dt = dt_factory.get_dt_instance(dt_id)
+        server = _execute(db_service, dt, SERVER_MODE, attribute=attribute)
+        in_process = _execute(db_service, dt, PYTHON_MODE, engine, attribute=attribute)
+        _assert_same_stats(server, in_process)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_time_range_parity(fleet, engine):
+    db_service, dt_factory, dt_ids = fleet
+    dt = dt_factory.get_dt_instance(dt_ids[0])
+    params = {"start": "2024-01-01T00:20:00", "end": "2024-01-01T01:05:00"}
+    server = _execute(db_service, dt, SERVER_MODE, **params)
+    in_process = _execute(db_service, dt, PYTHON_MODE, engine, **params)
+    _assert_same_stats(server, in_process)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_window_parity(fleet, engine):
+    db_service, dt_factory, dt_ids = fleet
+    dt = dt_factory.get_dt_instance(dt_ids[0])
+    params = {"window": "15m", "agg": "count,sum,mean,min,max,stddev"}
+    server = _execute(db_service, dt, SERVER_MODE, **params)
+    in_process = _execute(db_service, dt, PYTHON_MODE, engine, **params)
+
+    assert set(server) == set(in_process)
+    for measure_type, series in server.items():
+        expected = {bucket["start"]: bucket for bucket in series["buckets"]}
+        actual = {bucket["start"]: bucket for bucket in in_process[measure_type]["buckets"]}
+        assert set(actual) == set(expected)
+        _assert_same_stats(expected, actual, ("count", "sum") + SUMMARY_FIELDS[1:])
+
+
+def test_stats_twin_is_pushed_down(fleet):
+    """A twin loaded without measurement arrays (as /stats does) runs the pipeline"""
+    db_service, dt_factory, dt_ids = fleet
+    dt = dt_factory.get_dt_instance(dt_ids[0], dr_exclude=["data.measurements"])
+    assert all("measurements" not in dr.get("data", {}) for dr in dt.digital_replicas)
+    assert AggregationService()._use_server(AUTO_MODE, db_service, dt.digital_replicas)
+
+    auto = _execute(db_service, dt, AUTO_MODE)
+    # The in-process path reads the measurements it needs itself
+    in_process = _execute(db_service, dt, PYTHON_MODE)
+    _assert_same_stats(auto, in_process)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_percentiles_shape(fleet, engine):
+    """Every path reports the same keys, with percentiles only when requested"""
+    db_service, dt_factory, dt_ids = fleet
+    if db_service.client.server_info()["versionArray"] < [7]:
+        pytest.skip("$percentile requires MongoDB 7.0+")
+    dt = dt_factory.get_dt_instance(dt_ids[0])
+    for percentiles in (False, True):
+        server = _execute(db_service, dt, SERVER_MODE, percentiles=percentiles)
+        in_process = _execute(
+            db_service, dt, PYTHON_MODE, engine, percentiles=percentiles
+        )
+        for measure_type, stats in server.items():
+            assert set(stats) == set(in_process[measure_type])
+            assert ("p95" in stats) == percentiles
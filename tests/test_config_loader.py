@@ -0,0 +1,36 @@
+"""ConfigLoader parsing of config/server.yaml and config/database.yaml"""
+
+import pytest
+
+from config.config_loader import SERVER_MODES, ConfigLoader
+
+
+def write_server_config(tmp_path, mode):
+    path = tmp_path / "server.yaml"
+    path.write_text(f'server:\n  mode: "{mode}"\n  port: 5000\n')
+    return str(path)
+
+
+@pytest.mark.parametrize("mode", SERVER_MODES)
+def test_server_modes_are_accepted(tmp_path, mode):
+    config = ConfigLoader.load_server_config(write_server_config(tmp_path, mode))
+    assert config["mode"] == mode
+
+
+def test_asgi_mode_is_accepted(tmp_path):
+    config = ConfigLoader.load_server_config(write_server_config(tmp_path, "asgi"))
+    assert config == {"mode": "asgi", "port": 5000}
+
+
+def test_unknown_server_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Invalid server mode: wsgi"):
+        ConfigLoader.load_server_config(write_server_config(tmp_path, "wsgi"))
+
+
+def test_missing_server_config_defaults_to_dev(tmp_path):
+    assert ConfigLoader.load_server_config(str(tmp_path / "absent.yaml")) == {}
+
+
+def test_shipped_server_config_loads():
+    config = ConfigLoader.load_server_config()
+    assert config["mode"] in SERVER_MODES